@@ -0,0 +1,434 @@
+"""Latency benchmarks for the TalkMateAI server
+
+Runs the app in-process with the stub model backends, so it needs no weights or GPU
+and measures the pipeline itself. The stub speeds are set per scenario to mimic
+faster or slower hardware. The onnx benchmark loads the real models instead.
+
+Usage:
+    python benchmark.py chunking [--turns N] [--scenario NAME]
+    python benchmark.py onnx [--repeats N] [--stage asr|tts]
+    python benchmark.py decode [--turns N] [--max-new-tokens N]
+    python benchmark.py g2p [--turns N]
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from typing import List
+
+for stage in ("ASR", "VLM", "TTS"):
+    os.environ.setdefault(f"TALKMATE_{stage}_BACKEND", "stub")
+
+import numpy as np
+import torch
+from fastapi.testclient import TestClient
+
+import main
+
+main.logger.setLevel(logging.WARNING)
+
+SAMPLE_RATE = 24000
+
+# (name, VLM tokens/s, TTS real-time factor, TTS per-call latency in ms)
+CHUNKING_SCENARIOS = [
+    ("fast-gpu", 60.0, 0.05, 20.0),
+    ("default-stub", 40.0, 0.1, 30.0),
+    ("slow-tts", 40.0, 0.4, 150.0),
+    ("slow-decode", 8.0, 0.1, 30.0),
+    ("cpu-tts", 30.0, 0.9, 300.0),
+]
+
+ONNX_SENTENCES = [
+    "Hello! How can I help you today?",
+    "I can see a person sitting in front of a computer screen.",
+    "There is a cup on the desk next to a keyboard.",
+]
+
+# Reply templates for the G2P benchmark, filled in at random so that every reply, and
+# nearly every chunk, is text the cache has not seen
+G2P_TEMPLATES = [
+    "I can see {a} {color} {thing} {place}.",
+    "It looks like {person} is {action} {a} {thing}.",
+    "There are {count} {things} {place}, and one of them is {color}.",
+    "The {thing} {place} seems {quality}, while the {thing2} is {color}.",
+    "Sure! {person} is {action} the {thing}, which looks {quality}.",
+    "I think the {thing} costs about ${price}, but I'm not sure.",
+    "In the picture, {person} moved the {thing} {place} around {time}.",
+]
+G2P_SLOTS = {
+    "a": ["a", "one", "another"],
+    "color": ["crimson", "pale yellow", "dark grey", "turquoise", "orange", "beige"],
+    "thing": ["lamp", "bottle", "notebook", "backpack", "guitar", "umbrella", "plant"],
+    "thing2": ["mug", "laptop", "poster", "blanket", "clock", "basket"],
+    "things": ["pencils", "boxes", "cables", "pillows", "shoes", "glasses"],
+    "place": [
+        "on the shelf",
+        "near the sofa",
+        "under the bed",
+        "beside the kettle",
+        "by the fridge",
+    ],
+    "person": ["the woman", "your friend", "a child", "the man", "someone"],
+    "action": ["holding", "fixing", "opening", "carrying", "examining"],
+    "quality": ["worn out", "brand new", "slightly tilted", "quite heavy"],
+    "count": ["two", "three", "several", "twelve", "4", "17"],
+    "price": ["12.50", "3", "49.99", "120"],
+    "time": ["noon", "3:15", "yesterday evening", "midnight"],
+}
+
+
+def varied_replies(count: int, seed: int = 0) -> List[str]:
+    """Distinct replies made from G2P_TEMPLATES"""
+    rng = random.Random(seed)
+    replies = []
+    while len(replies) < count:
+        template = rng.choice(G2P_TEMPLATES)
+        reply = template.format(
+            **{slot: rng.choice(values) for slot, values in G2P_SLOTS.items()}
+        )
+        if reply not in replies:
+            replies.append(reply)
+    return replies
+
+
+def silent_audio_segment(seconds: float = 1.0) -> str:
+    samples = np.zeros(int(16000 * seconds), dtype=np.int16)
+    return base64.b64encode(samples.tobytes()).decode("utf-8")
+
+
+def wait_until_ready(client: TestClient):
+    while client.get("/health/ready").status_code != 200:
+        time.sleep(0.05)
+
+
+def run_turn(websocket, audio_segment: str) -> dict:
+    """Send one utterance and replay the reply audio on a simulated speaker
+
+    Returns the time to first audio and the silence heard between chunks.
+    """
+    websocket.send_text(json.dumps({"audio_segment": audio_segment}))
+    sent_at = time.time()
+    first_audio = None
+    playback_end = None
+    gaps = []
+    chunks = 0
+    while True:
+        message = json.loads(websocket.receive_text())
+        if message.get("audio_complete"):
+            break
+        if "audio" not in message:
+            continue
+
+        now = time.time() - sent_at
+        duration = len(base64.b64decode(message["audio"])) / 2 / SAMPLE_RATE
+        chunks += 1
+        if first_audio is None:
+            first_audio = now
+            playback_end = now + duration
+            continue
+        if now > playback_end:
+            gaps.append(now - playback_end)
+        playback_end = max(now, playback_end) + duration
+
+    return {
+        "ttfa": first_audio,
+        "gap_total": sum(gaps),
+        "gap_max": max(gaps, default=0.0),
+        "chunks": chunks,
+    }
+
+
+def benchmark_chunking(turns: int, scenarios=None):
+    """Time to first audio vs. playback gaps, fixed vs. adaptive chunking"""
+    audio_segment = silent_audio_segment()
+    print(
+        f"{'scenario':<14}{'chunking':<10}{'ttfa ms':>9}{'gap ms':>9}"
+        f"{'max gap':>9}{'chunks':>8}{'first':>7}"
+    )
+    with TestClient(main.app) as client:
+        wait_until_ready(client)
+        vlm = main.SmolVLMProcessor.get_instance().backend
+        tts = main.KokoroTTSProcessor.get_instance().pipeline
+
+        for name, tokens_per_second, rtf, latency_ms in CHUNKING_SCENARIOS:
+            if scenarios and name not in scenarios:
+                continue
+            vlm.tokens_per_second = tokens_per_second
+            tts.real_time_factor = rtf
+            tts.latency_ms = latency_ms
+
+            for adaptive in (False, True):
+                main.chunking_policy = main.ChunkingPolicy(adaptive=adaptive)
+                with client.websocket_connect(f"/ws/bench-{name}") as websocket:
+                    websocket.receive_text()
+                    # One turn for the policy to measure the scenario's speeds
+                    run_turn(websocket, audio_segment)
+                    results = [run_turn(websocket, audio_segment) for _ in range(turns)]
+
+                print(
+                    f"{name:<14}{'adaptive' if adaptive else 'fixed':<10}"
+                    f"{1000 * statistics.mean(r['ttfa'] for r in results):>9.0f}"
+                    f"{1000 * statistics.mean(r['gap_total'] for r in results):>9.0f}"
+                    f"{1000 * max(r['gap_max'] for r in results):>9.0f}"
+                    f"{statistics.mean(r['chunks'] for r in results):>8.1f}"
+                    f"{main.chunking_policy.last_first_chars:>7}"
+                )
+
+
+def timed(fn, *args, repeats: int = 1):
+    """Result of the first call and the mean seconds per call"""
+    result = fn(*args)
+    start_time = time.time()
+    for _ in range(repeats):
+        fn(*args)
+    return result, (time.time() - start_time) / repeats
+
+
+def synthesize(backend, text: str):
+    """Audio and word end times of a TTS backend's results for one text"""
+    results = list(backend(text, voice="af_sarah", speed=1, split_pattern=None))
+    audio = torch.cat([result.audio for result in results]).numpy()
+    ends = [token.end_ts for result in results for token in result.tokens or []]
+    return audio, ends
+
+
+def snr_db(reference: np.ndarray, audio: np.ndarray) -> float:
+    noise = np.sum((reference - audio) ** 2)
+    return 10 * np.log10(np.sum(reference**2) / noise) if noise else float("inf")
+
+
+def benchmark_onnx(repeats: int, stages=None):
+    """Parity and latency of the ONNX Runtime backends against the PyTorch ones"""
+    from scipy.signal import resample_poly
+
+    print(f"{'stage':<6}{'backend':<14}{'ms/call':>9}  parity")
+    reference_tts = main.create_tts_backend("kokoro")
+    speech = []
+
+    for text in ONNX_SENTENCES:
+        # 24 kHz TTS output doubles as ASR input
+        audio, _ = synthesize(reference_tts, text)
+        speech.append(resample_poly(audio, 2, 3).astype(np.float32))
+
+    if not stages or "tts" in stages:
+        onnx_tts = main.create_tts_backend("kokoro-onnx")
+        for text in ONNX_SENTENCES:
+            reference, reference_seconds = timed(
+                synthesize, reference_tts, text, repeats=repeats
+            )
+            candidate, onnx_seconds = timed(synthesize, onnx_tts, text, repeats=repeats)
+            if len(reference[0]) == len(candidate[0]):
+                parity = f"SNR {snr_db(reference[0], candidate[0]):.1f} dB"
+            else:
+                parity = f"length {len(candidate[0])} vs {len(reference[0])} samples"
+            timing_error = max(
+                (abs(a - b) for a, b in zip(reference[1], candidate[1]) if a and b),
+                default=0.0,
+            )
+            parity += f", word timings within {1000 * timing_error:.0f} ms"
+            print(f"{'tts':<6}{'kokoro':<14}{1000 * reference_seconds:>9.1f}")
+            print(f"{'tts':<6}{'kokoro-onnx':<14}{1000 * onnx_seconds:>9.1f}  {parity}")
+
+    if not stages or "asr" in stages:
+        reference_asr = main.create_asr_backend("whisper")
+        onnx_asr = main.create_asr_backend("whisper-onnx")
+        for audio in speech:
+            reference, reference_seconds = timed(
+                reference_asr.transcribe, audio, repeats=repeats
+            )
+            candidate, onnx_seconds = timed(onnx_asr.transcribe, audio, repeats=repeats)
+            same = main.normalize_transcript(reference) == main.normalize_transcript(
+                candidate
+            )
+            parity = "same transcript" if same else f"{candidate!r} vs {reference!r}"
+            print(f"{'asr':<6}{'whisper':<14}{1000 * reference_seconds:>9.1f}")
+            print(
+                f"{'asr':<6}{'whisper-onnx':<14}{1000 * onnx_seconds:>9.1f}  {parity}"
+            )
+
+
+def timed_generation(backend, messages, max_new_tokens: int) -> dict:
+    """Generate once; time to first token, decode rate and the reply text"""
+    inputs = backend.prepare_inputs(messages)
+    streamer = backend.create_streamer()
+    start_time = time.time()
+    thread = threading.Thread(
+        target=backend.generate,
+        args=(inputs, streamer),
+        kwargs={"do_sample": False, "max_new_tokens": max_new_tokens},
+    )
+    thread.start()
+    first_token = None
+    text = ""
+    for chunk in streamer:
+        if first_token is None:
+            first_token = time.time() - start_time
+        text += chunk
+    thread.join()
+    total = time.time() - start_time
+
+    tokens = len(backend.processor.tokenizer(text, add_special_tokens=False).input_ids)
+    return {
+        "ttft": first_token,
+        "tokens_per_second": (tokens - 1) / (total - first_token) if tokens > 1 else 0,
+        "text": text,
+    }
+
+
+def benchmark_decode(turns: int, max_new_tokens: int):
+    """Eager generate() vs. compiled decoding vs. prompt lookup for SmolVLM2
+
+    Loads the real model; set CUDA_VISIBLE_DEVICES= to measure on CPU.
+    """
+    from PIL import Image
+
+    pixels = np.random.default_rng(0).integers(0, 255, (384, 512, 3), dtype=np.uint8)
+    messages = main.SmolVLMProcessor.build_messages(
+        "Describe this image in detail.", [Image.fromarray(pixels)]
+    )
+    modes = {
+        "eager": {},
+        "compiled": {"compiled_decode": True},
+        "lookup": {"prompt_lookup": True},
+    }
+    print(f"{'decode':<10}{'ttft ms':>9}{'tok/s':>8}  output")
+    reference = None
+    for mode, options in modes.items():
+        backend = main.SmolVLMBackend(
+            main.SMOLVLM_MODEL_ID,
+            **{"compiled_decode": False, "prompt_lookup": False, **options},
+        )
+        backend.warmup_decoder()
+        # The first turn also warms up the eager path
+        timed_generation(backend, messages, max_new_tokens)
+        results = [
+            timed_generation(backend, messages, max_new_tokens) for _ in range(turns)
+        ]
+        if reference is None:
+            reference = results[0]["text"]
+        print(
+            f"{mode:<10}"
+            f"{1000 * statistics.mean(r['ttft'] for r in results):>9.0f}"
+            f"{statistics.mean(r['tokens_per_second'] for r in results):>8.1f}"
+            f"  {'same' if results[0]['text'] == reference else 'differs'}"
+        )
+        if backend.prompt_lookup is not None:
+            stats = backend.get_prompt_lookup_stats()
+            if not stats["enabled"]:
+                print(f"{'':<10}off: drafting changed greedy replies on the probes")
+            else:
+                print(
+                    f"{'':<10}{stats['acceptance_rate']} of drafted tokens accepted, "
+                    f"{stats['tokens_per_pass']} tokens per forward pass"
+                )
+        del backend
+
+
+def benchmark_g2p(turns: int):
+    """Kokoro text front-end time per chunk, with and without the G2P cache
+
+    Each turn is a reply the cache has not seen, so hits come from reused words and
+    openers, not repeated text. Needs misaki's spaCy model but not the acoustic model
+    weights.
+    """
+    from kokoro import KPipeline
+
+    chunks = [
+        chunk
+        for reply in varied_replies(turns)
+        for chunk in re.split(r"(?<=[.!?,])\s+", reply)
+        if chunk
+    ]
+    g2p = KPipeline(lang_code=main.KOKORO_LANG_CODE, model=False).g2p
+    g2p("Loading spaCy before timing.")
+
+    print(f"{'front-end':<11}{'ms/chunk':>9}{'max ms':>8}  cache")
+    for mode in ("uncached", "cached", "prewarmed"):
+        front_end = g2p
+        if mode != "uncached":
+            front_end = main.CachedG2P(
+                g2p, main.G2P_CACHE_SIZE, main.G2P_WORD_CACHE_SIZE
+            )
+            if mode == "prewarmed":
+                front_end.prewarm(main.G2P_PREWARM_CHUNKS, main.G2P_PREWARM_TEXT)
+        times = []
+        for chunk in chunks:
+            start_time = time.time()
+            front_end(chunk)
+            times.append(time.time() - start_time)
+        stats = front_end.get_stats() if mode != "uncached" else {}
+        print(
+            f"{mode:<11}{1000 * statistics.mean(times):>9.2f}"
+            f"{1000 * max(times):>8.2f}  "
+            + (
+                f"chunk hit rate {stats['hit_rate']:.2f}, "
+                f"word hit rate {stats['word_hit_rate'] or 0:.2f}"
+                if stats
+                else "-"
+            )
+        )
+        if mode != "uncached":
+            # Hand the lexicon and fallback back for the next wrapper
+            g2p.lexicon = front_end.lexicon
+            g2p.fallback = front_end.fallback
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    chunking = subparsers.add_parser(
+        "chunking", help="time to first audio and gaps for TTS chunk sizing"
+    )
+    chunking.add_argument("--turns", type=int, default=3)
+    chunking.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario[0] for scenario in CHUNKING_SCENARIOS],
+        help="run only this scenario (repeatable)",
+    )
+
+    onnx = subparsers.add_parser(
+        "onnx", help="ONNX Runtime vs. PyTorch parity and latency (needs the weights)"
+    )
+    onnx.add_argument("--repeats", type=int, default=5)
+    onnx.add_argument(
+        "--stage",
+        action="append",
+        choices=["asr", "tts"],
+        help="run only this stage (repeatable)",
+    )
+
+    decode = subparsers.add_parser(
+        "decode",
+        help="SmolVLM2 eager vs. compiled vs. prompt lookup decoding (needs the weights)",
+    )
+    decode.add_argument("--turns", type=int, default=3)
+    decode.add_argument("--max-new-tokens", type=int, default=128)
+
+    g2p = subparsers.add_parser(
+        "g2p", help="Kokoro text front-end time per chunk with the G2P cache"
+    )
+    g2p.add_argument("--turns", type=int, default=100)
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "chunking":
+        benchmark_chunking(args.turns, args.scenario)
+    elif args.benchmark == "onnx":
+        benchmark_onnx(args.repeats, args.stage)
+    elif args.benchmark == "decode":
+        benchmark_decode(args.turns, args.max_new_tokens)
+    elif args.benchmark == "g2p":
+        benchmark_g2p(args.turns)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
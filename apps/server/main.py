@@ -4,12 +4,23 @@ import base64
 import torch
 from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
 from transformers import (
+    AutoConfig,
     AutoModelForImageTextToText,
     TextIteratorStreamer,
     GenerationConfig,
+    DynamicCache,
+    StaticCache,
+    StoppingCriteria,
+    StoppingCriteriaList,
 )
 import numpy as np
 import logging
+import itertools
+import math
+import mmap
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
 import sys
 import io
 from PIL import Image
@@ -17,19 +28,34 @@ import time
 import os
 from datetime import datetime
 from pathlib import Path
-from threading import Thread
+from threading import Thread, Lock, Event
+from collections import deque, OrderedDict
 import re
-from typing import Optional, Dict, Any
+import copy
+import gc
+import hashlib
+import hmac
+import threading
+import tempfile
+import traceback
+import warnings
+import zipfile
+import sqlite3
+import struct
+from dataclasses import dataclass, field, replace
+from queue import Queue, Empty
+from typing import Optional, Dict, Any, Callable, List, Iterator, Protocol, Tuple
 import uvicorn
+import websockets
 
 # FastAPI imports
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from contextlib import asynccontextmanager
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from contextlib import asynccontextmanager, contextmanager
 
 # Import Kokoro TTS library
-from kokoro import KPipeline
+from kokoro import KPipeline, KModel
 
 # Configure logging
 logging.basicConfig(
@@ -52,6 +78,386 @@ except NameError:
             raise
 
 
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment ("1", "true", "yes", "on")"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Model backend selection. The "stub" backends load no weights and produce
+# deterministic output with synthetic latency, for profiling the orchestration layer.
+ASR_BACKEND = os.getenv("TALKMATE_ASR_BACKEND", "whisper")
+VLM_BACKEND = os.getenv("TALKMATE_VLM_BACKEND", "smolvlm")
+TTS_BACKEND = os.getenv("TALKMATE_TTS_BACKEND", "kokoro")
+
+WHISPER_MODEL_ID = os.getenv("TALKMATE_WHISPER_MODEL", "openai/whisper-tiny")
+SMOLVLM_MODEL_ID = os.getenv(
+    "TALKMATE_SMOLVLM_MODEL", "HuggingFaceTB/SmolVLM2-256M-Video-Instruct"
+)
+KOKORO_LANG_CODE = os.getenv("TALKMATE_KOKORO_LANG", "a")
+KOKORO_REPO_ID = os.getenv("TALKMATE_KOKORO_MODEL", "hexgrad/Kokoro-82M")
+
+# Kokoro text front-end cache: lexicon and espeak results per word (in context), and
+# whole chunks. Prewarmed at startup with typical reply sentences and openers; the
+# openers can be replaced by one chunk per line from TALKMATE_G2P_PREWARM_FILE
+G2P_CACHE_SIZE = env_int("TALKMATE_G2P_CACHE_SIZE", 4096)  # chunks; 0 disables
+G2P_WORD_CACHE_SIZE = env_int("TALKMATE_G2P_WORD_CACHE_SIZE", 16384)  # words
+G2P_PREWARM_FILE = os.getenv("TALKMATE_G2P_PREWARM_FILE", "")
+
+# Compiled SmolVLM2 decoding: static KV caches in size buckets (prompt + new tokens)
+# and a torch.compile'd decode step, warmed at startup
+COMPILED_DECODE = env_bool("TALKMATE_COMPILED_DECODE", False)
+STATIC_CACHE_BUCKETS = os.getenv("TALKMATE_STATIC_CACHE_BUCKETS", "1024,2048,4096")
+
+# Prompt lookup decoding for greedy SmolVLM2 replies: up to N draft tokens are copied
+# from where the reply's last n-gram last occurred in the prompt (question, history) or
+# reply, and verified in one forward pass. Drafting pauses while few are accepted
+PROMPT_LOOKUP = env_bool("TALKMATE_PROMPT_LOOKUP", False)
+PROMPT_LOOKUP_TOKENS = env_int("TALKMATE_PROMPT_LOOKUP_TOKENS", 8)
+PROMPT_LOOKUP_NGRAM = env_int("TALKMATE_PROMPT_LOOKUP_NGRAM", 3)
+PROMPT_LOOKUP_MIN_ACCEPTANCE = env_float("TALKMATE_PROMPT_LOOKUP_MIN_ACCEPTANCE", 0.3)
+# Replies greedy decoding must reproduce with drafting, checked in the model's dtype
+# at startup; drafting is turned off if any differs
+PROMPT_LOOKUP_PARITY_PROBES = [
+    "Repeat after me: the red cup is next to the blue book on the small table.",
+    "My friends are called Anna, Ben and Carla. Say hello to Anna, Ben and Carla.",
+    "Count from one to ten in words, then count from one to ten again.",
+]
+
+# ONNX Runtime backends ("whisper-onnx", "kokoro-onnx"), for CPU-only nodes. Graphs
+# are exported on first use and kept in TALKMATE_ONNX_DIR. Each backend keeps a pool
+# of sessions, each pinned to its own share of the cores
+ONNX_MODEL_DIR = os.getenv("TALKMATE_ONNX_DIR", "onnx_models")
+ONNX_SESSIONS = env_int("TALKMATE_ONNX_SESSIONS", 1)
+ONNX_THREADS = env_int("TALKMATE_ONNX_THREADS", 0)  # per session; 0 splits all cores
+ONNX_PIN_THREADS = env_bool("TALKMATE_ONNX_PIN_THREADS", True)
+
+# Host model stages in separate worker processes, e.g. "asr=1,vlm=1,tts=2".
+# Stages left out (or set to 0) run in-process.
+STAGE_WORKERS = os.getenv("TALKMATE_STAGE_WORKERS", "")
+
+# Multi-worker deployment: number of uvicorn worker processes behind the
+# session-affinity router, and the SQLite file they share stats and image index through
+SERVER_WORKERS = env_int("TALKMATE_SERVER_WORKERS", 1)
+
+# Map model weights (safetensors, Kokoro's .pth) copy-on-write instead of copying them
+# into each process, so workers on one machine share them through the page cache.
+# CPU only; ONNX backends load their own weights
+MMAP_WEIGHTS = env_bool("TALKMATE_MMAP_WEIGHTS", False)
+SERVER_HOST = os.getenv("TALKMATE_HOST", "0.0.0.0")
+SERVER_PORT = env_int("TALKMATE_PORT", 8000)
+SHARED_STORE_PATH = os.getenv("TALKMATE_SHARED_STORE", "server_state.db")
+# Workers publish their stats to the shared store at most once per interval
+STATS_PUBLISH_INTERVAL = env_float("TALKMATE_STATS_PUBLISH_INTERVAL", 2.0)
+
+# Admission control: concurrent requests per model stage (0 = unlimited) and
+# how many more may wait before new turns are turned away with a "busy" message
+ASR_CONCURRENCY = env_int("TALKMATE_ASR_CONCURRENCY", 2)
+VLM_CONCURRENCY = env_int("TALKMATE_VLM_CONCURRENCY", 2)
+TTS_CONCURRENCY = env_int("TALKMATE_TTS_CONCURRENCY", 2)
+STAGE_QUEUE_LIMIT = env_int("TALKMATE_STAGE_QUEUE_LIMIT", 8)
+
+# In-process stages run on their own thread pools, one thread per admitted request
+# (plus one on the VLM pool for image encoding and speculative prefill). Cores are
+# split between the stages, e.g. "asr=2,vlm=8,tts=4"; stages left out share the
+# remaining cores 1:2:1 (asr:vlm:tts). Each thread gets its stage's cores divided by
+# the stage concurrency as its torch intra-op budget
+STAGE_CORES = os.getenv("TALKMATE_STAGE_CORES", "")
+INTEROP_THREADS = env_int("TALKMATE_INTEROP_THREADS", 0)  # process-wide; 0 = default
+
+# Fair sharing of model time between clients: "client_id=value,..." settings,
+# where "*" sets the value for all other clients
+CLIENT_WEIGHTS = os.getenv("TALKMATE_CLIENT_WEIGHTS", "")
+CLIENT_TOKEN_BUDGETS = os.getenv("TALKMATE_CLIENT_TOKEN_BUDGETS", "")
+TURN_TOKEN_BUDGET = env_int("TALKMATE_TURN_TOKEN_BUDGET", 1200)
+
+# Spoken reply budget: generation stops at the first sentence end once the reply has
+# this many sentences or this many seconds of estimated speech (0 = no limit). Clients
+# can set their own with {"reply_budget": {"sentences": N, "speech_seconds": S}}
+REPLY_MAX_SENTENCES = env_int("TALKMATE_REPLY_MAX_SENTENCES", 0)
+REPLY_MAX_SPEECH_SECONDS = env_float("TALKMATE_REPLY_MAX_SPEECH_SECONDS", 0.0)
+FAIR_QUANTUM_MS = env_int("TALKMATE_FAIR_QUANTUM_MS", 100)
+FAIR_DEBT_HALF_LIFE = env_float("TALKMATE_FAIR_DEBT_HALF_LIFE", 10.0)
+
+# Speculative VLM prefill from partial transcripts ("partial_audio_segment" or
+# "partial_transcript" messages sent while the user is still speaking)
+SPECULATIVE_PREFILL = env_bool("TALKMATE_SPECULATIVE_PREFILL", False)
+SPECULATIVE_MIN_CHARS = env_int("TALKMATE_SPECULATIVE_MIN_CHARS", 8)
+SPECULATIVE_MAX_AGE = env_float("TALKMATE_SPECULATIVE_MAX_AGE", 10.0)
+# Frames whose perceptual hashes differ by at most this many bits count as the same scene
+SCENE_HASH_THRESHOLD = env_int("TALKMATE_SCENE_HASH_THRESHOLD", 6)
+
+# Caption events (transcript and reply text); clients can toggle them per session
+CAPTIONS_DEFAULT = env_bool("TALKMATE_CAPTIONS", False)
+CAPTION_INTERVAL_MS = env_int("TALKMATE_CAPTION_INTERVAL_MS", 100)
+
+# Size TTS text chunks from measured decode and synthesis speed
+ADAPTIVE_CHUNKING = env_bool("TALKMATE_ADAPTIVE_CHUNKING", True)
+CHUNK_GROWTH = env_float("TALKMATE_CHUNK_GROWTH", 1.6)
+CHUNK_MIN_CHARS = env_int("TALKMATE_CHUNK_MIN_CHARS", 12)
+CHUNK_MAX_CHARS = env_int("TALKMATE_CHUNK_MAX_CHARS", 240)
+
+# Cache of complete replies (text and audio) for repeated questions about the same scene
+RESPONSE_CACHE_ENABLED = env_bool("TALKMATE_RESPONSE_CACHE", False)
+RESPONSE_CACHE_TTL = env_float("TALKMATE_RESPONSE_CACHE_TTL", 300.0)
+RESPONSE_CACHE_MB = env_int("TALKMATE_RESPONSE_CACHE_MB", 64)
+
+# Recent camera frames per session, sent to the VLM as multi-frame (video) context.
+# A frame is only buffered when the scene changed since the last buffered one
+FRAME_BUFFER_SIZE = env_int("TALKMATE_FRAME_BUFFER_SIZE", 8)
+MAX_FRAMES_PER_TURN = env_int("TALKMATE_MAX_FRAMES_PER_TURN", 1)
+MAX_VISION_TOKENS = env_int("TALKMATE_MAX_VISION_TOKENS", 2048)
+FRAME_MAX_AGE = env_float("TALKMATE_FRAME_MAX_AGE", 30.0)
+
+# One shared heartbeat pings quiet sockets and evicts dead ones; sessions with no
+# client messages for TALKMATE_IDLE_TIMEOUT seconds are closed (0 keeps them)
+HEARTBEAT_INTERVAL = env_float("TALKMATE_HEARTBEAT_INTERVAL", 10.0)
+IDLE_TIMEOUT = env_float("TALKMATE_IDLE_TIMEOUT", 0.0)
+
+# Event loop lag watchdog: a timer on the loop measures how late it runs, and a
+# thread captures the loop's stack whenever it stalls past the threshold. Off by
+# default, since both wake several times per interval; the test suite turns it on
+LOOP_WATCHDOG = env_bool("TALKMATE_LOOP_WATCHDOG", False)
+LOOP_WATCHDOG_INTERVAL_MS = env_float("TALKMATE_LOOP_WATCHDOG_INTERVAL_MS", 50.0)
+LOOP_LAG_THRESHOLD_MS = env_float("TALKMATE_LOOP_LAG_THRESHOLD_MS", 100.0)
+
+# Budget for per-session caches (frames, vision encodings, prefilled KV caches, reply
+# audio); over budget, the least recently active sessions' caches are dropped first
+SESSION_MEMORY_MB = env_int("TALKMATE_SESSION_MEMORY_MB", 512)
+# How long session teardown waits for a stopped generation thread to exit
+GENERATION_JOIN_TIMEOUT = env_float("TALKMATE_GENERATION_JOIN_TIMEOUT", 5.0)
+
+# Admin endpoints (/admin/profile) require "Authorization: Bearer <token>"; they are
+# disabled while no token is set
+ADMIN_TOKEN = os.getenv("TALKMATE_ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = env_float("TALKMATE_PROFILE_MAX_SECONDS", 60.0)
+PROFILE_SAMPLE_MS = env_float("TALKMATE_PROFILE_SAMPLE_MS", 5.0)
+
+# Hot reload (/admin/reload/{stage}): how long a replaced model waits for the turns
+# that were using it before its weights are released anyway
+RELOAD_DRAIN_TIMEOUT = env_float("TALKMATE_RELOAD_DRAIN_TIMEOUT", 60.0)
+
+# Run a canned utterance/image through each model before reporting ready
+WARMUP_ON_STARTUP = env_bool("TALKMATE_WARMUP", True)
+
+
+class SharedStore:
+    """SQLite-backed state shared by the worker processes on one machine"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS worker_state ("
+                "worker_id TEXT PRIMARY KEY, stats TEXT, readiness TEXT, updated REAL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                "filename TEXT PRIMARY KEY, path TEXT, size INTEGER, created TEXT, "
+                "client_id TEXT, worker_id TEXT)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS images_created ON images (created)"
+            )
+
+    def put_stats(self, worker_id: str, stats: dict):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO worker_state (worker_id, stats, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET stats=excluded.stats, "
+                "updated=excluded.updated",
+                (worker_id, json.dumps(stats, default=str), time.time()),
+            )
+
+    def put_readiness(self, worker_id: str, state: dict):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO worker_state (worker_id, readiness, updated) "
+                "VALUES (?, ?, ?) ON CONFLICT(worker_id) DO UPDATE SET "
+                "readiness=excluded.readiness, updated=excluded.updated",
+                (worker_id, json.dumps(state), time.time()),
+            )
+
+    def get_worker_states(self) -> Dict[str, dict]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT worker_id, stats, readiness, updated FROM worker_state"
+            ).fetchall()
+        return {
+            worker_id: {
+                "stats": json.loads(stats) if stats else {},
+                "readiness": json.loads(readiness) if readiness else None,
+                "updated": updated,
+            }
+            for worker_id, stats, readiness, updated in rows
+        }
+
+    def add_image(self, filepath: str, size: int, client_id: str, worker_id: str):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    Path(filepath).name,
+                    filepath,
+                    size,
+                    datetime.now().isoformat(),
+                    client_id,
+                    worker_id,
+                ),
+            )
+
+    def list_images(self) -> List[dict]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT filename, path, size, created FROM images ORDER BY created DESC"
+            ).fetchall()
+        return [
+            {"filename": filename, "path": path, "size": size, "created": created}
+            for filename, path, size, created in rows
+        ]
+
+    def aggregate_stats(self) -> dict:
+        """Sum the counters of all workers"""
+        totals: Dict[str, Any] = {}
+        workers = {}
+        for worker_id, state in self.get_worker_states().items():
+            stats = state["stats"]
+            workers[worker_id] = stats
+            for key, value in stats.items():
+                if key == "uptime_seconds":
+                    totals[key] = max(totals.get(key, 0), value)
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+        return {**totals, "workers": workers}
+
+
+def rendezvous_worker(client_id: str, num_workers: int) -> int:
+    """Pick a worker for a client by rendezvous hashing (stable across processes)"""
+    return max(
+        range(num_workers),
+        key=lambda index: hashlib.sha1(f"{index}:{client_id}".encode()).digest(),
+    )
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """64-bit difference hash (dHash) of an image, robust to small camera noise"""
+    pixels = np.asarray(
+        image.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16
+    )
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def tensor_bytes(value: Any) -> int:
+    """Bytes held by the tensors in a (nested) model state, e.g. a KV cache"""
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, DynamicCache):
+        return tensor_bytes(value.key_cache) + tensor_bytes(value.value_cache)
+    if isinstance(value, dict):
+        return sum(tensor_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_bytes(item) for item in value)
+    return 0
+
+
+def image_bytes(image: Image.Image) -> int:
+    """Decoded size of a PIL image"""
+    return image.width * image.height * len(image.getbands())
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+WEIGHT_FILE_SUFFIXES = (".safetensors", ".pth", ".pt")
+
+
+PROCESS_MEMORY_TTL = 5.0  # seconds process_memory() figures are reused for
+process_memory_cache: Dict[str, Tuple[float, Optional[dict]]] = {}
+
+
+def process_memory(pid="self") -> Optional[dict]:
+    """read_process_memory(), cached for a few seconds since it parses all of smaps"""
+    cached = process_memory_cache.get(str(pid))
+    if cached is not None and time.time() - cached[0] < PROCESS_MEMORY_TTL:
+        return cached[1]
+    memory = read_process_memory(pid)
+    process_memory_cache[str(pid)] = (time.time(), memory)
+    return memory
+
+
+def read_process_memory(pid="self") -> Optional[dict]:
+    """Unique vs. shared resident memory of a process, and its mapped weights (Linux)
+
+    ``unique_mb`` is what exiting the process would free; ``shared_mb`` is resident
+    memory other processes map too, e.g. weights loaded with TALKMATE_MMAP_WEIGHTS.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            fields = {
+                line.split(":")[0]: int(line.split()[1]) * 1024
+                for line in rollup
+                if line.split()[-1] == "kB"
+            }
+        weights = 0
+        mapped_file = False
+        with open(f"/proc/{pid}/smaps") as smaps:
+            for line in smaps:
+                if line[0] in "0123456789abcdef" and "-" in line.split()[0]:
+                    mapped_file = line.rstrip().endswith(WEIGHT_FILE_SUFFIXES)
+                elif mapped_file and line.startswith("Rss:"):
+                    weights += int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1e6, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1e6, 1),
+        "unique_mb": round(
+            (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1e6, 1
+        ),
+        "shared_mb": round(
+            (fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1e6, 1
+        ),
+        "weights_mapped_mb": round(weights / 1e6, 1),
+    }
+
+
+def hash_distance(first: int, second: int) -> int:
+    """Number of differing bits between two perceptual hashes"""
+    return bin(first ^ second).count("1")
+
+
+def same_scene(first: Optional[int], second: Optional[int]) -> bool:
+    """Whether two optional frame hashes describe the same scene (or both no image)"""
+    if first is None or second is None:
+        return first is None and second is None
+    return hash_distance(first, second) <= SCENE_HASH_THRESHOLD
+
+
 class ImageManager:
     """Manages image saving and verification"""
 
@@ -59,6 +465,9 @@ class ImageManager:
         self.save_directory = Path(save_directory)
         self.save_directory.mkdir(exist_ok=True)
         logger.info(f"Image save directory: {self.save_directory.absolute()}")
+        # Shared index of saved images when running as one of several workers
+        self.shared_store: Optional[SharedStore] = None
+        self.worker_id = None
 
     def save_image(self, image_data: bytes, client_id: str, prefix: str = "img") -> str:
         """Save image data and return the filename"""
@@ -76,6 +485,11 @@ class ImageManager:
             file_size = len(image_data)
             logger.info(f"💾 Saved image: {filename} ({file_size:,} bytes)")
 
+            if self.shared_store:
+                self.shared_store.add_image(
+                    str(filepath), file_size, client_id, self.worker_id
+                )
+
             return str(filepath)
 
         except Exception as e:
@@ -108,55 +522,2213 @@ class ImageManager:
             logger.info(f"✅ Image verified: {info}")
             return info
 
-        except Exception as e:
-            logger.error(f"❌ Error verifying image {filepath}: {e}")
-            return {"error": str(e), "valid": False}
+        except Exception as e:
+            logger.error(f"❌ Error verifying image {filepath}: {e}")
+            return {"error": str(e), "valid": False}
+
+
+class ASRBackend(Protocol):
+    """Speech-to-text model used by WhisperProcessor"""
+
+    def transcribe(self, audio_array: np.ndarray) -> str:
+        """Transcribe 16 kHz float32 mono audio (blocking)"""
+        ...
+
+
+class VLMBackend(Protocol):
+    """Image + text generation model used by SmolVLMProcessor"""
+
+    def prepare_inputs(
+        self, messages: List[dict], image_encodings: Optional[List[Any]] = None
+    ) -> Any:
+        """Turn chat messages into model inputs.
+
+        ``image_encodings`` are results of ``encode_image`` for the images in the
+        messages, in order; backends may reuse them instead of re-encoding.
+        """
+        ...
+
+    def encode_image(self, image: Image.Image) -> Any:
+        """Optional: run the vision encoder ahead of prompt assembly (blocking)"""
+        ...
+
+    def count_vision_tokens(self, image_encoding: Any) -> int:
+        """Optional: prompt tokens an ``encode_image`` result occupies"""
+        ...
+
+    def prefill(self, inputs: Any) -> Any:
+        """Optional: prefill the KV cache for the prompt up to the user's text (blocking)"""
+        ...
+
+    def can_reuse_prefill(self, prefill_state: Any, inputs: Any) -> bool:
+        """Optional: whether a prefill state is a strict prefix of the given inputs"""
+        ...
+
+    def warmup_decoder(self) -> None:
+        """Optional: compile and warm any compiled decode graphs (blocking)"""
+        ...
+
+    def create_streamer(self) -> Iterator[str]:
+        """Create an iterator that yields generated text as it is produced"""
+        ...
+
+    def generate(self, inputs: Any, streamer: Any, **generation_kwargs) -> None:
+        """Run generation to completion, pushing text into the streamer (blocking)
+
+        Backends should stop early once the optional ``stop_event`` is set, and at
+        the sentence end that uses up the optional ``reply_budget``.
+        """
+        ...
+
+
+class TTSBackend(Protocol):
+    """Text-to-speech model used by KokoroTTSProcessor.
+
+    Follows the KPipeline call signature: yields results exposing
+    ``graphemes``, ``phonemes``, ``audio`` (tensor) and ``tokens`` (with
+    ``text``, ``start_ts`` and ``end_ts``).
+    """
+
+    def __call__(
+        self, text: str, voice: str, speed: float = 1, split_pattern: str = None
+    ) -> Iterator[Any]: ...
+
+
+class TextQueueStreamer:
+    """Queue-backed text streamer with the same iteration protocol as TextIteratorStreamer"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.text_queue = Queue()
+        self.stop_signal = None
+        self.timeout = timeout
+
+    def put(self, text: str):
+        self.text_queue.put(text)
+
+    def end(self):
+        self.text_queue.put(self.stop_signal)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        value = self.text_queue.get(timeout=self.timeout)
+        if value is self.stop_signal:
+            raise StopIteration()
+        return value
+
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def mmap_safetensors(path) -> Dict[str, torch.Tensor]:
+    """Tensors of a safetensors file, backed by a private mapping of the file
+
+    Reads come from the page cache, which every process mapping the file shares. A
+    write copies only the page it touches, so the file and other processes never see it.
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    (header_length,) = struct.unpack("<Q", mapping[:8])
+    header = json.loads(mapping[8 : 8 + header_length])
+    header.pop("__metadata__", None)
+    tensors = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        if end == start:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensors[name] = torch.frombuffer(
+            mapping,
+            dtype=dtype,
+            count=(end - start) // dtype.itemsize,
+            offset=8 + header_length + start,
+        ).view(info["shape"])
+    return tensors
+
+
+def check_weights_loaded(model, name: str):
+    """Raise if a parameter or buffer was left on the meta device"""
+    missing = [
+        key
+        for key, tensor in itertools.chain(
+            model.named_parameters(), model.named_buffers()
+        )
+        if tensor.is_meta
+    ]
+    if missing:
+        raise ValueError(f"{name} checkpoint has no weights for {missing[:3]}")
+
+
+def mmap_pretrained(model_cls, model_id: str, torch_dtype, **kwargs):
+    """A transformers model whose parameters are mapped from its safetensors files
+
+    The model is built without allocating weights, then its parameters are pointed at
+    the mapped checkpoint, so loading reads nothing up front and a second process finds
+    the pages already cached. Tensors stored in another dtype are cast, which makes
+    private copies of them.
+    """
+    from accelerate import init_empty_weights
+    from huggingface_hub import snapshot_download
+
+    folder = Path(model_id)
+    if not folder.is_dir():
+        folder = Path(
+            snapshot_download(model_id, allow_patterns=["*.json", "*.safetensors"])
+        )
+    files = sorted(folder.glob("*.safetensors"))
+    if not files:
+        raise ValueError(f"{model_id} has no safetensors checkpoint")
+
+    config = AutoConfig.from_pretrained(folder)
+    with init_empty_weights(include_buffers=False):
+        model = model_cls.from_config(config, torch_dtype=torch_dtype, **kwargs)
+    state_dict = {}
+    for file in files:
+        state_dict.update(mmap_safetensors(file))
+    for key, tensor in state_dict.items():
+        if tensor.is_floating_point() and tensor.dtype != torch_dtype:
+            state_dict[key] = tensor.to(torch_dtype)
+    _, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    if unexpected:
+        raise ValueError(
+            f"{model_id} checkpoint has unexpected weights {unexpected[:3]}"
+        )
+    model.tie_weights()
+    check_weights_loaded(model, model_id)
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(folder)
+    except OSError:
+        pass  # No generation_config.json; keep the one derived from the config
+    return model.eval()
+
+
+def load_pretrained(
+    model_cls,
+    model_id: str,
+    torch_dtype,
+    mmap_weights: bool = MMAP_WEIGHTS,
+    **kwargs,
+):
+    """``model_cls.from_pretrained``, with mapped weights when enabled and on CPU"""
+    if mmap_weights and not torch.cuda.is_available():
+        try:
+            model = mmap_pretrained(
+                model_cls,
+                model_id,
+                torch_dtype,
+                attn_implementation=kwargs.get("attn_implementation"),
+            )
+            logger.info(f"🗺️ Mapped {model_id} weights")
+            return model
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Cannot map {model_id} weights, loading a copy: {e}")
+    return model_cls.from_pretrained(model_id, torch_dtype=torch_dtype, **kwargs)
+
+
+@contextmanager
+def torch_load_mmap():
+    """Have torch.load map checkpoints rather than read them, on torch versions that can"""
+    try:
+        from torch.utils.serialization import config
+    except ImportError:
+        yield
+        return
+    previous = config.load.mmap
+    config.load.mmap = True
+    try:
+        yield
+    finally:
+        config.load.mmap = previous
+
+
+def mmap_kokoro_model(repo_id: str = KOKORO_REPO_ID) -> KModel:
+    """Kokoro's KModel with its parameters mapped from the checkpoint"""
+    from accelerate import init_empty_weights
+    from huggingface_hub import hf_hub_download
+
+    path = hf_hub_download(repo_id=repo_id, filename=KModel.MODEL_NAMES[repo_id])
+    # KModel loads the checkpoint itself; into meta parameters that is a no-op
+    with init_empty_weights(include_buffers=False), torch_load_mmap():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = KModel(repo_id=repo_id, model=path)
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True, mmap=True)
+    for key, state_dict in checkpoint.items():
+        # Some components were saved from DataParallel, with a "module." prefix
+        state_dict = {
+            name[len("module.") :] if name.startswith("module.") else name: tensor
+            for name, tensor in state_dict.items()
+        }
+        getattr(model, key).load_state_dict(state_dict, strict=False, assign=True)
+    check_weights_loaded(model, repo_id)
+    return model.eval()
+
+
+class WhisperBackend:
+    """Whisper ASR through the HuggingFace pipeline"""
+
+    def __init__(self, model_id: str = WHISPER_MODEL_ID):
+        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+
+        logger.info(f"Using device for Whisper: {self.device}")
+
+        # Load Whisper model
+        logger.info(f"Loading {model_id}...")
+
+        self.model = load_pretrained(
+            AutoModelForSpeechSeq2Seq,
+            model_id,
+            self.torch_dtype,
+            low_cpu_mem_usage=True,
+            use_safetensors=True,
+        )
+        self.model.to(self.device)
+
+        self.processor = AutoProcessor.from_pretrained(model_id)
+
+        # Create pipeline
+        self.pipe = pipeline(
+            "automatic-speech-recognition",
+            model=self.model,
+            tokenizer=self.processor.tokenizer,
+            feature_extractor=self.processor.feature_extractor,
+            torch_dtype=self.torch_dtype,
+            device=self.device,
+        )
+
+    def transcribe(self, audio_array):
+        return self.pipe(audio_array)["text"]
+
+
+class InstancePool:
+    """Blocking pool of interchangeable model instances, one caller per instance"""
+
+    def __init__(self, instances: List[Any]):
+        self.size = len(instances)
+        self.queue = Queue()
+        for instance in instances:
+            self.queue.put(instance)
+
+    @contextmanager
+    def checkout(self):
+        instance = self.queue.get()
+        try:
+            yield instance
+        finally:
+            self.queue.put(instance)
+
+
+def onnx_core_sets(num_sessions: int, threads: int = ONNX_THREADS) -> List[List[int]]:
+    """Disjoint sets of cores for pooled sessions, wrapping around if oversubscribed"""
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on Windows/macOS
+        cores = list(range(os.cpu_count() or 1))
+    per_session = min(threads or max(1, len(cores) // num_sessions), len(cores))
+    return [
+        [cores[(i * per_session + j) % len(cores)] for j in range(per_session)]
+        for i in range(num_sessions)
+    ]
+
+
+def onnx_session_options(cores: List[int]):
+    """ONNX Runtime session options running intra-op threads on the given cores"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = len(cores)
+    options.inter_op_num_threads = 1
+    if ONNX_PIN_THREADS and len(cores) > 1 and sys.platform.startswith("linux"):
+        # One entry per intra-op thread besides the calling one; processor ids are 1-based
+        options.add_session_config_entry(
+            "session.intra_op_thread_affinities",
+            ";".join(str(core + 1) for core in cores[1:]),
+        )
+    return options
+
+
+def onnx_export_path(model_id: str, suffix: str = "") -> Path:
+    return Path(ONNX_MODEL_DIR) / (model_id.replace("/", "--") + suffix)
+
+
+class WhisperONNXBackend:
+    """Whisper ASR with its encoder and decoder exported to ONNX Runtime (CPU)"""
+
+    def __init__(
+        self, model_id: str = WHISPER_MODEL_ID, num_sessions: int = ONNX_SESSIONS
+    ):
+        try:
+            from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+        except ImportError as e:
+            raise ImportError(
+                "The whisper-onnx backend needs optimum[onnxruntime] (pip install .[onnx])"
+            ) from e
+
+        export_dir = onnx_export_path(model_id)
+        processor = AutoProcessor.from_pretrained(model_id)
+        pipes = []
+        for cores in onnx_core_sets(num_sessions):
+            export = not (export_dir / "config.json").exists()
+            if export:
+                logger.info(f"Exporting {model_id} to ONNX in {export_dir}...")
+            model = ORTModelForSpeechSeq2Seq.from_pretrained(
+                model_id if export else export_dir,
+                export=export,
+                provider="CPUExecutionProvider",
+                session_options=onnx_session_options(cores),
+            )
+            if export:
+                model.save_pretrained(export_dir)
+            pipes.append(
+                pipeline(
+                    "automatic-speech-recognition",
+                    model=model,
+                    tokenizer=processor.tokenizer,
+                    feature_extractor=processor.feature_extractor,
+                )
+            )
+        self.pipes = InstancePool(pipes)
+        logger.info(f"Whisper ONNX ready with {num_sessions} session(s)")
+
+    def transcribe(self, audio_array):
+        with self.pipes.checkout() as pipe:
+            return pipe(audio_array)["text"]
+
+
+class StopOnEvent(StoppingCriteria):
+    """Stops generate() once an event is set, e.g. when the client has gone away"""
+
+    def __init__(self, event: Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full(
+            (input_ids.shape[0],),
+            self.event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+
+
+REPLY_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s|$)")
+REPLY_WORD_BEFORE = re.compile(r"[A-Za-z][A-Za-z.]*$")
+# Words whose trailing period does not end a sentence ("No." does, so "no" is absent)
+REPLY_ABBREVIATIONS = {
+    "mr",
+    "mrs",
+    "ms",
+    "dr",
+    "prof",
+    "sr",
+    "jr",
+    "st",
+    "mt",
+    "vs",
+    "etc",
+    "e.g",
+    "i.e",
+    "approx",
+    "fig",
+    "inc",
+    "ltd",
+    "co",
+    "u.s",
+    "a.m",
+    "p.m",
+}
+
+# Initials such as "J. K." (not "I" or "A", which end sentences as words)
+REPLY_INITIALS = set("BCDEFGHJKLMNOPQRSTUVWXYZ")
+
+
+def sentence_ends(text: str, complete: bool = True) -> List[int]:
+    """Offsets just past each sentence end in reply text
+
+    A period only ends a sentence before whitespace or the end of the text, and not
+    after a common abbreviation or an initial. While the reply is still being generated
+    (``complete=False``), a period after a digit at the very end may turn out to be a
+    decimal point, so it does not count yet.
+    """
+    ends = []
+    for match in REPLY_SENTENCE_END.finditer(text):
+        if match.group().startswith(".") and not match.group().startswith(".."):
+            before = text[: match.start()]
+            if not complete and match.end() == len(text) and before[-1:].isdigit():
+                continue
+            word = REPLY_WORD_BEFORE.search(before)
+            if word and (
+                word.group().lower() in REPLY_ABBREVIATIONS
+                or (len(word.group()) == 1 and word.group() in REPLY_INITIALS)
+            ):
+                continue
+        ends.append(match.end())
+    return ends
+
+
+@dataclass
+class ReplyBudget:
+    """How much a spoken reply may say, in sentences and estimated seconds of speech"""
+
+    max_sentences: int = 0  # 0 = no limit
+    max_speech_seconds: float = 0.0  # 0 = no limit
+    speech_cps: float = 15.0  # characters of reply text per second of speech
+
+    @staticmethod
+    def sentences(text: str, complete: bool = True) -> int:
+        return len(sentence_ends(text, complete))
+
+    def speech_seconds(self, text: str) -> float:
+        return len(text.strip()) / self.speech_cps
+
+    def exhausted(self, text: str, complete: bool = False) -> bool:
+        """True at a sentence end that reaches either limit
+
+        ``complete`` says the text is the whole reply rather than a prefix of it.
+        """
+        stripped = text.rstrip()
+        # Whitespace after the last sentence end settles it, as the end of the reply does
+        ends = sentence_ends(stripped, complete or len(stripped) < len(text))
+        if not ends or ends[-1] != len(stripped):
+            return False
+        return (0 < self.max_sentences <= len(ends)) or (
+            0 < self.max_speech_seconds <= self.speech_seconds(stripped)
+        )
+
+    def remaining(self, text: str) -> dict:
+        """What is left of the budget after a reply, for the turn's metrics"""
+        sentences = self.sentences(text)
+        speech_seconds = self.speech_seconds(text)
+        return {
+            "sentences": sentences,
+            "sentences_remaining": (
+                max(0, self.max_sentences - sentences) if self.max_sentences else None
+            ),
+            "speech_seconds": round(speech_seconds, 1),
+            "speech_seconds_remaining": (
+                round(max(0.0, self.max_speech_seconds - speech_seconds), 1)
+                if self.max_speech_seconds
+                else None
+            ),
+            "budget_reached": self.exhausted(text, complete=True),
+        }
+
+
+class StopOnReplyBudget(StoppingCriteria):
+    """Stops generate() at the sentence end that uses up a ReplyBudget"""
+
+    def __init__(self, budget: ReplyBudget, tokenizer, prompt_length: int):
+        self.budget = budget
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = False
+        # Only decode the whole reply when the last token could end a sentence
+        if any(c in ".!?" for c in self.tokenizer.decode(input_ids[0, -1:])):
+            reply = self.tokenizer.decode(
+                input_ids[0, self.prompt_length :], skip_special_tokens=True
+            )
+            done = self.budget.exhausted(reply)
+        return torch.full(
+            (input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device
+        )
+
+
+def eos_token_ids(model) -> set:
+    """Token ids that end generation, from the model's generation config"""
+    eos_token_id = model.generation_config.eos_token_id
+    if eos_token_id is None:
+        return set()
+    if isinstance(eos_token_id, int):
+        return {eos_token_id}
+    return set(eos_token_id)
+
+
+class CompiledDecoder:
+    """Greedy decoding with preallocated static KV caches and a torch.compile'd step
+
+    Prefill stays eager, since prompt lengths vary. Every decode step then has the same
+    shapes for a given cache bucket, so it runs one compiled graph per bucket without
+    per-token Python dispatch or cache reallocation.
+    """
+
+    def __init__(self, model, buckets: List[int]):
+        self.model = model
+        self.buckets = sorted(buckets)
+        self.text_config = getattr(model.config, "text_config", model.config)
+        # Caches are reset and reused; one per concurrent generation and bucket
+        self.free_caches: Dict[int, List[StaticCache]] = {b: [] for b in self.buckets}
+        self.lock = Lock()
+        self.step = torch.compile(self.decode_step, dynamic=False)
+        self.eos_token_ids = eos_token_ids(model)
+
+    def bucket_for(self, length: int) -> Optional[int]:
+        """Smallest cache size holding ``length`` tokens, if any"""
+        return next((bucket for bucket in self.buckets if bucket >= length), None)
+
+    def acquire_cache(self, bucket: int) -> StaticCache:
+        with self.lock:
+            if self.free_caches[bucket]:
+                return self.free_caches[bucket].pop()
+        return StaticCache(
+            config=self.text_config,
+            max_batch_size=1,
+            max_cache_len=bucket,
+            device=self.model.device,
+            dtype=self.model.dtype,
+        )
+
+    def release_cache(self, bucket: int, cache: StaticCache):
+        cache.reset()
+        with self.lock:
+            self.free_caches[bucket].append(cache)
+
+    def decode_step(self, token, cache_position, cache):
+        logits = self.model(
+            input_ids=token,
+            past_key_values=cache,
+            cache_position=cache_position,
+            use_cache=True,
+        ).logits
+        return logits[:, -1].argmax(dim=-1, keepdim=True)
+
+    @torch.inference_mode()
+    def warmup(self):
+        """Compile the decode step for every bucket"""
+        token = torch.zeros((1, 1), dtype=torch.long, device=self.model.device)
+        for bucket in self.buckets:
+            start_time = time.time()
+            cache = self.acquire_cache(bucket)
+            try:
+                for position in range(2):
+                    position = torch.tensor([position], device=self.model.device)
+                    self.step(token, position, cache)
+            finally:
+                self.release_cache(bucket, cache)
+            logger.info(
+                f"🔥 Compiled decode step for {bucket}-token cache in {time.time() - start_time:.1f}s"
+            )
+
+    @torch.inference_mode()
+    def generate(self, inputs, streamer, max_new_tokens: int, stopping_criteria=None):
+        """Greedy generation into a TextIteratorStreamer (blocking)"""
+        sequence = inputs["input_ids"]
+        prompt_length = sequence.shape[1]
+        bucket = self.bucket_for(prompt_length + max_new_tokens)
+        device = self.model.device
+        cache = self.acquire_cache(bucket)
+        try:
+            # The streamer skips the first put as the prompt
+            streamer.put(inputs["input_ids"].cpu())
+            logits = self.model(
+                **inputs,
+                past_key_values=cache,
+                cache_position=torch.arange(prompt_length, device=device),
+                use_cache=True,
+            ).logits
+            token = logits[:, -1].argmax(dim=-1, keepdim=True)
+
+            for position in range(prompt_length, prompt_length + max_new_tokens):
+                if token.item() in self.eos_token_ids:
+                    break
+                streamer.put(token.cpu())
+                sequence = torch.cat([sequence, token], dim=1)
+                if position == prompt_length + max_new_tokens - 1 or (
+                    stopping_criteria is not None
+                    and stopping_criteria(sequence, None).any()
+                ):
+                    break
+                # Cloned because the compiled graph may reuse its output buffer
+                token = self.step(
+                    token, torch.tensor([position], device=device), cache
+                ).clone()
+        finally:
+            streamer.end()
+            self.release_cache(bucket, cache)
+
+
+class DiscardStreamer:
+    """Streamer that drops the tokens of a generation nobody reads"""
+
+    def put(self, value):
+        pass
+
+    def end(self):
+        pass
+
+
+class PromptLookupDecoder:
+    """Greedy decoding that drafts tokens by prompt lookup and verifies them in one pass
+
+    Spoken replies often repeat spans of the question or the conversation: names,
+    object labels, phrases. Before each step, the reply's last n-gram is looked up in
+    the prompt and reply so far, and the tokens that followed it become a draft that
+    runs through the model together with the current token. Drafted tokens are kept up
+    to the first one greedy decoding would not have picked, followed by the model's own
+    pick, so the reply is the one plain greedy decoding produces.
+
+    That holds exactly in fp32. In bf16, logits for a token verified together with a
+    draft can differ in the last bits from a one-token step, which flips near-ties, so
+    ``check_parity`` compares both on probe prompts and turns drafting off on any
+    difference. Parity on other prompts is then likely but not guaranteed.
+    """
+
+    window = 8  # drafting steps the acceptance rate is measured over
+    pause_steps = 16  # plain decode steps after a window below the minimum
+    parity_tokens = 48  # new tokens per parity probe
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        max_draft_tokens: int = PROMPT_LOOKUP_TOKENS,
+        max_ngram: int = PROMPT_LOOKUP_NGRAM,
+        min_acceptance: float = PROMPT_LOOKUP_MIN_ACCEPTANCE,
+    ):
+        self.model = model
+        self.max_draft_tokens = max_draft_tokens
+        self.max_ngram = max_ngram
+        self.min_acceptance = min_acceptance
+        self.eos_token_ids = eos_token_ids(model)
+        # Drafts never copy image placeholders or other special tokens of the prompt
+        self.blocked_token_ids = set(tokenizer.all_special_ids)
+        image_token_id = getattr(model.config, "image_token_id", None)
+        if image_token_id is not None:
+            self.blocked_token_ids.add(image_token_id)
+
+        # Cleared when drafting fails the parity check
+        self.enabled = True
+
+        self.lock = Lock()
+        self.stats = self.empty_stats()
+
+    @staticmethod
+    def empty_stats() -> dict:
+        return {
+            "generations": 0,
+            "tokens": 0,
+            "forward_passes": 0,
+            "drafted": 0,
+            "accepted": 0,
+            "pauses": 0,
+            "decode_seconds": 0.0,
+        }
+
+    def propose(self, sequence, max_tokens: int) -> List[int]:
+        """Tokens that followed the latest earlier occurrence of the last n-gram"""
+        tokens = sequence[0]
+        length = tokens.shape[0]
+        for n in range(min(self.max_ngram, length - 1), 0, -1):
+            # Windows ending before the last token, so each has a successor
+            windows = tokens[: length - 1].unfold(0, n, 1)
+            matches = (windows == tokens[length - n :]).all(dim=1).nonzero()
+            if not len(matches):
+                continue
+            start = matches[-1].item() + n
+            draft = []
+            for token_id in tokens[start : start + max_tokens].tolist():
+                if token_id in self.blocked_token_ids:
+                    break
+                draft.append(token_id)
+            if draft:
+                return draft
+        return []
+
+    @torch.inference_mode()
+    def generate(
+        self,
+        inputs,
+        streamer,
+        max_new_tokens: int,
+        stopping_criteria=None,
+        cache: Optional[DynamicCache] = None,
+        drafting: bool = True,
+    ) -> List[int]:
+        """Greedy generation into a TextIteratorStreamer (blocking)
+
+        ``cache`` may already hold a prefix of the prompt, from a speculative prefill.
+        Without ``drafting``, every step decodes one token. Returns the new token ids.
+        """
+        sequence = inputs["input_ids"]
+        prompt_length = sequence.shape[1]
+        device = self.model.device
+        if cache is None:
+            cache = DynamicCache()
+        cached = cache.get_seq_length()
+        prompt_inputs = inputs
+        if cached:
+            # The image tokens are in the cache; only the prompt's tail is new
+            prompt_inputs = {
+                "input_ids": sequence[:, cached:],
+                "attention_mask": inputs["attention_mask"],
+            }
+
+        stats = dict.fromkeys(["forward_passes", "drafted", "accepted", "pauses"], 0)
+        recent = deque(maxlen=self.window)  # (drafted, accepted) per drafting step
+        paused = 0
+        decode_start = time.time()
+        try:
+            # The streamer skips the first put as the prompt
+            streamer.put(sequence.cpu())
+            logits = self.model(
+                **prompt_inputs,
+                past_key_values=cache,
+                cache_position=torch.arange(cached, prompt_length, device=device),
+                use_cache=True,
+            ).logits
+            pending = [logits[0, -1].argmax().item()]
+            decode_start = time.time()
+
+            while pending:
+                token_id = pending.pop(0)
+                if token_id in self.eos_token_ids:
+                    break
+                token = torch.tensor([[token_id]], device=device)
+                streamer.put(token.cpu())
+                sequence = torch.cat([sequence, token], dim=1)
+                generated = sequence.shape[1] - prompt_length
+                if generated >= max_new_tokens or (
+                    stopping_criteria is not None
+                    and stopping_criteria(sequence, None).any()
+                ):
+                    break
+                if pending:
+                    continue
+
+                draft = []
+                if paused:
+                    paused -= 1
+                elif drafting:
+                    draft = self.propose(
+                        sequence,
+                        min(self.max_draft_tokens, max_new_tokens - generated - 1),
+                    )
+                # The cache holds everything before the token just emitted
+                position = sequence.shape[1] - 1
+                predicted = (
+                    self.model(
+                        input_ids=torch.tensor([[token_id, *draft]], device=device),
+                        past_key_values=cache,
+                        cache_position=torch.arange(
+                            position, position + len(draft) + 1, device=device
+                        ),
+                        use_cache=True,
+                    )
+                    .logits[0]
+                    .argmax(dim=-1)
+                    .tolist()
+                )
+                stats["forward_passes"] += 1
+                accepted = 0
+                while accepted < len(draft) and draft[accepted] == predicted[accepted]:
+                    accepted += 1
+                if accepted < len(draft):
+                    # Drop the keys and values of the rejected draft tokens
+                    cache.crop(accepted - len(draft))
+                pending = draft[:accepted] + [predicted[accepted]]
+
+                if draft:
+                    stats["drafted"] += len(draft)
+                    stats["accepted"] += accepted
+                    recent.append((len(draft), accepted))
+                    if len(recent) == self.window and sum(
+                        a for _, a in recent
+                    ) < self.min_acceptance * sum(d for d, _ in recent):
+                        # Verifying drafts that miss costs compute; decode plainly
+                        paused = self.pause_steps
+                        recent.clear()
+                        stats["pauses"] += 1
+        finally:
+            streamer.end()
+            stats["tokens"] = sequence.shape[1] - prompt_length
+            stats["decode_seconds"] = time.time() - decode_start
+            with self.lock:
+                self.stats["generations"] += 1
+                for key, value in stats.items():
+                    self.stats[key] += value
+        return sequence[0, prompt_length:].tolist()
+
+    def check_parity(self, probes: List[dict]) -> bool:
+        """Whether drafting reproduces one-token greedy decoding on the probe inputs
+
+        Turns drafting off if not. Statistics start counting after the check.
+        """
+        for inputs in probes:
+            plain = self.generate(
+                inputs, DiscardStreamer(), self.parity_tokens, drafting=False
+            )
+            drafted = self.generate(inputs, DiscardStreamer(), self.parity_tokens)
+            if drafted != plain:
+                self.enabled = False
+                break
+        with self.lock:
+            self.stats = self.empty_stats()
+        return self.enabled
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        stats["enabled"] = self.enabled
+        stats["acceptance_rate"] = (
+            round(stats["accepted"] / stats["drafted"], 3) if stats["drafted"] else None
+        )
+        stats["tokens_per_pass"] = (
+            round(stats["tokens"] / (stats["forward_passes"] + stats["generations"]), 2)
+            if stats["generations"]
+            else None
+        )
+        stats["tokens_per_second"] = (
+            round(stats["tokens"] / stats["decode_seconds"], 1)
+            if stats["decode_seconds"]
+            else None
+        )
+        stats["decode_seconds"] = round(stats["decode_seconds"], 2)
+        return stats
+
+
+class SmolVLMBackend:
+    """SmolVLM2 generation through HuggingFace transformers"""
+
+    def __init__(
+        self,
+        model_path: str = SMOLVLM_MODEL_ID,
+        compiled_decode: bool = COMPILED_DECODE,
+        prompt_lookup: bool = PROMPT_LOOKUP,
+    ):
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Using device for SmolVLM2: {self.device}")
+
+        # Load SmolVLM2 model
+        logger.info(f"Loading {model_path}...")
+
+        self.processor = AutoProcessor.from_pretrained(model_path)
+        self.model = load_pretrained(
+            AutoModelForImageTextToText,
+            model_path,
+            torch.bfloat16,
+            # FlashAttention needs CUDA; static caches and torch.compile use SDPA
+            attn_implementation=(
+                "flash_attention_2"
+                if self.device == "cuda" and not compiled_decode
+                else "sdpa"
+            ),
+            device_map="auto",
+        )
+
+        self.decoder = None
+        if compiled_decode:
+            buckets = [int(b) for b in STATIC_CACHE_BUCKETS.split(",") if b.strip()]
+            self.decoder = CompiledDecoder(self.model, buckets)
+        self.prompt_lookup = None
+        if prompt_lookup:
+            self.prompt_lookup = PromptLookupDecoder(
+                self.model, self.processor.tokenizer
+            )
+            self.check_prompt_lookup()
+
+    def warmup_decoder(self):
+        if self.decoder is not None:
+            self.decoder.warmup()
+
+    def check_prompt_lookup(self):
+        """Keep prompt lookup only if it matches greedy decoding in the model's dtype"""
+        start_time = time.time()
+        probes = [
+            self.prepare_inputs(
+                [{"role": "user", "content": [{"type": "text", "text": text}]}]
+            )
+            for text in PROMPT_LOOKUP_PARITY_PROBES
+        ]
+        if self.prompt_lookup.check_parity(probes):
+            logger.info(
+                f"🔍 Prompt lookup matches greedy decoding in {self.model.dtype} "
+                f"({time.time() - start_time:.2f}s)"
+            )
+        else:
+            logger.warning(
+                f"Prompt lookup changes greedy replies in {self.model.dtype}; "
+                "decoding without it"
+            )
+
+    def get_prompt_lookup_stats(self) -> Optional[dict]:
+        return self.prompt_lookup.get_stats() if self.prompt_lookup else None
+
+    def prepare_inputs(self, messages, image_encodings=None):
+        # Apply chat template
+        inputs = self.processor.apply_chat_template(
+            messages,
+            add_generation_prompt=True,
+            tokenize=True,
+            return_dict=True,
+            return_tensors="pt",
+        ).to(self.device, dtype=torch.bfloat16)
+
+        if image_encodings:
+            # Vision features were computed ahead of time; skip the vision encoder
+            inputs.pop("pixel_values", None)
+            inputs.pop("pixel_attention_mask", None)
+            inputs["image_hidden_states"] = torch.cat(image_encodings)
+        return inputs
+
+    @torch.inference_mode()
+    def encode_image(self, image):
+        """Vision encoder + connector output for one image, as used in generate"""
+        image_inputs = self.processor.image_processor([[image]], return_tensors="pt")
+        pixel_values = image_inputs["pixel_values"].to(
+            self.device, dtype=torch.bfloat16
+        )
+        pixel_values = pixel_values.view(-1, *pixel_values.shape[2:])
+
+        pixel_attention_mask = image_inputs.get("pixel_attention_mask")
+        if pixel_attention_mask is None:
+            pixel_attention_mask = torch.ones(
+                (pixel_values.shape[0], *pixel_values.shape[2:]), dtype=torch.bool
+            )
+        pixel_attention_mask = pixel_attention_mask.to(self.device)
+        pixel_attention_mask = pixel_attention_mask.view(
+            -1, *pixel_attention_mask.shape[-2:]
+        )
+
+        # Same patch mask the model derives internally from pixel_attention_mask
+        model = self.model.model
+        patch_size = model.config.vision_config.patch_size
+        patches = pixel_attention_mask.unfold(1, patch_size, patch_size)
+        patches = patches.unfold(2, patch_size, patch_size)
+        patch_attention_mask = (patches.sum(dim=(-1, -2)) > 0).bool()
+
+        image_hidden_states = model.vision_model(
+            pixel_values=pixel_values, patch_attention_mask=patch_attention_mask
+        ).last_hidden_state
+        return model.connector(image_hidden_states)
+
+    def count_vision_tokens(self, image_encoding):
+        # (patches, tokens per patch, hidden size)
+        return image_encoding.shape[0] * image_encoding.shape[1]
+
+    def create_streamer(self):
+        # Create a streamer for token-by-token generation
+        return TextIteratorStreamer(
+            tokenizer=self.processor.tokenizer,
+            skip_special_tokens=True,
+            skip_prompt=True,
+            clean_up_tokenization_spaces=False,
+        )
+
+    def generate(
+        self,
+        inputs,
+        streamer,
+        prefill_state=None,
+        stop_event=None,
+        reply_budget=None,
+        **generation_kwargs,
+    ):
+        stopping_criteria = StoppingCriteriaList()
+        if stop_event is not None:
+            stopping_criteria.append(StopOnEvent(stop_event))
+        if reply_budget is not None:
+            stopping_criteria.append(
+                StopOnReplyBudget(
+                    reply_budget,
+                    self.processor.tokenizer,
+                    inputs["input_ids"].shape[1],
+                )
+            )
+
+        max_new_tokens = generation_kwargs.get("max_new_tokens", 1200)
+        if (
+            self.prompt_lookup is not None
+            and self.prompt_lookup.enabled
+            and not generation_kwargs.get("do_sample")
+        ):
+            self.prompt_lookup.generate(
+                inputs,
+                streamer,
+                max_new_tokens,
+                stopping_criteria,
+                cache=prefill_state["cache"] if prefill_state else None,
+            )
+            return
+
+        if prefill_state is not None:
+            # Generation resumes after the cached prefix; the image tokens are
+            # already in the cache, so pixel values are not re-encoded
+            generation_kwargs["past_key_values"] = prefill_state["cache"]
+        if (
+            self.decoder is not None
+            and prefill_state is None
+            and not generation_kwargs.get("do_sample")
+            and self.decoder.bucket_for(inputs["input_ids"].shape[1] + max_new_tokens)
+        ):
+            self.decoder.generate(inputs, streamer, max_new_tokens, stopping_criteria)
+            return
+
+        if stopping_criteria:
+            generation_kwargs["stopping_criteria"] = stopping_criteria
+        self.model.generate(**inputs, streamer=streamer, **generation_kwargs)
+
+    @property
+    def generation_suffix_length(self) -> int:
+        """Template tokens after the user's text, plus a margin for retokenization"""
+        if not hasattr(self, "_generation_suffix_length"):
+            messages = [{"role": "user", "content": [{"type": "text", "text": "x"}]}]
+            prompt = self.processor.apply_chat_template(
+                messages, add_generation_prompt=True, tokenize=False
+            )
+            suffix = prompt[prompt.rindex("x") + 1 :]
+            suffix_ids = self.processor.tokenizer(suffix, add_special_tokens=False)
+            self._generation_suffix_length = len(suffix_ids["input_ids"]) + 2
+        return self._generation_suffix_length
+
+    @torch.inference_mode()
+    def prefill(self, inputs):
+        keep = inputs["input_ids"].shape[1] - self.generation_suffix_length
+        if keep <= 0:
+            return None
+
+        prefix_inputs = dict(inputs)
+        prefix_inputs["input_ids"] = inputs["input_ids"][:, :keep]
+        prefix_inputs["attention_mask"] = inputs["attention_mask"][:, :keep]
+        cache = DynamicCache()
+        self.model(**prefix_inputs, past_key_values=cache, use_cache=True)
+        return {"input_ids": prefix_inputs["input_ids"], "cache": cache}
+
+    def can_reuse_prefill(self, prefill_state, inputs):
+        prefix_ids = prefill_state["input_ids"][0]
+        input_ids = inputs["input_ids"][0]
+        return len(input_ids) > len(prefix_ids) and torch.equal(
+            input_ids[: len(prefix_ids)], prefix_ids
+        )
+
+
+class StubASRBackend:
+    """Deterministic ASR stand-in with synthetic latency (no weights)"""
+
+    def __init__(
+        self,
+        transcript: str = "What can you see in front of you?",
+        latency_ms: float = 50.0,
+        real_time_factor: float = 0.05,
+    ):
+        self.transcript = transcript
+        self.latency_ms = latency_ms
+        self.real_time_factor = real_time_factor
+
+    def transcribe(self, audio_array):
+        audio_seconds = len(audio_array) / 16000
+        time.sleep(self.latency_ms / 1000 + audio_seconds * self.real_time_factor)
+        return self.transcript
+
+
+class StubVLMBackend:
+    """Deterministic VLM stand-in emitting words at a fixed token rate (no weights)"""
+
+    reply_sentences = [
+        "I can see a person sitting in front of a computer screen.",
+        "The room looks bright, with a window on the left side.",
+        "There is a cup on the desk next to a keyboard.",
+        "Let me know if you want me to describe anything in more detail.",
+    ]
+
+    def __init__(
+        self,
+        prefill_ms: float = 80.0,
+        image_ms: float = 40.0,
+        tokens_per_second: float = 40.0,
+        reply_tokens: int = 60,
+    ):
+        self.prefill_ms = prefill_ms
+        self.image_ms = image_ms
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.vision_tokens = 64
+
+    def prepare_inputs(self, messages, image_encodings=None):
+        content = messages[-1]["content"]
+        num_images = sum(1 for c in content if c["type"] == "image")
+        return {
+            "text": " ".join(c["text"] for c in content if c["type"] == "text"),
+            # Images encoded ahead of time cost nothing at prefill
+            "num_images": num_images - len(image_encodings or []),
+        }
+
+    def encode_image(self, image):
+        time.sleep(self.image_ms / 1000)
+        return image.size
+
+    def count_vision_tokens(self, image_encoding):
+        return self.vision_tokens
+
+    def create_streamer(self):
+        return TextQueueStreamer()
+
+    def reply_words(self, text):
+        """Deterministic reply for a prompt, as a list of word tokens"""
+        words = f"You asked: {text.rstrip('?.!')}.".split()
+        sentence_index = 0
+        while len(words) < self.reply_tokens:
+            sentence = self.reply_sentences[sentence_index % len(self.reply_sentences)]
+            words.extend(sentence.split())
+            sentence_index += 1
+        return words[: self.reply_tokens]
+
+    def prefill_seconds(self, inputs) -> float:
+        return (self.prefill_ms + self.image_ms * inputs["num_images"]) / 1000
+
+    def prefill(self, inputs):
+        # The cached prefix covers all but the tail of the prompt
+        time.sleep(0.9 * self.prefill_seconds(inputs))
+        return {"text": inputs["text"]}
+
+    def can_reuse_prefill(self, prefill_state, inputs):
+        return inputs["text"].startswith(prefill_state["text"]) and len(
+            inputs["text"]
+        ) > len(prefill_state["text"])
+
+    def generate(
+        self,
+        inputs,
+        streamer,
+        prefill_state=None,
+        stop_event=None,
+        reply_budget=None,
+        **generation_kwargs,
+    ):
+        max_new_tokens = generation_kwargs.get("max_new_tokens", self.reply_tokens)
+        reply = ""
+        try:
+            prefill_seconds = self.prefill_seconds(inputs)
+            if prefill_state is not None:
+                prefill_seconds *= 0.1
+            time.sleep(prefill_seconds)
+            for i, word in enumerate(self.reply_words(inputs["text"])[:max_new_tokens]):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                time.sleep(1 / self.tokens_per_second)
+                text = word if i == 0 else " " + word
+                streamer.put(text)
+                reply += text
+                if reply_budget is not None and reply_budget.exhausted(reply):
+                    break
+        finally:
+            streamer.end()
+
+
+@dataclass
+class WordToken:
+    """Word token with timing, shaped like Kokoro's MToken"""
+
+    text: str
+    start_ts: Optional[float] = None
+    end_ts: Optional[float] = None
+
+
+@dataclass
+class SynthesisResult:
+    """Synthesis result shaped like KPipeline.Result"""
+
+    graphemes: str
+    phonemes: str
+    audio: torch.Tensor
+    tokens: List[WordToken]
+
+
+class StubTTSBackend:
+    """Deterministic TTS stand-in producing a quiet tone with word timings (no weights)"""
+
+    sample_rate = 24000
+
+    def __init__(
+        self,
+        latency_ms: float = 30.0,
+        real_time_factor: float = 0.1,
+        words_per_second: float = 2.5,
+    ):
+        self.latency_ms = latency_ms
+        self.real_time_factor = real_time_factor
+        self.words_per_second = words_per_second
+
+    def __call__(self, text, voice=None, speed=1, split_pattern=None):
+        segments = re.split(split_pattern, text.strip()) if split_pattern else [text]
+        for segment in segments:
+            words = segment.split()
+            if not words:
+                continue
+            word_seconds = 1 / (self.words_per_second * speed)
+            duration = len(words) * word_seconds
+            time.sleep(self.latency_ms / 1000 + duration * self.real_time_factor)
+
+            num_samples = int(duration * self.sample_rate)
+            t = torch.arange(num_samples, dtype=torch.float32) / self.sample_rate
+            audio = 0.05 * torch.sin(2 * torch.pi * 220.0 * t)
+            tokens = [
+                WordToken(word, i * word_seconds, (i + 1) * word_seconds)
+                for i, word in enumerate(words)
+            ]
+            yield SynthesisResult(
+                graphemes=segment, phonemes=segment, audio=audio, tokens=tokens
+            )
+
+
+# Chunks that replies often consist of on their own; cached whole at startup
+G2P_PREWARM_CHUNKS = [
+    "Hello!",
+    "Hi there!",
+    "Sure!",
+    "Sure.",
+    "Of course!",
+    "Okay.",
+    "Yes.",
+    "No.",
+    "Thanks!",
+    "Thank you!",
+    "You're welcome!",
+    "Great question!",
+    "Let me see.",
+    "I see.",
+    "How can I help you today?",
+    "Is there anything else I can help you with?",
+    "I'm not sure.",
+    "I don't know.",
+    "Goodbye!",
+]
+
+# Typical reply sentences; only their words are cached, in the contexts replies use
+G2P_PREWARM_TEXT = [
+    "I can see a person sitting at a desk in front of a computer screen.",
+    "In the image, there is a white cup on the table next to a black phone.",
+    "It looks like you are holding a book with a blue cover.",
+    "There are some people standing behind you, near the door on the left.",
+    "The room looks bright, and the light comes from a window on the right.",
+    "You are wearing a red shirt and sitting on a chair by the wall.",
+    "What would you like me to describe? I could tell you more about this.",
+    "These are green plants, and those look like pictures in the background.",
+    "He has his hand on the keyboard, and she is looking at her phone.",
+    "We can talk about it here if you want; just let me know.",
+]
+
+
+class CachedG2P:
+    """Memoizing wrapper around a KPipeline's G2P (text -> phonemes, tokens)
+
+    Replies rarely repeat a whole chunk, so most reuse is per word: the lexicon lookup
+    of each token is memoized under the token features it depends on (text, tag,
+    stress, number and currency flags, and the following word's context), and so is
+    the espeak fallback for words missing from the lexicon. spaCy still tags every new
+    chunk, since tags depend on the whole sentence. Whole chunks get an LRU too, for
+    openers such as "Sure!" that do repeat; KPipeline writes word timestamps into the
+    tokens, so every chunk hit hands out a copy.
+    """
+
+    def __init__(self, g2p, max_entries: int, max_words: int):
+        self.g2p = g2p
+        self.max_entries = max_entries
+        self.max_words = max_words
+        self.entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self.words: "OrderedDict[tuple, Tuple[Optional[str], Any]]" = OrderedDict()
+        self.lock = Lock()
+        self.stats = self.empty_stats()
+
+        # Languages without misaki's English lexicon or fallback keep the chunk cache
+        self.lexicon = getattr(g2p, "lexicon", None)
+        if self.lexicon is not None:
+            g2p.lexicon = self.cached_lexicon
+        self.fallback = getattr(g2p, "fallback", None)
+        if self.fallback is not None:
+            g2p.fallback = self.cached_fallback
+
+    @staticmethod
+    def empty_stats() -> dict:
+        return {
+            "hits": 0,
+            "misses": 0,
+            "word_hits": 0,
+            "word_misses": 0,
+            "miss_ms": 0.0,
+            "hit_ms": 0.0,
+        }
+
+    def __call__(self, text: str):
+        start_time = time.time()
+        with self.lock:
+            entry = self.entries.get(text)
+            if entry is not None:
+                self.entries.move_to_end(text)
+        if entry is not None:
+            phonemes, tokens = entry[0], copy.deepcopy(entry[1])
+            with self.lock:
+                self.stats["hits"] += 1
+                self.stats["hit_ms"] += 1000 * (time.time() - start_time)
+            return phonemes, tokens
+
+        phonemes, tokens = self.g2p(text)
+        entry = (phonemes, copy.deepcopy(tokens))
+        with self.lock:
+            self.stats["misses"] += 1
+            self.stats["miss_ms"] += 1000 * (time.time() - start_time)
+            self.entries[text] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return phonemes, tokens
+
+    def memoize(self, key: tuple, compute):
+        """Per-word LRU; results are (phonemes, rating) and never mutated by callers"""
+        with self.lock:
+            result = self.words.get(key)
+            if result is not None:
+                self.words.move_to_end(key)
+                self.stats["word_hits"] += 1
+                return result
+        result = compute()
+        with self.lock:
+            self.stats["word_misses"] += 1
+            self.words[key] = result
+            while len(self.words) > self.max_words:
+                self.words.popitem(last=False)
+        return result
+
+    def cached_lexicon(self, token, ctx):
+        extra = token._
+        key = (
+            "lexicon",
+            token.text,
+            token.tag,
+            extra.alias,
+            extra.currency,
+            extra.is_head,
+            extra.num_flags,
+            extra.stress,
+            ctx.future_vowel,
+            ctx.future_to,
+        )
+        return self.memoize(key, lambda: self.lexicon(token, ctx))
+
+    def cached_fallback(self, token):
+        return self.memoize(("fallback", token.text), lambda: self.fallback(token))
+
+    def prewarm(self, chunks: List[str], texts: List[str] = ()):
+        """Cache ``chunks`` whole and the words of ``texts`` (blocking)
+
+        Statistics start from zero afterwards, so they describe live traffic.
+        """
+        start_time = time.time()
+        for chunk in chunks:
+            self(chunk)
+        for text in texts:
+            self.g2p(text)
+        with self.lock:
+            self.stats = self.empty_stats()
+            words = len(self.words)
+        logger.info(
+            f"🔤 G2P cache prewarmed with {len(chunks)} chunks and {words} words "
+            f"in {time.time() - start_time:.2f}s"
+        )
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["words"] = len(self.words)
+        hit_ms, miss_ms = stats.pop("hit_ms"), stats.pop("miss_ms")
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        word_lookups = stats["word_hits"] + stats["word_misses"]
+        stats["word_hit_rate"] = (
+            stats["word_hits"] / word_lookups if word_lookups else None
+        )
+        stats["avg_hit_ms"] = (
+            round(hit_ms / stats["hits"], 3) if stats["hits"] else None
+        )
+        stats["avg_miss_ms"] = (
+            round(miss_ms / stats["misses"], 3) if stats["misses"] else None
+        )
+        return stats
+
+
+def g2p_prewarm_chunks() -> List[str]:
+    if G2P_PREWARM_FILE:
+        with open(G2P_PREWARM_FILE, encoding="utf-8") as prewarm_file:
+            return [line.strip() for line in prewarm_file if line.strip()]
+    return G2P_PREWARM_CHUNKS
+
+
+def cache_front_end(tts_pipeline: KPipeline) -> KPipeline:
+    """Put a prewarmed CachedG2P in front of a KPipeline's G2P"""
+    if G2P_CACHE_SIZE > 0:
+        tts_pipeline.g2p = CachedG2P(
+            tts_pipeline.g2p, G2P_CACHE_SIZE, G2P_WORD_CACHE_SIZE
+        )
+        tts_pipeline.g2p.prewarm(g2p_prewarm_chunks(), G2P_PREWARM_TEXT)
+    return tts_pipeline
+
+
+def export_kokoro_onnx(repo_id: str, path: Path):
+    """Export Kokoro's acoustic model (phoneme ids + voice style -> waveform, durations)"""
+    from kokoro.model import KModelForONNX
+
+    logger.info(f"Exporting {repo_id} to ONNX at {path}...")
+    # The complex-valued STFT has no ONNX equivalent
+    model = KModelForONNX(KModel(repo_id=repo_id, disable_complex=True)).eval()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    input_ids = torch.LongTensor([[0, *torch.randint(1, 100, (48,)).tolist(), 0]])
+    torch.onnx.export(
+        model,
+        (input_ids, torch.randn(1, 256), torch.ones(1)),
+        str(path),
+        input_names=["input_ids", "style", "speed"],
+        output_names=["waveform", "duration"],
+        dynamic_axes={
+            "input_ids": {1: "input_ids_len"},
+            "waveform": {0: "num_samples"},
+            "duration": {0: "input_ids_len"},
+        },
+        opset_version=17,
+        do_constant_folding=True,
+        dynamo=False,
+    )
+
+
+class KokoroONNXModel:
+    """Drop-in for KModel inside KPipeline, running the exported model in ONNX Runtime
+
+    KPipeline keeps doing G2P, chunking and word timestamps; only the acoustic model
+    call is replaced.
+    """
+
+    device = "cpu"
+
+    def __init__(
+        self, repo_id: str = KOKORO_REPO_ID, num_sessions: int = ONNX_SESSIONS
+    ):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+
+        with open(hf_hub_download(repo_id, "config.json"), encoding="utf-8") as f:
+            config = json.load(f)
+        self.vocab = config["vocab"]
+        self.context_length = config["plbert"]["max_position_embeddings"]
+
+        path = onnx_export_path(repo_id, ".onnx")
+        if not path.exists():
+            export_kokoro_onnx(repo_id, path)
+        self.sessions = InstancePool(
+            [
+                ort.InferenceSession(
+                    str(path),
+                    sess_options=onnx_session_options(cores),
+                    providers=["CPUExecutionProvider"],
+                )
+                for cores in onnx_core_sets(num_sessions)
+            ]
+        )
+
+    def __call__(
+        self, phonemes: str, ref_s: torch.Tensor, speed=1, return_output=False
+    ):
+        input_ids = [self.vocab[p] for p in phonemes if p in self.vocab]
+        if len(input_ids) + 2 > self.context_length:
+            raise ValueError(
+                f"{len(input_ids)} phonemes exceed Kokoro's context of "
+                f"{self.context_length - 2}"
+            )
+        inputs = {
+            "input_ids": np.array([[0, *input_ids, 0]], dtype=np.int64),
+            "style": ref_s.cpu().numpy().astype(np.float32),
+            "speed": np.array([speed], dtype=np.float32),
+        }
+        with self.sessions.checkout() as session:
+            waveform, duration = session.run(None, inputs)
+        audio = torch.from_numpy(waveform)
+        if not return_output:
+            return audio
+        return KModel.Output(audio=audio, pred_dur=torch.from_numpy(duration))
+
+
+def create_asr_backend(name: Optional[str] = None) -> ASRBackend:
+    """Create the configured ASR backend"""
+    name = name or ASR_BACKEND
+    if name == "whisper":
+        return WhisperBackend(WHISPER_MODEL_ID)
+    if name == "whisper-onnx":
+        return WhisperONNXBackend(WHISPER_MODEL_ID)
+    if name == "stub":
+        return StubASRBackend(
+            transcript=os.getenv(
+                "TALKMATE_STUB_TRANSCRIPT", "What can you see in front of you?"
+            ),
+            latency_ms=env_float("TALKMATE_STUB_ASR_LATENCY_MS", 50.0),
+            real_time_factor=env_float("TALKMATE_STUB_ASR_RTF", 0.05),
+        )
+    raise ValueError(f"Unknown ASR backend: {name}")
+
+
+def create_vlm_backend(name: Optional[str] = None) -> VLMBackend:
+    """Create the configured VLM backend"""
+    name = name or VLM_BACKEND
+    if name == "smolvlm":
+        return SmolVLMBackend(SMOLVLM_MODEL_ID)
+    if name == "stub":
+        return StubVLMBackend(
+            prefill_ms=env_float("TALKMATE_STUB_VLM_PREFILL_MS", 80.0),
+            image_ms=env_float("TALKMATE_STUB_VLM_IMAGE_MS", 40.0),
+            tokens_per_second=env_float("TALKMATE_STUB_VLM_TOKENS_PER_SEC", 40.0),
+            reply_tokens=env_int("TALKMATE_STUB_VLM_REPLY_TOKENS", 60),
+        )
+    raise ValueError(f"Unknown VLM backend: {name}")
+
+
+def create_tts_backend(name: Optional[str] = None) -> TTSBackend:
+    """Create the configured TTS backend"""
+    name = name or TTS_BACKEND
+    if name == "kokoro":
+        model = True
+        if MMAP_WEIGHTS and not torch.cuda.is_available():
+            try:
+                model = mmap_kokoro_model(KOKORO_REPO_ID)
+                logger.info(f"🗺️ Mapped {KOKORO_REPO_ID} weights")
+            except (OSError, ValueError, KeyError, RuntimeError) as e:
+                logger.warning(
+                    f"Cannot map {KOKORO_REPO_ID} weights, loading a copy: {e}"
+                )
+        return cache_front_end(
+            KPipeline(lang_code=KOKORO_LANG_CODE, repo_id=KOKORO_REPO_ID, model=model)
+        )
+    if name == "kokoro-onnx":
+        tts_pipeline = KPipeline(
+            lang_code=KOKORO_LANG_CODE, repo_id=KOKORO_REPO_ID, model=False
+        )
+        tts_pipeline.model = KokoroONNXModel(KOKORO_REPO_ID)
+        return cache_front_end(tts_pipeline)
+    if name == "stub":
+        return StubTTSBackend(
+            latency_ms=env_float("TALKMATE_STUB_TTS_LATENCY_MS", 30.0),
+            real_time_factor=env_float("TALKMATE_STUB_TTS_RTF", 0.1),
+            words_per_second=env_float("TALKMATE_STUB_TTS_WORDS_PER_SEC", 2.5),
+        )
+    raise ValueError(f"Unknown TTS backend: {name}")
+
+
+def parse_stage_allocation(value: str) -> Dict[str, int]:
+    """Parse a "stage=count,stage=count" setting into a dict"""
+    allocation = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        stage, _, count = item.partition("=")
+        allocation[stage.strip()] = int(count)
+    return allocation
+
+
+def share_array(array: np.ndarray):
+    """Copy an array into a new shared memory block.
+
+    Returns the block (the caller owns it and must unlink it) and a picklable handle.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    handle = {"name": shm.name, "shape": array.shape, "dtype": str(array.dtype)}
+    return shm, handle
+
+
+def read_shared_array(handle: dict, unlink: bool = False) -> np.ndarray:
+    """Copy an array out of a shared memory block, optionally unlinking it"""
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    try:
+        return np.ndarray(handle["shape"], dtype=handle["dtype"], buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+
+def pack_messages(messages: List[dict]):
+    """Replace PIL images in chat messages with shared memory handles"""
+    blocks = []
+    packed = []
+    for message in messages:
+        content = []
+        for item in message["content"]:
+            if item["type"] == "image" and isinstance(item.get("url"), Image.Image):
+                shm, handle = share_array(np.asarray(item["url"].convert("RGB")))
+                blocks.append(shm)
+                item = {"type": "image", "shared_image": handle}
+            content.append(item)
+        packed.append({**message, "content": content})
+    return packed, blocks
+
+
+def unpack_messages(messages: List[dict]) -> List[dict]:
+    """Rebuild PIL images from shared memory handles in chat messages"""
+    for message in messages:
+        for item in message["content"]:
+            if "shared_image" in item:
+                item["url"] = Image.fromarray(
+                    read_shared_array(item.pop("shared_image"))
+                )
+    return messages
+
+
+def stage_worker_main(stage: str, request_queue, response_queue, cancel_queue):
+    """Entry point of a stage worker process: serve model requests until told to stop"""
+    try:
+        backend = {
+            "asr": create_asr_backend,
+            "vlm": create_vlm_backend,
+            "tts": create_tts_backend,
+        }[stage]()
+    except Exception as e:
+        response_queue.put((0, "error", f"Error loading {stage} backend: {e}"))
+        return
+    response_queue.put((0, "ready", os.getpid()))
+
+    # Cancellations arrive on their own queue, as requests are served one at a time
+    stop_events: Dict[int, Event] = {}
+    stop_lock = Lock()
+
+    def listen_for_cancels():
+        while True:
+            request_id = cancel_queue.get()
+            if request_id is None:
+                return
+            with stop_lock:
+                stop_events.setdefault(request_id, Event()).set()
+
+    Thread(target=listen_for_cancels, daemon=True).start()
+
+    while True:
+        request = request_queue.get()
+        if request is None:
+            break
+        request_id, method, payload = request
+        try:
+            if method == "transcribe":
+                audio_array = read_shared_array(payload["audio"])
+                response_queue.put(
+                    (request_id, "result", backend.transcribe(audio_array))
+                )
+
+            elif method == "generate":
+                messages = unpack_messages(payload["messages"])
+                inputs = backend.prepare_inputs(messages)
+                streamer = backend.create_streamer()
+                with stop_lock:
+                    stop_event = stop_events.setdefault(request_id, Event())
+                thread = Thread(
+                    target=backend.generate,
+                    args=(inputs, streamer),
+                    kwargs={**payload["generation_kwargs"], "stop_event": stop_event},
+                )
+                thread.start()
+                for text in streamer:
+                    response_queue.put((request_id, "item", text))
+                thread.join()
+                with stop_lock:
+                    # Also drops events of cancels that came after their request ended
+                    for stale_id in [i for i in stop_events if i <= request_id]:
+                        del stop_events[stale_id]
+                response_queue.put((request_id, "end", None))
+
+            elif method == "synthesize":
+                for result in backend(**payload):
+                    shm, handle = share_array(
+                        result.audio.cpu().numpy().astype(np.float32)
+                    )
+                    # The parent unlinks the block once it has copied the audio out
+                    shm.close()
+                    tokens = [
+                        (token.text, token.start_ts, token.end_ts)
+                        for token in result.tokens
+                    ]
+                    response_queue.put(
+                        (
+                            request_id,
+                            "item",
+                            {
+                                "graphemes": result.graphemes,
+                                "phonemes": result.phonemes,
+                                "audio": handle,
+                                "tokens": tokens,
+                            },
+                        )
+                    )
+                response_queue.put((request_id, "end", None))
+
+            else:
+                raise ValueError(f"Unknown method: {method}")
+
+        except Exception as e:
+            response_queue.put((request_id, "error", str(e)))
+
+
+class StageWorker:
+    """One worker process hosting a model stage, with its request/response queues"""
+
+    def __init__(self, stage: str, context):
+        self.stage = stage
+        self.request_queue = context.Queue()
+        self.response_queue = context.Queue()
+        self.cancel_queue = context.Queue()
+        self.process = context.Process(
+            target=stage_worker_main,
+            args=(stage, self.request_queue, self.response_queue, self.cancel_queue),
+            name=f"talkmate-{stage}-worker",
+            daemon=True,
+        )
+        # request_id -> (future, on_item callback)
+        self.pending: Dict[int, tuple] = {}
+        self.pending_lock = Lock()
+        self.reader = None
+
+    def start(self):
+        self.process.start()
+
+    def wait_ready(self, timeout: Optional[float] = None):
+        """Wait until the worker's model is loaded (blocking)"""
+        request_id, kind, data = self.response_queue.get(timeout=timeout)
+        if kind != "ready":
+            self.process.join(timeout=5)
+            raise RuntimeError(data)
+        logger.info(f"{self.stage} worker ready (pid {data})")
+        self.reader = Thread(target=self.read_responses, daemon=True)
+        self.reader.start()
+
+    def send(self, request_id: int, method: str, payload: dict, on_item=None):
+        future = Future()
+        with self.pending_lock:
+            self.pending[request_id] = (future, on_item)
+        self.request_queue.put((request_id, method, payload))
+        return future
+
+    def cancel(self, request_id: int):
+        """Ask the worker to stop a request it is serving (generate only)"""
+        self.cancel_queue.put(request_id)
+
+    def read_responses(self):
+        """Dispatch responses to pending futures (runs in a background thread)"""
+        while True:
+            try:
+                request_id, kind, data = self.response_queue.get(timeout=1.0)
+            except Empty:
+                if not self.process.is_alive():
+                    self.fail_pending(f"{self.stage} worker exited")
+                    return
+                continue
+            except (EOFError, OSError):
+                self.fail_pending(f"{self.stage} worker connection lost")
+                return
+
+            with self.pending_lock:
+                entry = self.pending.get(request_id)
+                if entry and kind != "item":
+                    del self.pending[request_id]
+            if not entry:
+                continue
+
+            future, on_item = entry
+            if kind == "item":
+                on_item(data)
+            elif kind == "error":
+                future.set_exception(RuntimeError(data))
+            else:
+                future.set_result(data)
+
+    def fail_pending(self, reason: str):
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(reason))
+
+    def stop(self, timeout: float = 5.0):
+        if self.process.is_alive():
+            self.request_queue.put(None)
+            self.cancel_queue.put(None)
+            self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class StageWorkerPool:
+    """RPC client for a pool of worker processes hosting one model stage"""
+
+    pools: List["StageWorkerPool"] = []
+
+    def __init__(self, stage: str, num_workers: int = 1):
+        self.stage = stage
+        context = multiprocessing.get_context("spawn")
+        self.workers = [StageWorker(stage, context) for _ in range(num_workers)]
+        self.request_ids = itertools.count(1)
+        self.requests_sent = 0
+
+        logger.info(f"Starting {num_workers} {stage} worker process(es)...")
+        for worker in self.workers:
+            worker.start()
+        for worker in self.workers:
+            worker.wait_ready()
+        StageWorkerPool.pools.append(self)
+
+    def pick_worker(self) -> StageWorker:
+        """Least outstanding requests first"""
+        return min(self.workers, key=lambda worker: len(worker.pending))
+
+    def submit(self, method: str, payload: dict, on_item=None) -> Future:
+        """Send a request to the least busy worker; thread-safe"""
+        return self.submit_cancellable(method, payload, on_item)[0]
+
+    def submit_cancellable(
+        self, method: str, payload: dict, on_item=None
+    ) -> Tuple[Future, Callable[[], None]]:
+        """submit(), plus a function that asks the worker to stop the request"""
+        self.requests_sent += 1
+        worker = self.pick_worker()
+        request_id = next(self.request_ids)
+        future = worker.send(request_id, method, payload, on_item)
+        return future, lambda: worker.cancel(request_id)
+
+    async def call(self, method: str, payload: dict, on_item=None):
+        """Send a request and await its result"""
+        return await asyncio.wrap_future(self.submit(method, payload, on_item))
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+        if self in StageWorkerPool.pools:
+            StageWorkerPool.pools.remove(self)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": [
+                {
+                    "pid": worker.process.pid,
+                    "alive": worker.process.is_alive(),
+                    "outstanding": len(worker.pending),
+                    "memory": process_memory(worker.process.pid),
+                }
+                for worker in self.workers
+            ],
+            "requests_sent": self.requests_sent,
+        }
+
+    @classmethod
+    def shutdown_all(cls):
+        for pool in list(cls.pools):
+            pool.shutdown()
+
+
+class RemoteASRBackend:
+    """ASR backend proxy that transcribes in a stage worker process"""
+
+    def __init__(self, pool: StageWorkerPool):
+        self.pool = pool
+
+    def submit(self, audio_array) -> Future:
+        shm, handle = share_array(audio_array.astype(np.float32))
+        future = self.pool.submit("transcribe", {"audio": handle})
+
+        def release(_):
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(release)
+        return future
+
+    def transcribe(self, audio_array):
+        return self.submit(audio_array).result()
+
+    async def transcribe_async(self, audio_array):
+        return await asyncio.wrap_future(self.submit(audio_array))
+
+
+class RemoteVLMBackend:
+    """VLM backend proxy that generates in a stage worker process"""
+
+    def __init__(self, pool: StageWorkerPool):
+        self.pool = pool
+
+    def prepare_inputs(self, messages, image_encodings=None):
+        # Tokenization and image preprocessing happen in the worker
+        return messages
+
+    def create_streamer(self):
+        return TextQueueStreamer()
+
+    stop_poll_interval = 0.05  # seconds between checks of the stop event
+
+    def generate(self, inputs, streamer, stop_event=None, **generation_kwargs):
+        messages, blocks = pack_messages(inputs)
+        try:
+            future, cancel = self.pool.submit_cancellable(
+                "generate",
+                {"messages": messages, "generation_kwargs": generation_kwargs},
+                on_item=streamer.put,
+            )
+            # Events do not cross processes; relay a stop to the worker's own event
+            cancelled = False
+            while not wait_futures([future], timeout=self.stop_poll_interval).done:
+                if not cancelled and stop_event is not None and stop_event.is_set():
+                    cancel()
+                    cancelled = True
+            future.result()
+        finally:
+            streamer.end()
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+
+class RemoteTTSBackend:
+    """TTS backend proxy that synthesizes in a stage worker process"""
+
+    def __init__(self, pool: StageWorkerPool):
+        self.pool = pool
+
+    @staticmethod
+    def to_result(item: dict) -> SynthesisResult:
+        return SynthesisResult(
+            graphemes=item["graphemes"],
+            phonemes=item["phonemes"],
+            audio=torch.from_numpy(read_shared_array(item["audio"], unlink=True)),
+            tokens=[WordToken(*token) for token in item["tokens"]],
+        )
+
+    def submit(self, text, voice=None, speed=1, split_pattern=None):
+        items = []
+        payload = dict(text=text, voice=voice, speed=speed, split_pattern=split_pattern)
+        future = self.pool.submit("synthesize", payload, on_item=items.append)
+        return future, items
+
+    def __call__(self, text, voice=None, speed=1, split_pattern=None):
+        future, items = self.submit(text, voice, speed, split_pattern)
+        future.result()
+        return [self.to_result(item) for item in items]
+
+    async def synthesize_async(self, text, voice=None, speed=1, split_pattern=None):
+        future, items = self.submit(text, voice, speed, split_pattern)
+        await asyncio.wrap_future(future)
+        return [self.to_result(item) for item in items]
+
+
+def create_stage_backend(stage: str, name: Optional[str] = None):
+    """Create the backend for a stage, in a worker pool if one is configured"""
+    num_workers = parse_stage_allocation(STAGE_WORKERS).get(stage, 0)
+    if num_workers > 0:
+        if name is not None:
+            raise ValueError(
+                f"{stage} runs in worker processes, which use TALKMATE_{stage.upper()}_BACKEND"
+            )
+        pool = StageWorkerPool(stage, num_workers)
+        remote_cls = {
+            "asr": RemoteASRBackend,
+            "vlm": RemoteVLMBackend,
+            "tts": RemoteTTSBackend,
+        }[stage]
+        return remote_cls(pool)
+    return {
+        "asr": create_asr_backend,
+        "vlm": create_vlm_backend,
+        "tts": create_tts_backend,
+    }[stage](name)
+
+
+class StageExecutor:
+    """Thread pool for one in-process model stage, with its own torch thread budget
+
+    Keeps a long VLM generation from holding threads that ASR and TTS need, and
+    keeps the stages from oversubscribing the cores between them.
+    """
+
+    STAGE_WEIGHTS = {"asr": 1, "vlm": 2, "tts": 1}
+    UTILIZATION_WINDOW = 60.0  # seconds
+
+    executors: Dict[str, "StageExecutor"] = {}
+    executors_lock = Lock()
+
+    def __init__(self, stage: str, max_workers: int, intra_op_threads: int):
+        self.stage = stage
+        self.max_workers = max_workers
+        self.intra_op_threads = intra_op_threads
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"talkmate-{stage}",
+            initializer=self.init_thread,
+        )
+        self.lock = Lock()
+        self.queued = 0
+        self.running: Dict[int, float] = {}  # task id -> start time
+        self.completed = 0
+        self.failed = 0
+        self.task_ids = itertools.count()
+        # Busy seconds, exponentially decayed over the utilization window
+        self.busy_seconds = 0.0
+        self.busy_updated_at = time.time()
+
+    @classmethod
+    def get(cls, stage: str) -> "StageExecutor":
+        """The stage's executor; all of them are created on first use"""
+        with cls.executors_lock:
+            if not cls.executors:
+                cls.executors = cls.create_all()
+        return cls.executors[stage]
+
+    @classmethod
+    def create_all(cls) -> Dict[str, "StageExecutor"]:
+        # Multi-worker servers hand each process its share through OMP_NUM_THREADS
+        total_cores = int(os.getenv("OMP_NUM_THREADS") or os.cpu_count() or 1)
+        cores = parse_stage_allocation(STAGE_CORES)
+        unallocated = [stage for stage in cls.STAGE_WEIGHTS if stage not in cores]
+        remaining = max(0, total_cores - sum(cores.values()))
+        weight = sum(cls.STAGE_WEIGHTS[stage] for stage in unallocated)
+        for stage in unallocated:
+            cores[stage] = remaining * cls.STAGE_WEIGHTS[stage] // weight
+
+        if INTEROP_THREADS > 0:
+            try:
+                torch.set_num_interop_threads(INTEROP_THREADS)
+            except RuntimeError as e:
+                # Only possible before any inter-op work has started
+                logger.warning(f"Could not set inter-op threads: {e}")
+
+        executors = {}
+        concurrency = {
+            "asr": ASR_CONCURRENCY,
+            "vlm": VLM_CONCURRENCY,
+            "tts": TTS_CONCURRENCY,
+        }
+        for stage, stage_concurrency in concurrency.items():
+            stage_cores = max(1, cores[stage])
+            # 0 = unlimited admission; size the pool by cores instead
+            stage_concurrency = stage_concurrency or stage_cores
+            executors[stage] = cls(
+                stage,
+                max_workers=stage_concurrency + (1 if stage == "vlm" else 0),
+                intra_op_threads=max(1, stage_cores // stage_concurrency),
+            )
+            logger.info(
+                f"🧵 {stage} executor: {executors[stage].max_workers} threads, "
+                f"{executors[stage].intra_op_threads} intra-op threads each"
+            )
+        return executors
+
+    def init_thread(self):
+        # Querying first runs torch's lazy per-thread init, which would otherwise
+        # reset the budget to whatever another stage set last
+        torch.get_num_threads()
+        torch.set_num_threads(self.intra_op_threads)
+
+    def submit(self, fn, *args) -> Future:
+        with self.lock:
+            self.queued += 1
+        future = self.pool.submit(self.run_task, fn, *args)
+        future.add_done_callback(self.on_cancelled)
+        return future
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the stage's threads and await the result"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def run_task(self, fn, *args):
+        task_id = next(self.task_ids)
+        start_time = time.time()
+        with self.lock:
+            self.queued -= 1
+            self.running[task_id] = start_time
+        try:
+            capture = ProfileCapture.current
+            if capture is not None:
+                return capture.run_stage_task(self.stage, fn, *args)
+            return fn(*args)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                del self.running[task_id]
+                self.completed += 1
+                self.add_busy_time(time.time() - start_time)
+
+    def on_cancelled(self, future: Future):
+        # Cancelled while still queued; run_task never ran
+        if future.cancelled():
+            with self.lock:
+                self.queued -= 1
+
+    def add_busy_time(self, seconds: float):
+        now = time.time()
+        self.busy_seconds = self.decayed_busy_seconds(now) + seconds
+        self.busy_updated_at = now
+
+    def decayed_busy_seconds(self, now: float) -> float:
+        return self.busy_seconds * math.exp(
+            -(now - self.busy_updated_at) / self.UTILIZATION_WINDOW
+        )
+
+    def get_stats(self) -> dict:
+        now = time.time()
+        with self.lock:
+            busy = self.decayed_busy_seconds(now) + sum(
+                now - start for start in self.running.values()
+            )
+            return {
+                "threads": self.max_workers,
+                "intra_op_threads": self.intra_op_threads,
+                "queued": self.queued,
+                "running": len(self.running),
+                "completed": self.completed,
+                "failed": self.failed,
+                "utilization": round(
+                    min(1.0, busy / (self.UTILIZATION_WINDOW * self.max_workers)), 3
+                ),
+            }
+
+    @classmethod
+    def get_all_stats(cls) -> Dict[str, dict]:
+        return {
+            stage: executor.get_stats() for stage, executor in cls.executors.items()
+        }
 
 
 class WhisperProcessor:
     """Handles speech-to-text using Whisper model"""
 
     _instance = None
+    _instance_lock = Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
         return cls._instance
 
-    def __init__(self):
-        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        self.torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-
-        logger.info(f"Using device for Whisper: {self.device}")
-
-        # Load Whisper model
-        model_id = "openai/whisper-tiny"
-        logger.info(f"Loading {model_id}...")
-
-        self.model = AutoModelForSpeechSeq2Seq.from_pretrained(
-            model_id,
-            torch_dtype=self.torch_dtype,
-            low_cpu_mem_usage=True,
-            use_safetensors=True,
-        )
-        self.model.to(self.device)
-
-        self.processor = AutoProcessor.from_pretrained(model_id)
-
-        # Create pipeline
-        self.pipe = pipeline(
-            "automatic-speech-recognition",
-            model=self.model,
-            tokenizer=self.processor.tokenizer,
-            feature_extractor=self.processor.feature_extractor,
-            torch_dtype=self.torch_dtype,
-            device=self.device,
-        )
+    def __init__(self, backend: Optional[ASRBackend] = None):
+        self.backend = backend or create_stage_backend("asr")
 
         logger.info("Whisper model ready for transcription")
         self.transcription_count = 0
 
+    def warmup(self):
+        """Transcribe a canned one-second tone to initialize kernels (blocking)"""
+        t = np.arange(16000, dtype=np.float32) / 16000
+        audio_array = (0.1 * np.sin(2 * np.pi * 440.0 * t)).astype(np.float32)
+        self.backend.transcribe(audio_array)
+
     async def transcribe_audio(self, audio_bytes):
         """Transcribe audio bytes to text"""
         try:
@@ -165,12 +2737,16 @@ class WhisperProcessor:
                 np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
             )
 
-            # Run transcription in executor to avoid blocking
-            result = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.pipe(audio_array)
-            )
+            if hasattr(self.backend, "transcribe_async"):
+                # Out-of-process backend: await the worker directly
+                result = await self.backend.transcribe_async(audio_array)
+            else:
+                # Run transcription on the ASR threads to avoid blocking
+                result = await StageExecutor.get("asr").run(
+                    self.backend.transcribe, audio_array
+                )
 
-            transcribed_text = result["text"].strip()
+            transcribed_text = result.strip()
             self.transcription_count += 1
 
             logger.info(
@@ -193,40 +2769,310 @@ class WhisperProcessor:
             return None
 
 
+@dataclass
+class PreparedImage:
+    """A decoded, resized frame and, optionally, its precomputed vision features"""
+
+    image: Image.Image
+    encoding: Any = None
+    image_hash: Optional[int] = None
+    # Last time this scene was seen; refreshed while the camera shows the same scene
+    seen_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class Speculation:
+    """KV cache prefilled from a partial transcript, waiting for the final one"""
+
+    text: str
+    frame_hashes: Tuple[Optional[int], ...]
+    state: Any
+    prefill_ms: float
+    created_at: float
+
+
+def stable_transcript_prefix(text: str) -> str:
+    """Drop the last word of a partial transcript, which may still change"""
+    words = text.strip().split()
+    return " ".join(words[:-1])
+
+
+class FrameBuffer:
+    """Ring buffer of one session's recent keyframes, oldest first
+
+    Frames showing the same scene as the newest keyframe only refresh its timestamp,
+    so a static camera occupies a single slot and its vision encoding is reused.
+    """
+
+    def __init__(
+        self, capacity: int = FRAME_BUFFER_SIZE, max_age: float = FRAME_MAX_AGE
+    ):
+        self.frames: deque = deque(maxlen=capacity)
+        self.max_age = max_age
+        self.frames_seen = 0
+        self.keyframes = 0
+
+    @staticmethod
+    def merge(keyframe: PreparedImage, frame: PreparedImage) -> PreparedImage:
+        """The frame to keep for a scene seen twice: prefer one already encoded"""
+        if keyframe.encoding is None and frame.encoding is not None:
+            return frame
+        keyframe.seen_at = max(keyframe.seen_at, frame.seen_at)
+        return keyframe
+
+    def add(self, frame: PreparedImage) -> bool:
+        """Buffer a frame; returns whether it started a new keyframe"""
+        self.frames_seen += 1
+        if self.frames and same_scene(self.frames[-1].image_hash, frame.image_hash):
+            self.frames[-1] = self.merge(self.frames[-1], frame)
+            return False
+        self.frames.append(frame)
+        self.keyframes += 1
+        return True
+
+    def select(
+        self, max_frames: int, pending: Optional[PreparedImage] = None
+    ) -> List[PreparedImage]:
+        """Newest keyframes for a turn, oldest first, optionally ending with a frame
+        not buffered yet. The newest frame is always included, however old."""
+        frames = list(self.frames)
+        if pending is not None:
+            if frames and same_scene(frames[-1].image_hash, pending.image_hash):
+                frames[-1] = pending if frames[-1].encoding is None else frames[-1]
+            else:
+                frames.append(pending)
+        if not frames:
+            return []
+
+        newest = frames[-1]
+        cutoff = time.time() - self.max_age
+        older = [frame for frame in frames[:-1] if frame.seen_at >= cutoff]
+        return older[-(max_frames - 1) :] + [newest] if max_frames > 1 else [newest]
+
+    def encodings_cached(self) -> int:
+        return sum(1 for frame in self.frames if frame.encoding is not None)
+
+
+CLAUSE_END_PATTERN = re.compile(r"[.!?,;:][\"')\]]*\s*$")
+SENTENCE_END_PATTERN = re.compile(r"[.!?]")
+
+
+class ChunkPlan:
+    """Chunk boundaries for one reply, from the policy's current estimates"""
+
+    def __init__(
+        self, policy: "ChunkingPolicy", first_chars: int, growth: Optional[float]
+    ):
+        self.policy = policy
+        self.first_chars = first_chars
+        # None keeps the fixed 50/80 character schedule
+        self.growth = growth
+        self.chunks_emitted = 0
+        # Set while other clients wait for TTS: long chunks would hold them up
+        self.contended = False
+
+    def target_chars(self) -> int:
+        """Target length of the chunk being collected"""
+        if self.growth is None:
+            return 50 if self.chunks_emitted == 0 else 80
+        growth = self.growth ** (1 if self.contended else self.chunks_emitted)
+        return min(self.policy.max_chars, int(self.first_chars * growth))
+
+    def is_first_chunk_complete(self, text: str, chunk: str) -> bool:
+        if not self.policy.adaptive:
+            # Fixed heuristics: first sentence past 25 chars, or 50 chars at a comma
+            if SENTENCE_END_PATTERN.search(chunk) and len(text) >= 25:
+                return True
+            if len(text) >= 50 and (SENTENCE_END_PATTERN.search(text) or "," in text):
+                return True
+            return len(text) >= 100
+
+        # Shortest clause that covers producing the next chunk; a sentence that
+        # ends a little short is preferred over running on to the next clause
+        target = self.target_chars()
+        if CLAUSE_END_PATTERN.search(text) and (
+            len(text) >= target
+            or (len(text) >= target / 2 and SENTENCE_END_PATTERN.search(chunk))
+        ):
+            return True
+        return len(text) >= 2 * target
+
+    def is_chunk_complete(self, text: str) -> bool:
+        target = self.target_chars()
+        if len(text) >= target and (
+            text.endswith((".", "!", "?")) or "." in text[-15:]
+        ):
+            return True
+        # Without a sentence end, settle for a clause boundary past twice the target
+        return (
+            self.policy.adaptive
+            and len(text) >= 2 * target
+            and bool(CLAUSE_END_PATTERN.search(text))
+        )
+
+    def chunk_emitted(self):
+        self.chunks_emitted += 1
+
+
+class ChunkingPolicy:
+    """Sizes TTS text chunks from measured decode speed and TTS speed
+
+    Playback of the first chunk must last at least as long as generating and
+    synthesizing the second one, or the listener hears a gap. With the second
+    chunk ``growth`` times the first, and TTS time fitted as
+    ``overhead + rtf * audio_seconds``, that gives the minimum first chunk length.
+    Later chunks grow geometrically, since audio is buffered ahead by then and
+    fewer TTS calls cost less overhead.
+    """
+
+    # Estimates used until the first measurements arrive
+    prior_generation_cps = 100.0
+    prior_speech_cps = 15.0
+    prior_tts_overhead = 0.05
+    prior_tts_rtf = 0.3
+    # The first chunk delays the first audio, so it never exceeds the old hard cap
+    max_first_chars = 100
+    fallback_first_chars = 50
+
+    def __init__(
+        self,
+        adaptive: bool = ADAPTIVE_CHUNKING,
+        growth: float = CHUNK_GROWTH,
+        min_chars: int = CHUNK_MIN_CHARS,
+        max_chars: int = CHUNK_MAX_CHARS,
+        alpha: float = 0.2,
+    ):
+        self.adaptive = adaptive
+        self.growth = max(growth, 1.0)
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.alpha = alpha
+        # Decoded characters per second, and spoken characters per audio second
+        self.generation_cps: Optional[float] = None
+        self.speech_cps: Optional[float] = None
+        # Exponentially weighted sums for the TTS fit: weight, x, y, xx, xy
+        self.tts_sums = [0.0] * 5
+        self.last_first_chars: Optional[int] = None
+
+    def ewma(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return self.alpha * value + (1 - self.alpha) * current
+
+    def record_generation(self, chars: int, seconds: float):
+        """Decode speed, measured while nothing downstream is throttling the streamer"""
+        if chars > 0 and seconds > 0.05:
+            self.generation_cps = self.ewma(self.generation_cps, chars / seconds)
+
+    def record_tts(self, chars: int, audio_seconds: float, elapsed: float):
+        """One TTS call: text length, audio produced and wall time taken"""
+        if audio_seconds <= 0:
+            return
+        self.speech_cps = self.ewma(self.speech_cps, chars / audio_seconds)
+        decay = 1 - self.alpha
+        self.tts_sums = [
+            decay * total + value
+            for total, value in zip(
+                self.tts_sums,
+                (
+                    1.0,
+                    audio_seconds,
+                    elapsed,
+                    audio_seconds**2,
+                    audio_seconds * elapsed,
+                ),
+            )
+        ]
+
+    def tts_model(self):
+        """Fitted (overhead seconds, real-time factor) of the TTS stage"""
+        weight, sx, sy, sxx, sxy = self.tts_sums
+        if weight < 1e-6:
+            return self.prior_tts_overhead, self.prior_tts_rtf
+        mean_x, mean_y = sx / weight, sy / weight
+        variance = sxx / weight - mean_x**2
+        if weight < 2 or variance < 1e-3:
+            # Not enough spread in chunk lengths to separate overhead from RTF
+            overhead = min(self.prior_tts_overhead, mean_y)
+            return overhead, max((mean_y - overhead) / mean_x, 0.0)
+        rtf = max((sxy / weight - mean_x * mean_y) / variance, 0.0)
+        return max(mean_y - rtf * mean_x, 0.0), rtf
+
+    def first_chunk_chars(self):
+        """First chunk length and growth factor, or the fixed schedule's (50, None)"""
+        generation_cps = self.generation_cps or self.prior_generation_cps
+        speech_cps = self.speech_cps or self.prior_speech_cps
+        overhead, rtf = self.tts_model()
+
+        # Seconds of slack gained per character of the first chunk
+        for growth in (self.growth, 1.0):
+            slack = (1 - growth * rtf) / speech_cps - growth / generation_cps
+            if slack > 0:
+                chars = overhead / slack
+                return (
+                    int(min(max(chars, self.min_chars), self.max_first_chars)),
+                    growth,
+                )
+        # TTS or decoding cannot keep up with playback, so gaps are unavoidable and
+        # growing chunks would only lengthen them
+        return self.fallback_first_chars, None
+
+    def plan(self) -> ChunkPlan:
+        if self.adaptive:
+            first_chars, growth = self.first_chunk_chars()
+        else:
+            first_chars, growth = self.fallback_first_chars, None
+        self.last_first_chars = first_chars
+        return ChunkPlan(self, first_chars, growth)
+
+    def get_stats(self) -> dict:
+        overhead, rtf = self.tts_model()
+        return {
+            "adaptive": self.adaptive,
+            "generation_cps": (
+                round(self.generation_cps, 1) if self.generation_cps else None
+            ),
+            "speech_cps": round(self.speech_cps, 1) if self.speech_cps else None,
+            "tts_overhead_ms": round(overhead * 1000, 1),
+            "tts_real_time_factor": round(rtf, 3),
+            "first_chunk_chars": self.last_first_chars,
+        }
+
+
+chunking_policy = ChunkingPolicy()
+
+
 class SmolVLMProcessor:
     """Handles image + text processing using SmolVLM2 model"""
 
     _instance = None
+    _instance_lock = Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
         return cls._instance
 
-    def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device for SmolVLM2: {self.device}")
-
-        # Load SmolVLM2 model
-        model_path = "HuggingFaceTB/SmolVLM2-256M-Video-Instruct"
-        logger.info(f"Loading {model_path}...")
-
-        self.processor = AutoProcessor.from_pretrained(model_path)
-        self.model = AutoModelForImageTextToText.from_pretrained(
-            model_path,
-            torch_dtype=torch.bfloat16,
-            attn_implementation="flash_attention_2",
-            device_map="auto",
-        )
+    def __init__(self, backend: Optional[VLMBackend] = None):
+        self.backend = backend or create_stage_backend("vlm")
 
         logger.info("SmolVLM2 model ready for multimodal generation")
 
         # Cache for most recent image
         self.last_image = None
+        self.last_image_encoding = None
+        self.last_image_hash = None
         self.last_image_timestamp = 0
         self.lock = asyncio.Lock()
 
+        # Recent keyframes per session, for multi-frame context
+        self.frame_buffers: Dict[str, FrameBuffer] = {}
+        # Running generate() task per session and the event that stops it
+        self.generations: Dict[str, Tuple[Future, Event]] = {}
+        self.frame_stats = {"turns": 0, "frames_sent": 0, "frames_encoded": 0}
+
         # Message history management
         self.message_history = []
         self.max_history_messages = 4  # Keep last 4 exchanges
@@ -234,111 +3080,475 @@ class SmolVLMProcessor:
         # Counter
         self.generation_count = 0
 
-    async def set_image(self, image_data):
-        """Cache the most recent image received"""
+        # Speculative prefill per session; the epoch invalidates in-flight prefills
+        # once the session's final transcript has arrived
+        self.speculations: Dict[str, Speculation] = {}
+        self.speculation_epochs: Dict[str, int] = {}
+        self.speculation_stats = {
+            "prefills": 0,
+            "accepted": 0,
+            "rejected": 0,
+            "stale": 0,
+            "prefill_ms_saved": 0.0,
+        }
+
+    def warmup(self):
+        """Generate a few tokens for a canned image and prompt (blocking)"""
+        image = Image.new("RGB", (512, 384), "gray")
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "image", "url": image},
+                    {"type": "text", "text": "What do you see?"},
+                ],
+            },
+        ]
+        image_encodings = None
+        if hasattr(self.backend, "encode_image"):
+            image_encodings = [self.backend.encode_image(image)]
+        inputs = self.backend.prepare_inputs(messages, image_encodings)
+        streamer = self.backend.create_streamer()
+        self.backend.generate(inputs, streamer, do_sample=False, max_new_tokens=4)
+        for _ in streamer:
+            pass
+        if hasattr(self.backend, "warmup_decoder"):
+            self.backend.warmup_decoder()
+
+    async def prepare_image(
+        self, image_data: bytes, encode: bool = True
+    ) -> Optional[PreparedImage]:
+        """Decode, resize and optionally vision-encode an image in a worker thread.
+
+        Does not take the processor lock, so it can run while Whisper transcribes.
+        """
+
+        def prepare():
+            # Convert image data to PIL Image
+            image = Image.open(io.BytesIO(image_data))
+
+            # Resize to 75% of original size for efficiency
+            new_size = (int(image.size[0] * 0.75), int(image.size[1] * 0.75))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+            encoding = None
+            if encode and hasattr(self.backend, "encode_image"):
+                encoding = self.backend.encode_image(image)
+            return PreparedImage(
+                image=image, encoding=encoding, image_hash=perceptual_hash(image)
+            )
+
+        try:
+            return await StageExecutor.get("vlm").run(prepare)
+        except Exception as e:
+            logger.error(f"Error processing image: {e}")
+            return None
+
+    async def set_image(self, image_data, session_id: Optional[str] = None):
+        """Cache the most recent image received (raw bytes or a PreparedImage)
+
+        With a session id the frame also goes into that session's frame buffer.
+        """
+        if isinstance(image_data, PreparedImage):
+            prepared = image_data
+        else:
+            # Standalone frames may never be asked about, so skip the vision encoder
+            prepared = await self.prepare_image(image_data, encode=False)
+        if prepared is None:
+            return False
+
         async with self.lock:
-            try:
-                # Convert image data to PIL Image
-                image = Image.open(io.BytesIO(image_data))
-
-                # Resize to 75% of original size for efficiency
-                new_size = (int(image.size[0] * 0.75), int(image.size[1] * 0.75))
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-
-                # Clear message history when new image is set
-                self.message_history = []
-                self.last_image = image
-                self.last_image_timestamp = time.time()
-                logger.info("Image cached successfully")
-                return True
-            except Exception as e:
-                logger.error(f"Error processing image: {e}")
-                return False
+            if session_id is not None:
+                buffer = self.frame_buffers.get(session_id)
+                if buffer is None:
+                    buffer = self.frame_buffers[session_id] = FrameBuffer()
+                if buffer.add(prepared):
+                    logger.info(f"🎞️ New keyframe for {session_id}")
+            self.last_image = prepared.image
+            self.last_image_encoding = prepared.encoding
+            self.last_image_hash = prepared.image_hash
+            self.last_image_timestamp = time.time()
+            logger.info("Image cached successfully")
+            return True
+
+    @staticmethod
+    def build_messages(text, images=None):
+        """Single-turn chat messages for a prompt with optional images, oldest first"""
+        content = [{"type": "image", "url": image} for image in images or []]
+        if len(content) > 1:
+            text = f"These are {len(content)} camera frames, oldest first. {text}"
+        content.append({"type": "text", "text": text})
+        return [{"role": "user", "content": content}]
+
+    def frames_for_turn(
+        self, session_id: Optional[str] = None, pending: Optional[PreparedImage] = None
+    ) -> List[PreparedImage]:
+        """Frames a turn would show the model, oldest first, before the token cap.
+
+        Sessions that never sent an image fall back to the most recent image.
+        """
+        buffer = self.frame_buffers.get(session_id)
+        if buffer is not None:
+            return buffer.select(MAX_FRAMES_PER_TURN, pending)
+        if pending is not None:
+            return [pending]
+        if self.last_image is None:
+            return []
+        return [
+            PreparedImage(
+                image=self.last_image,
+                encoding=self.last_image_encoding,
+                image_hash=self.last_image_hash,
+                seen_at=self.last_image_timestamp,
+            )
+        ]
+
+    def encode_frames(self, frames: List[PreparedImage]) -> List[PreparedImage]:
+        """Vision-encode frames not encoded yet and apply the vision token cap (blocking)
+
+        Encodings are stored on the frames, so buffered frames are encoded once.
+        Older frames are dropped first; the newest frame is always kept.
+        """
+        if not frames or not hasattr(self.backend, "encode_image"):
+            return frames
+        for frame in frames:
+            if frame.encoding is None:
+                frame.encoding = self.backend.encode_image(frame.image)
+                self.frame_stats["frames_encoded"] += 1
+
+        if not hasattr(self.backend, "count_vision_tokens"):
+            return frames
+        selected = [frames[-1]]
+        tokens = self.backend.count_vision_tokens(frames[-1].encoding)
+        for frame in reversed(frames[:-1]):
+            tokens += self.backend.count_vision_tokens(frame.encoding)
+            if tokens > MAX_VISION_TOKENS:
+                break
+            selected.insert(0, frame)
+        return selected
+
+    async def context_frames(
+        self, session_id: Optional[str] = None, pending: Optional[PreparedImage] = None
+    ) -> List[PreparedImage]:
+        """Encoded frames to send with a turn, oldest first"""
+        frames = self.frames_for_turn(session_id, pending)
+        if not hasattr(self.backend, "encode_image") or all(
+            frame.encoding is not None for frame in frames
+        ):
+            # Nothing to encode; the token cap alone is cheap
+            return self.encode_frames(frames)
+        return await StageExecutor.get("vlm").run(self.encode_frames, frames)
+
+    @staticmethod
+    def frame_inputs(frames: List[PreparedImage]):
+        """Images and (all-or-nothing) precomputed encodings for build_messages"""
+        images = [frame.image for frame in frames]
+        if frames and all(frame.encoding is not None for frame in frames):
+            return images, [frame.encoding for frame in frames]
+        return images, None
+
+    def adopt_sessions(self, previous: "SmolVLMProcessor"):
+        """Carry sessions over from the instance this one replaces (hot reload).
+
+        Frames and conversation history move over; vision encodings and prefilled KV
+        caches came from the previous model and are left behind. Both instances share
+        the running generations, so a disconnect still stops one started on the
+        previous model, even after the swap.
+        """
+        self.generations = previous.generations
+        for session_id, old_buffer in previous.frame_buffers.items():
+            buffer = FrameBuffer(old_buffer.frames.maxlen, old_buffer.max_age)
+            buffer.frames.extend(
+                replace(frame, encoding=None) for frame in old_buffer.frames
+            )
+            buffer.frames_seen = old_buffer.frames_seen
+            buffer.keyframes = old_buffer.keyframes
+            self.frame_buffers[session_id] = buffer
+        self.message_history = list(previous.message_history)
+        self.last_image = previous.last_image
+        self.last_image_hash = previous.last_image_hash
+        self.last_image_timestamp = previous.last_image_timestamp
+        self.speculation_epochs = dict(previous.speculation_epochs)
+
+    def forget_generation(self, session_id: str, future: Future):
+        generation = self.generations.get(session_id)
+        if generation is not None and generation[0] is future:
+            del self.generations[session_id]
+
+    def stop_generation(self, session_id: str) -> Optional[Future]:
+        """Ask the session's running generation to stop; returns its future"""
+        generation = self.generations.get(session_id)
+        if generation is None:
+            return None
+        # A generation still queued for a thread stops at its first token
+        future, stop_event = generation
+        stop_event.set()
+        return future
+
+    def release_session(self, session_id: str) -> Optional[Future]:
+        """Drop a session's frames and speculative state and stop its generation.
+
+        Returns the generation future, if any, for the caller to join.
+        """
+        self.frame_buffers.pop(session_id, None)
+        self.release_speculation(session_id)
+        return self.stop_generation(session_id)
+
+    async def join_generation(self, session_id: str, future: Future):
+        """Wait for a stopped generation to finish"""
+        await asyncio.to_thread(wait_futures, [future], GENERATION_JOIN_TIMEOUT)
+        if not future.done():
+            logger.warning(f"Generation for {session_id} did not stop in time")
+
+    def session_ids(self) -> set:
+        return set(self.frame_buffers) | set(self.speculations)
+
+    def session_memory(self, session_id: str) -> Dict[str, int]:
+        """Bytes of model-side state cached for a session"""
+        buffer = self.frame_buffers.get(session_id)
+        frames = list(buffer.frames) if buffer else []
+        speculation = self.speculations.get(session_id)
+        return {
+            "frames": sum(image_bytes(frame.image) for frame in frames),
+            "encodings": sum(tensor_bytes(frame.encoding) for frame in frames),
+            "kv_cache": tensor_bytes(speculation.state) if speculation else 0,
+        }
+
+    def reclaim(self, session_ids: List[str], excess: int) -> int:
+        """Drop cached state, in the given session order, until ``excess`` bytes are
+        freed. Prefilled KV caches go first, then vision encodings, then all but each
+        session's newest frame. Returns the bytes freed."""
+        freed = 0
+        for level in ("kv_cache", "encodings", "frames"):
+            for session_id in session_ids:
+                if freed >= excess:
+                    return freed
+                freed += self.drop_session_cache(session_id, level)
+        return freed
+
+    def drop_session_cache(self, session_id: str, level: str) -> int:
+        if level == "kv_cache":
+            speculation = self.speculations.pop(session_id, None)
+            return tensor_bytes(speculation.state) if speculation else 0
+
+        buffer = self.frame_buffers.get(session_id)
+        if buffer is None:
+            return 0
+        freed = 0
+        if level == "encodings":
+            for frame in buffer.frames:
+                freed += tensor_bytes(frame.encoding)
+                frame.encoding = None
+        else:
+            while len(buffer.frames) > 1:
+                frame = buffer.frames.popleft()
+                freed += image_bytes(frame.image) + tensor_bytes(frame.encoding)
+        return freed
+
+    def get_frame_stats(self) -> dict:
+        buffers = list(self.frame_buffers.values())
+        stats = dict(self.frame_stats)
+        stats["sessions"] = len(buffers)
+        stats["frames_buffered"] = sum(len(buffer.frames) for buffer in buffers)
+        stats["encodings_cached"] = sum(buffer.encodings_cached() for buffer in buffers)
+        stats["frames_seen"] = sum(buffer.frames_seen for buffer in buffers)
+        stats["keyframes"] = sum(buffer.keyframes for buffer in buffers)
+        stats["avg_frames_per_turn"] = (
+            round(stats["frames_sent"] / stats["turns"], 2) if stats["turns"] else None
+        )
+        return stats
+
+    async def speculative_prefill(
+        self,
+        session_id: str,
+        partial_text: str,
+        prepared_image: Optional[PreparedImage] = None,
+    ) -> bool:
+        """Prefill the KV cache from a partial transcript before the user stops speaking"""
+        if not hasattr(self.backend, "prefill"):
+            return False
+        stable_text = stable_transcript_prefix(partial_text)
+        if len(stable_text) < SPECULATIVE_MIN_CHARS:
+            return False
+
+        epoch = self.speculation_epochs.get(session_id, 0)
+
+        def prefill():
+            images, image_encodings = self.frame_inputs(frames)
+            messages = self.build_messages(stable_text, images)
+            return self.backend.prefill(
+                self.backend.prepare_inputs(messages, image_encodings)
+            )
+
+        start_time = time.time()
+        try:
+            frames = await self.context_frames(session_id, prepared_image)
+            state = await StageExecutor.get("vlm").run(prefill)
+        except Exception as e:
+            logger.error(f"Speculative prefill error: {e}")
+            return False
+        if state is None:
+            return False
+        if self.speculation_epochs.get(session_id, 0) != epoch:
+            # The final transcript arrived while we were prefilling
+            self.speculation_stats["stale"] += 1
+            return False
+
+        self.speculations[session_id] = Speculation(
+            text=stable_text,
+            frame_hashes=tuple(frame.image_hash for frame in frames),
+            state=state,
+            prefill_ms=(time.time() - start_time) * 1000,
+            created_at=time.time(),
+        )
+        self.speculation_stats["prefills"] += 1
+        logger.info(f"⚡ Speculative prefill for {session_id}: '{stable_text}'")
+        return True
+
+    def take_speculation(
+        self, session_id: str, inputs, frames: List[PreparedImage]
+    ) -> Optional[Speculation]:
+        """Claim the session's speculation if the final prompt extends it"""
+        self.speculation_epochs[session_id] = (
+            self.speculation_epochs.get(session_id, 0) + 1
+        )
+        speculation = self.speculations.pop(session_id, None)
+        if speculation is None:
+            return None
 
-    async def process_text_with_image(self, text, initial_chunks=3):
+        if (
+            time.time() - speculation.created_at <= SPECULATIVE_MAX_AGE
+            and len(speculation.frame_hashes) == len(frames)
+            and all(
+                same_scene(image_hash, frame.image_hash)
+                for image_hash, frame in zip(speculation.frame_hashes, frames)
+            )
+            and self.backend.can_reuse_prefill(speculation.state, inputs)
+        ):
+            self.speculation_stats["accepted"] += 1
+            self.speculation_stats["prefill_ms_saved"] += speculation.prefill_ms
+            logger.info(
+                f"⚡ Reusing speculative prefill ({speculation.prefill_ms:.0f}ms saved)"
+            )
+            return speculation
+
+        self.speculation_stats["rejected"] += 1
+        logger.info("Speculative prefill discarded: final prompt diverged")
+        return None
+
+    def release_speculation(self, session_id: str):
+        """Drop a session's speculative state"""
+        self.speculations.pop(session_id, None)
+        self.speculation_epochs.pop(session_id, None)
+
+    def get_speculation_stats(self) -> dict:
+        stats = dict(self.speculation_stats)
+        decided = stats["accepted"] + stats["rejected"]
+        stats["acceptance_rate"] = stats["accepted"] / decided if decided else None
+        stats["prefill_ms_saved"] = round(stats["prefill_ms_saved"], 1)
+        return stats
+
+    def get_prompt_lookup_stats(self) -> Optional[dict]:
+        if hasattr(self.backend, "get_prompt_lookup_stats"):
+            return self.backend.get_prompt_lookup_stats()
+        return None
+
+    async def process_text_with_image(
+        self,
+        text,
+        initial_chunks=3,
+        session_id=None,
+        captions=None,
+        chunk_plan=None,
+        max_new_tokens=1200,
+        on_generation_end=None,
+        reply_budget: Optional[ReplyBudget] = None,
+    ):
         """Process text with image context using SmolVLM2"""
+        chunk_plan = chunk_plan or chunking_policy.plan()
         async with self.lock:
             try:
-                if not self.last_image:
-                    messages = [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": text},
-                            ],
-                        },
-                    ]
-                else:
-                    messages = [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "image", "url": self.last_image},
-                                {"type": "text", "text": text},
-                            ],
-                        },
-                    ]
-
-                # Apply chat template
-                inputs = self.processor.apply_chat_template(
-                    messages,
-                    add_generation_prompt=True,
-                    tokenize=True,
-                    return_dict=True,
-                    return_tensors="pt",
-                ).to(self.device, dtype=torch.bfloat16)
-
-                # Create a streamer for token-by-token generation
-                streamer = TextIteratorStreamer(
-                    tokenizer=self.processor.tokenizer,
-                    skip_special_tokens=True,
-                    skip_prompt=True,
-                    clean_up_tokenization_spaces=False,
-                )
+                frames = await self.context_frames(session_id)
+                self.frame_stats["turns"] += 1
+                self.frame_stats["frames_sent"] += len(frames)
+                images, image_encodings = self.frame_inputs(frames)
+                messages = self.build_messages(text, images)
+                inputs = self.backend.prepare_inputs(messages, image_encodings)
+                streamer = self.backend.create_streamer()
 
                 # Configure generation parameters
                 generation_kwargs = dict(
-                    **inputs,
                     do_sample=False,
-                    max_new_tokens=1200,
-                    streamer=streamer,
+                    max_new_tokens=max_new_tokens,
                 )
+                if reply_budget is not None:
+                    generation_kwargs["reply_budget"] = reply_budget
 
-                # Start generation in a separate thread
-                thread = Thread(target=self.model.generate, kwargs=generation_kwargs)
-                thread.start()
+                if session_id is not None and hasattr(self.backend, "prefill"):
+                    speculation = self.take_speculation(session_id, inputs, frames)
+                    if speculation:
+                        generation_kwargs["prefill_state"] = speculation.state
+
+                stop_event = Event()
+                generation_kwargs["stop_event"] = stop_event
+                loop = asyncio.get_running_loop()
+
+                # Bound now: the name is rebound to the async wrapper below, possibly
+                # before the executor gets to run this
+                def run_generation(streamer=streamer):
+                    try:
+                        self.backend.generate(inputs, streamer, **generation_kwargs)
+                    except Exception as e:
+                        logger.error(f"SmolVLM2 generation error: {e}")
+                        # Unblock the reader; not every backend ends the streamer on error
+                        streamer.end()
+                    finally:
+                        if on_generation_end is not None:
+                            try:
+                                loop.call_soon_threadsafe(on_generation_end)
+                            except RuntimeError:
+                                # Event loop already closed
+                                pass
+
+                # Start generation on the VLM threads
+                future = StageExecutor.get("vlm").submit(run_generation)
+                if session_id is not None:
+                    self.generations[session_id] = (future, stop_event)
+                    future.add_done_callback(
+                        lambda _: self.forget_generation(session_id, future)
+                    )
+
+                streamer = AsyncTextStreamer(
+                    streamer,
+                    on_text=captions.add if captions else None,
+                    on_end=captions.finish if captions else None,
+                )
 
                 # Collect initial text until we have a complete sentence or enough content
                 initial_text = ""
-                min_chars = 50  # Minimum characters to collect for initial chunk
-                sentence_end_pattern = re.compile(r"[.!?]")
-                has_sentence_end = False
                 initial_collection_stopped_early = False
+                first_chunk_at = None
 
-                # Collect the first sentence or minimum character count
-                for chunk in streamer:
+                # Collect the first clause, sized by the chunking plan
+                async for chunk in streamer:
+                    if first_chunk_at is None:
+                        first_chunk_at = time.time()
+                        first_chunk_length = len(chunk)
                     initial_text += chunk
                     logger.info(f"Streaming chunk: '{chunk}'")
 
-                    # Check if we have a sentence end
-                    if sentence_end_pattern.search(chunk):
-                        has_sentence_end = True
-                        # If we have at least some content, break after sentence end
-                        if len(initial_text) >= min_chars / 2:
-                            initial_collection_stopped_early = True
-                            break
-
-                    # If we have enough content, break
-                    if len(initial_text) >= min_chars and (
-                        has_sentence_end or "," in initial_text
-                    ):
+                    if chunk_plan.is_first_chunk_complete(initial_text, chunk):
                         initial_collection_stopped_early = True
                         break
 
-                    # Safety check - if we've collected a lot of text without sentence end
-                    if len(initial_text) >= min_chars * 2:
-                        initial_collection_stopped_early = True
-                        break
+                # Nothing downstream reads slower than decoding yet, so this
+                # measures the model's own token rate
+                if first_chunk_at is not None:
+                    chunking_policy.record_generation(
+                        len(initial_text) - first_chunk_length,
+                        time.time() - first_chunk_at,
+                    )
+                chunk_plan.chunk_emitted()
 
                 # Return initial text and the streamer for continued generation
                 self.generation_count += 1
@@ -356,6 +3566,13 @@ class SmolVLMProcessor:
                 logger.error(f"SmolVLM2 streaming generation error: {e}")
                 return None, f"Error processing: {text}", False
 
+    @staticmethod
+    def context_fingerprint(frames: List[PreparedImage]) -> str:
+        """Short hash of the earlier frames a reply is conditioned on, besides the
+        newest one. Chat history is not part of the prompt, so it is left out."""
+        earlier = json.dumps([frame.image_hash for frame in frames[:-1]])
+        return hashlib.sha1(earlier.encode("utf-8")).hexdigest()[:16]
+
     def update_history_with_complete_response(
         self, user_text, initial_response, remaining_text=None
     ):
@@ -383,18 +3600,20 @@ class KokoroTTSProcessor:
     """Handles text-to-speech conversion using Kokoro model"""
 
     _instance = None
+    _instance_lock = Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, backend: Optional[TTSBackend] = None):
         logger.info("Initializing Kokoro TTS processor...")
         try:
             # Initialize Kokoro TTS pipeline
-            self.pipeline = KPipeline(lang_code="a")
+            self.pipeline = backend or create_stage_backend("tts")
 
             # Set voice
             self.default_voice = "af_sarah"
@@ -406,6 +3625,20 @@ class KokoroTTSProcessor:
             logger.error(f"Error initializing Kokoro TTS: {e}")
             self.pipeline = None
 
+    def warmup(self):
+        """Synthesize a canned sentence to load the voice and kernels (blocking)"""
+        if not self.pipeline:
+            return
+        for _ in self.pipeline(
+            "Hello! I am ready.", voice=self.default_voice, speed=1, split_pattern=None
+        ):
+            pass
+
+    def get_front_end_stats(self) -> Optional[dict]:
+        """G2P cache stats; None without a cache (stub, worker process, disabled)"""
+        g2p = getattr(self.pipeline, "g2p", None)
+        return g2p.get_stats() if isinstance(g2p, CachedG2P) else None
+
     async def synthesize_initial_speech_with_timing(self, text):
         """Convert initial text to speech using Kokoro TTS data"""
         if not text or not self.pipeline:
@@ -419,16 +3652,24 @@ class KokoroTTSProcessor:
             all_word_timings = []
             time_offset = 0  # Track cumulative time for multiple segments
 
-            # Use the executor to run the TTS pipeline with minimal splitting
-            generator = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.pipeline(
-                    text,
-                    voice=self.default_voice,
-                    speed=1,
-                    split_pattern=None,  # No splitting for initial text to process faster
-                ),
-            )
+            if hasattr(self.pipeline, "synthesize_async"):
+                # Out-of-process backend: await the worker directly
+                generator = await self.pipeline.synthesize_async(
+                    text, voice=self.default_voice, speed=1, split_pattern=None
+                )
+            else:
+                # Run the TTS pipeline on the TTS threads with minimal splitting
+                generator = await StageExecutor.get("tts").run(
+                    # KPipeline yields lazily; run the synthesis itself off the loop
+                    lambda: list(
+                        self.pipeline(
+                            text,
+                            voice=self.default_voice,
+                            speed=1,
+                            split_pattern=None,  # No splitting for initial text to process faster
+                        )
+                    ),
+                )
 
             # Process all generated segments and extract NATIVE timing
             for i, result in enumerate(generator):
@@ -506,13 +3747,24 @@ class KokoroTTSProcessor:
             else:
                 split_pattern = r"[.!?。！？]+"
 
-            # Use the executor to run the TTS pipeline with optimized splitting
-            generator = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.pipeline(
+            if hasattr(self.pipeline, "synthesize_async"):
+                # Out-of-process backend: await the worker directly
+                generator = await self.pipeline.synthesize_async(
                     text, voice=self.default_voice, speed=1, split_pattern=split_pattern
-                ),
-            )
+                )
+            else:
+                # Run the TTS pipeline on the TTS threads with optimized splitting
+                generator = await StageExecutor.get("tts").run(
+                    # KPipeline yields lazily; run the synthesis itself off the loop
+                    lambda: list(
+                        self.pipeline(
+                            text,
+                            voice=self.default_voice,
+                            speed=1,
+                            split_pattern=split_pattern,
+                        )
+                    ),
+                )
 
             # Process all generated segments and extract NATIVE timing
             for i, result in enumerate(generator):
@@ -570,12 +3822,127 @@ class KokoroTTSProcessor:
             return None, []
 
 
-async def collect_remaining_text(streamer, chunk_size=80):
+class AsyncTextStreamer:
+    """Async view of a blocking text streamer, fed by a pump thread
+
+    Reading the streamer on the event loop would stall it, and reading it through
+    the default executor would tie up a pool thread for the whole generation.
+    Optional callbacks see the text as soon as it is decoded, whatever pace the
+    pipeline reads it at.
+    """
+
+    def __init__(self, streamer, on_text=None, on_end=None):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.on_text = on_text
+        self.on_end = on_end
+        self.finished = False
+        Thread(target=self.pump, args=(streamer,), daemon=True).start()
+
+    def deliver(self, chunk: Optional[str]):
+        self.queue.put_nowait(chunk)
+        if chunk is None:
+            if self.on_end:
+                self.on_end()
+        elif self.on_text:
+            self.on_text(chunk)
+
+    def pump(self, streamer):
+        try:
+            for chunk in streamer:
+                self.loop.call_soon_threadsafe(self.deliver, chunk)
+        except Exception as e:
+            logger.error(f"Text stream error: {e}")
+        finally:
+            try:
+                self.loop.call_soon_threadsafe(self.deliver, None)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self.finished:
+            raise StopAsyncIteration
+        chunk = await self.queue.get()
+        if chunk is None:
+            self.finished = True
+            raise StopAsyncIteration
+        return chunk
+
+
+class CaptionBuffer:
+    """Coalesces transcript and reply text into at most one frame per interval"""
+
+    def __init__(self, websocket: WebSocket, turn_id: int):
+        self.websocket = websocket
+        self.turn_id = turn_id
+        self.interval = CAPTION_INTERVAL_MS / 1000
+        self.pending = ""
+        self.flush_task: Optional[asyncio.Task] = None
+        self.send_lock = asyncio.Lock()
+        self.finished = False
+        self.final_sent = False
+        self.closed = False
+
+    async def send(self, message: dict):
+        async with self.send_lock:
+            await self.websocket.send_text(
+                json.dumps({**message, "turn_id": self.turn_id})
+            )
+        manager.update_stats("caption_frames_sent")
+
+    async def send_transcript(self, text: str):
+        await self.send({"type": "transcript", "text": text})
+
+    def add(self, text: str):
+        """Queue reply text; it goes out with the next flush"""
+        if self.closed or self.finished:
+            return
+        self.pending += text
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_after(self.interval))
+
+    def finish(self):
+        """Flush what is left right away and mark the reply complete"""
+        if self.closed or self.finished:
+            return
+        self.finished = True
+        asyncio.create_task(self.flush_after(0))
+
+    def discard(self):
+        """Drop unsent text of an interrupted turn"""
+        self.closed = True
+        self.pending = ""
+
+    async def flush_after(self, delay: float):
+        await asyncio.sleep(delay)
+        if delay:
+            self.flush_task = None
+        if self.closed:
+            return
+
+        text, self.pending = self.pending, ""
+        final = self.finished and not self.final_sent
+        if not text and not final:
+            return
+        if final:
+            self.final_sent = True
+        try:
+            await self.send({"type": "caption", "text": text, "final": final})
+        except Exception as e:
+            logger.debug(f"Caption send failed: {e}")
+
+
+async def collect_remaining_text(streamer, chunk_size=80, chunk_plan=None):
     """Collect remaining text from the streamer in smaller chunks
 
     Args:
         streamer: The text streamer object
         chunk_size: Maximum characters per chunk before yielding
+        chunk_plan: Optional ChunkPlan deciding chunk sizes instead of chunk_size
 
     Yields:
         Text chunks as they become available
@@ -584,34 +3951,499 @@ async def collect_remaining_text(streamer, chunk_size=80):
 
     if streamer:
         try:
-            for chunk in streamer:
+            async for chunk in streamer:
                 current_chunk += chunk
                 logger.info(f"Collecting remaining text chunk: '{chunk}'")
 
                 # Check if we've reached a good breaking point (sentence end)
-                if len(current_chunk) >= chunk_size and (
-                    current_chunk.endswith(".")
-                    or current_chunk.endswith("!")
-                    or current_chunk.endswith("?")
-                    or "." in current_chunk[-15:]
-                ):
+                if chunk_plan:
+                    complete = chunk_plan.is_chunk_complete(current_chunk)
+                else:
+                    complete = len(current_chunk) >= chunk_size and (
+                        current_chunk.endswith(".")
+                        or current_chunk.endswith("!")
+                        or current_chunk.endswith("?")
+                        or "." in current_chunk[-15:]
+                    )
+                if complete:
                     logger.info(f"Yielding text chunk of length {len(current_chunk)}")
+                    if chunk_plan:
+                        chunk_plan.chunk_emitted()
                     yield current_chunk
                     current_chunk = ""
 
-            # Yield any remaining text
-            if current_chunk:
-                logger.info(f"Yielding final text chunk of length {len(current_chunk)}")
-                yield current_chunk
+            # Yield any remaining text
+            if current_chunk:
+                logger.info(f"Yielding final text chunk of length {len(current_chunk)}")
+                yield current_chunk
+
+        except asyncio.CancelledError:
+            # If there's text collected before cancellation, yield it
+            if current_chunk:
+                logger.info(
+                    f"Yielding partial text chunk before cancellation: {len(current_chunk)} chars"
+                )
+                yield current_chunk
+            raise
+
+
+def normalize_transcript(text: str) -> str:
+    """Case- and punctuation-insensitive form of a transcript"""
+    text = re.sub(r"[^\w\s']", " ", text.lower())
+    return " ".join(text.split())
+
+
+@dataclass
+class CachedResponse:
+    """A complete reply: its text and the audio messages sent for it"""
+
+    text: str
+    messages: List[dict]
+    image_hash: Optional[int]
+    size_bytes: int
+    created_at: float
+
+
+class ResponseCache:
+    """LRU cache of complete replies, bounded by age and by size in bytes
+
+    Replies are keyed by the normalized transcript, the conversation history
+    fingerprint and the generation budget. Frames only need to match up to the
+    scene hash threshold, so the same static scene hits despite camera noise.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_MB * 1024 * 1024,
+        ttl: float = RESPONSE_CACHE_TTL,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        # Image hashes cached under each key, for the near-duplicate lookup
+        self.image_hashes: Dict[tuple, List[Optional[int]]] = {}
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        transcript: str,
+        context_fingerprint: str,
+        max_new_tokens: int,
+        reply_budget: Optional[ReplyBudget] = None,
+    ):
+        limits = (
+            (reply_budget.max_sentences, reply_budget.max_speech_seconds)
+            if reply_budget
+            else None
+        )
+        return (
+            normalize_transcript(transcript),
+            context_fingerprint,
+            max_new_tokens,
+            limits,
+        )
+
+    def get(self, key: tuple, image_hash: Optional[int]) -> Optional[CachedResponse]:
+        for cached_hash in list(self.image_hashes.get(key, [])):
+            if not same_scene(cached_hash, image_hash):
+                continue
+            entry = self.entries[(key, cached_hash)]
+            if time.time() - entry.created_at > self.ttl:
+                self.remove((key, cached_hash))
+                continue
+            self.entries.move_to_end((key, cached_hash))
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(
+        self, key: tuple, image_hash: Optional[int], text: str, messages: List[dict]
+    ):
+        size_bytes = len(text) + sum(len(json.dumps(m)) for m in messages)
+        if size_bytes > self.max_bytes:
+            return
+        if (key, image_hash) in self.entries:
+            self.remove((key, image_hash))
+        self.entries[(key, image_hash)] = CachedResponse(
+            text=text,
+            messages=messages,
+            image_hash=image_hash,
+            size_bytes=size_bytes,
+            created_at=time.time(),
+        )
+        self.image_hashes.setdefault(key, []).append(image_hash)
+        self.size_bytes += size_bytes
+        while self.size_bytes > self.max_bytes:
+            self.remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def remove(self, entry_key: tuple):
+        entry = self.entries.pop(entry_key)
+        self.size_bytes -= entry.size_bytes
+        key, image_hash = entry_key
+        self.image_hashes[key].remove(image_hash)
+        if not self.image_hashes[key]:
+            del self.image_hashes[key]
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "size_mb": round(self.size_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+class AdmissionRejected(Exception):
+    """Raised when a stage's wait queue is full"""
+
+    def __init__(self, stage: str, retry_after_ms: int, reason: str = "busy"):
+        super().__init__(f"{stage} is {reason}, retry in {retry_after_ms} ms")
+        self.stage = stage
+        self.retry_after_ms = retry_after_ms
+        self.reason = reason
+
+    def to_message(self) -> dict:
+        return {
+            "type": "busy",
+            "stage": self.stage,
+            "retry_after_ms": self.retry_after_ms,
+            "reason": self.reason,
+        }
+
+
+def parse_client_settings(value: str, cast=float) -> Dict[str, Any]:
+    """Parse a "client_id=value,..." setting into a dict"""
+    settings = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        client_id, _, setting = item.partition("=")
+        settings[client_id.strip()] = cast(setting)
+    return settings
+
+
+def parse_client_weights(value: str) -> Dict[str, float]:
+    """Parse TALKMATE_CLIENT_WEIGHTS; a weight must be a positive, finite number"""
+    weights = parse_client_settings(value)
+    for client_id, weight in weights.items():
+        # A zero weight would divide by zero and a negative one invert the ordering
+        if not 0 < weight < float("inf"):
+            raise ValueError(
+                f"TALKMATE_CLIENT_WEIGHTS: weight for {client_id!r} must be a "
+                f"positive number, got {weight}"
+            )
+    return weights
+
+
+class ClientShare:
+    """One client's standing in a stage's fair-share scheduler"""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        # Seconds of stage time the client may still use this round; negative is debt
+        self.deficit = 0.0
+        self.waiters: deque = deque()
+        # Hold time charged up front for each slot the client currently holds
+        self.pending_charges: deque = deque()
+        self.hold_ewma: Optional[float] = None
+        self.held_seconds = 0.0
+        self.idle_since = time.time()
+
+
+class StageGate:
+    """Concurrency limit for one pipeline stage, shared fairly between clients
+
+    Waiting requests are granted by deficit round-robin keyed by client id. Each
+    round credits every waiting client ``quantum * weight`` seconds of stage time.
+    A grant charges the client's expected hold time, corrected on release with the
+    time actually held, so a client that just held the stage for a long answer is
+    in debt and waits behind clients that did not. Debt halves every
+    ``debt_half_life`` seconds the client is idle.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        weight_for=None,
+        quantum: float = FAIR_QUANTUM_MS / 1000,
+        debt_half_life: float = FAIR_DEBT_HALF_LIFE,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.weight_for = weight_for or (lambda client_id: 1.0)
+        self.quantum = quantum
+        self.debt_half_life = debt_half_life
+        self.active = 0
+        self.shares: Dict[str, ClientShare] = {}
+        # Clients with waiting requests, in round-robin order
+        self.ring: deque = deque()
+        self.queue_depth = 0
+        # Smoothed time a request holds the stage, in seconds
+        self.latency_ewma: Optional[float] = None
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_concurrency <= 0
+
+    def has_capacity(self) -> bool:
+        return self.unlimited or self.active < self.max_concurrency
+
+    def is_full(self) -> bool:
+        return not self.has_capacity() and self.queue_depth >= self.max_queue
+
+    def retry_after_ms(self) -> int:
+        """Expected time until a new request would get a slot"""
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        concurrency = max(self.max_concurrency, 1)
+        return int(1000 * latency * (self.queue_depth + 1) / concurrency)
+
+    def reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self.name, self.retry_after_ms())
+
+    def share(self, client_id: str) -> ClientShare:
+        if client_id not in self.shares:
+            self.shares[client_id] = ClientShare(self.weight_for(client_id))
+        return self.shares[client_id]
+
+    def expected_cost(self, share: ClientShare) -> float:
+        """Seconds the client's next request is expected to hold the stage
+
+        Clients without history are expected to be cheap, so a new client is not
+        queued behind the turns of clients already known to be heavy.
+        """
+        return share.hold_ewma or 0.0
+
+    def grant(self, share: ClientShare, charge: bool = True):
+        estimate = self.expected_cost(share) if charge else 0.0
+        share.deficit -= estimate
+        share.pending_charges.append(estimate)
+        self.active += 1
+        self.admitted += 1
+
+    def enqueue(self, client_id: str, share: ClientShare, waiter: asyncio.Future):
+        if not share.waiters:
+            # Credit left over from an earlier busy period is not banked, debt fades
+            idle = time.time() - share.idle_since
+            share.deficit = min(
+                share.deficit * 0.5 ** (idle / self.debt_half_life), 0.0
+            )
+            self.ring.append(client_id)
+        share.waiters.append(waiter)
+        self.queue_depth += 1
+
+    def dequeue(self, client_id: str, share: ClientShare, waiter: asyncio.Future):
+        share.waiters.remove(waiter)
+        self.queue_depth -= 1
+        if not share.waiters:
+            self.ring.remove(client_id)
+            share.idle_since = time.time()
+
+    def dispatch(self):
+        """Hand free slots to waiting clients in deficit round-robin order"""
+        while self.ring and self.has_capacity():
+            # The first client, in round-robin order, whose credit covers its request
+            for _ in range(len(self.ring)):
+                share = self.shares[self.ring[0]]
+                if share.deficit >= self.expected_cost(share):
+                    break
+                self.ring.rotate(-1)
+            else:
+                # Nobody can afford a request yet: run as many crediting rounds as
+                # it takes for the first client to catch up
+                rounds = min(
+                    math.ceil(
+                        (self.expected_cost(self.shares[c]) - self.shares[c].deficit)
+                        / (self.quantum * self.shares[c].weight)
+                    )
+                    for c in self.ring
+                )
+                for c in self.ring:
+                    self.shares[c].deficit += (
+                        rounds * self.quantum * self.shares[c].weight
+                    )
+                continue
+
+            client_id = self.ring[0]
+            waiter = share.waiters[0]
+            self.dequeue(client_id, share, waiter)
+            if client_id in self.ring:
+                self.ring.rotate(-1)
+            if waiter.done():
+                # Cancelled while waiting
+                continue
+            self.grant(share)
+            waiter.set_result(None)
+
+    def try_acquire(self, client_id: str) -> bool:
+        """Take a slot only if one is free right now (for optional work)
+
+        Such work only uses idle capacity, so it is not charged to the client
+        when released without a hold time.
+        """
+        if self.has_capacity() and not self.ring:
+            self.grant(self.share(client_id), charge=False)
+            return True
+        return False
+
+    async def acquire(self, client_id: str):
+        share = self.share(client_id)
+        if self.has_capacity() and not self.ring:
+            self.grant(share)
+            return
+        if self.queue_depth >= self.max_queue:
+            raise self.reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.enqueue(client_id, share, waiter)
+        try:
+            # dispatch() grants the slot before waking the waiter
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in share.waiters:
+                self.dequeue(client_id, share, waiter)
+            elif waiter.done() and not waiter.cancelled():
+                self.release(client_id)
+            raise
+
+    def release(self, client_id: str, held_seconds: Optional[float] = None):
+        share = self.shares.get(client_id)
+        if share is not None:
+            estimate = share.pending_charges.popleft() if share.pending_charges else 0.0
+            if held_seconds is not None:
+                share.deficit -= held_seconds - estimate
+                share.held_seconds += held_seconds
+                share.hold_ewma = self.ewma(share.hold_ewma, held_seconds)
+            if not share.waiters:
+                share.idle_since = time.time()
+        if held_seconds is not None:
+            self.latency_ewma = self.ewma(self.latency_ewma, held_seconds)
+        self.active -= 1
+        self.dispatch()
+
+    @staticmethod
+    def ewma(current: Optional[float], value: float, alpha: float = 0.2) -> float:
+        if current is None:
+            return value
+        return alpha * value + (1 - alpha) * current
+
+    def forget(self, client_id: str):
+        """Drop an idle client's bookkeeping"""
+        share = self.shares.get(client_id)
+        if share is not None and not share.waiters and not share.pending_charges:
+            del self.shares[client_id]
+
+    @asynccontextmanager
+    async def slot(self, client_id: str):
+        await self.acquire(client_id)
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.release(client_id, time.time() - start_time)
+
+    def get_stats(self) -> dict:
+        busiest = sorted(
+            self.shares.items(), key=lambda item: item[1].held_seconds, reverse=True
+        )[:10]
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "waiting_clients": len(self.ring),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "latency_ms": (
+                round(self.latency_ewma * 1000, 1)
+                if self.latency_ewma is not None
+                else None
+            ),
+            "clients": {
+                client_id: {
+                    "weight": share.weight,
+                    "held_seconds": round(share.held_seconds, 2),
+                    "deficit_ms": round(share.deficit * 1000, 1),
+                }
+                for client_id, share in busiest
+            },
+        }
+
+
+class AdmissionController:
+    """Per-stage admission control and fair scheduling shared by all connections"""
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        max_queue: int,
+        weights: Optional[Dict[str, float]] = None,
+        token_budgets: Optional[Dict[str, int]] = None,
+    ):
+        self.weights = weights or {}
+        self.token_budgets = token_budgets or {}
+        self.gates = {
+            stage: StageGate(stage, limit, max_queue, weight_for=self.weight)
+            for stage, limit in limits.items()
+        }
+        self.turns_rejected = 0
+        # Set while draining for a restart: no new turns, in-flight ones finish
+        self.draining = False
+
+    def weight(self, client_id: str) -> float:
+        return self.weights.get(client_id, self.weights.get("*", 1.0))
+
+    def token_budget(self, client_id: str) -> int:
+        """Maximum new tokens the client's replies may generate per turn"""
+        return self.token_budgets.get(
+            client_id, self.token_budgets.get("*", TURN_TOKEN_BUDGET)
+        )
+
+    def check_turn(self) -> Optional[AdmissionRejected]:
+        """Fast check before starting a turn: reject if any stage queue is full"""
+        if self.draining:
+            # Clients should move to another server; this one is going away
+            self.turns_rejected += 1
+            return AdmissionRejected("server", 1000, reason="draining")
+        for gate in self.gates.values():
+            if gate.is_full():
+                self.turns_rejected += 1
+                return gate.reject()
+        return None
+
+    def stage(self, name: str, client_id: str):
+        """Async context manager holding a slot of the given stage"""
+        return self.gates[name].slot(client_id)
+
+    async def acquire(self, name: str, client_id: str):
+        await self.gates[name].acquire(client_id)
+
+    def release(self, name: str, client_id: str, held_seconds: Optional[float] = None):
+        self.gates[name].release(client_id, held_seconds)
 
-        except asyncio.CancelledError:
-            # If there's text collected before cancellation, yield it
-            if current_chunk:
-                logger.info(
-                    f"Yielding partial text chunk before cancellation: {len(current_chunk)} chars"
-                )
-                yield current_chunk
-            raise
+    def forget(self, client_id: str):
+        for gate in self.gates.values():
+            gate.forget(client_id)
+
+    def get_stats(self) -> dict:
+        return {
+            "draining": self.draining,
+            "turns_rejected": self.turns_rejected,
+            "stages": {name: gate.get_stats() for name, gate in self.gates.items()},
+        }
 
 
 # Store active connections
@@ -627,21 +4459,108 @@ class ConnectionManager:
             "audio_segments_received": 0,
             "images_received": 0,
             "audio_with_image_received": 0,
+            "caption_frames_sent": 0,
+            "replies_budget_reached": 0,
             "last_reset": datetime.now(),
         }
+        # Shared store for stats when running as one of several workers
+        self.shared_store: Optional[SharedStore] = None
+        self.worker_id = None
+        self.last_published = 0.0
+        self.publish_task: Optional[asyncio.Task] = None
+        # Complete replies to repeated questions
+        self.response_cache = ResponseCache()
+        # Per-stage concurrency limits and load shedding
+        self.admission = AdmissionController(
+            {"asr": ASR_CONCURRENCY, "vlm": VLM_CONCURRENCY, "tts": TTS_CONCURRENCY},
+            STAGE_QUEUE_LIMIT,
+            weights=parse_client_weights(CLIENT_WEIGHTS),
+            token_budgets=parse_client_settings(CLIENT_TOKEN_BUDGETS, cast=int),
+        )
+        # Heartbeat: last message from each client and the task serving its socket
+        self.last_activity: Dict[str, float] = {}
+        self.sessions: Dict[str, asyncio.Task] = {}
+        self.heartbeat_task: Optional[asyncio.Task] = None
+        self.heartbeat_stats = {
+            "pings_sent": 0,
+            "evicted_dead": 0,
+            "evicted_idle": 0,
+            "last_sweep_ms": 0.0,
+        }
+        # Audio messages of each client's current reply, kept for the response cache
+        self.reply_buffers: Dict[str, list] = {}
+        self.memory_stats = {"reclaims": 0, "reclaimed_bytes": 0}
+
+    def attach_shared_store(self, shared_store: SharedStore, worker_id: str):
+        """Publish stats and the image index through a store shared with other workers"""
+        self.shared_store = shared_store
+        self.worker_id = worker_id
+        self.image_manager.shared_store = shared_store
+        self.image_manager.worker_id = worker_id
+        self.publish_stats()
+
+    def publish_stats(self):
+        """Publish stats to the shared store, at most once per STATS_PUBLISH_INTERVAL
+
+        Events in between (e.g. every caption frame) are folded into one deferred
+        publish, so the latest counts still reach the store.
+        """
+        if not self.shared_store:
+            return
+        wait = self.last_published + STATS_PUBLISH_INTERVAL - time.time()
+        if wait <= 0:
+            self.write_stats()
+            return
+        if self.publish_task is None:
+            try:
+                self.publish_task = asyncio.get_running_loop().create_task(
+                    self.publish_later(wait)
+                )
+            except RuntimeError:
+                self.write_stats()  # No event loop, e.g. during shutdown
+
+    async def publish_later(self, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.publish_task = None
+        self.write_stats()
+
+    def write_stats(self):
+        self.last_published = time.time()
+        try:
+            self.shared_store.put_stats(self.worker_id, self.get_stats())
+        except sqlite3.Error as e:
+            logger.error(f"Error publishing stats: {e}")
 
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
         self.active_connections[client_id] = websocket
         self.current_tasks[client_id] = {"processing": None, "tts": None}
+        self.last_activity[client_id] = time.time()
         logger.info(f"Client {client_id} connected")
+        self.publish_stats()
+
+    def turns_in_flight(self) -> List[asyncio.Task]:
+        """Turns still being processed, across all clients"""
+        return [
+            task
+            for tasks in self.current_tasks.values()
+            for task_type, task in tasks.items()
+            if task_type == "processing" and not task.done()
+        ]
 
     def disconnect(self, client_id: str):
         if client_id in self.active_connections:
             del self.active_connections[client_id]
         if client_id in self.current_tasks:
             del self.current_tasks[client_id]
+        self.last_activity.pop(client_id, None)
+        self.sessions.pop(client_id, None)
+        self.reply_buffers.pop(client_id, None)
+        self.admission.forget(client_id)
         logger.info(f"Client {client_id} disconnected")
+        self.publish_stats()
 
     async def cancel_current_tasks(self, client_id: str):
         """Cancel any ongoing processing tasks for a client"""
@@ -669,6 +4588,141 @@ class ConnectionManager:
             # Reset tasks
             self.current_tasks[client_id] = {"processing": None, "tts": None}
 
+    def attach_session(self, client_id: str, task: asyncio.Task):
+        """Register the task serving a client's socket; cancelling it ends the session"""
+        self.sessions[client_id] = task
+
+    def touch(self, client_id: str):
+        """Record a message from the client"""
+        self.last_activity[client_id] = time.time()
+
+    def is_busy(self, client_id: str) -> bool:
+        tasks = self.current_tasks.get(client_id) or {}
+        return any(task and not task.done() for task in tasks.values())
+
+    def start_heartbeat(self):
+        if HEARTBEAT_INTERVAL > 0 and self.heartbeat_task is None:
+            self.heartbeat_task = asyncio.create_task(self.heartbeat())
+
+    async def stop_heartbeat(self):
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            try:
+                await self.heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self.heartbeat_task = None
+
+    async def heartbeat(self):
+        """One timer for all sockets, instead of a sleeping ping task per connection"""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Heartbeat error: {e}")
+
+    async def sweep(self):
+        """Ping quiet clients in one batch and evict dead or idle sessions"""
+        start_time = time.time()
+        # Serialized once per sweep and shared by every socket
+        ping = json.dumps({"type": "ping", "timestamp": start_time})
+
+        due = []
+        for client_id, websocket in list(self.active_connections.items()):
+            quiet = start_time - self.last_activity.get(client_id, start_time)
+            if IDLE_TIMEOUT and quiet >= IDLE_TIMEOUT and not self.is_busy(client_id):
+                await self.evict(client_id, "idle")
+            elif quiet >= HEARTBEAT_INTERVAL:
+                # Clients that just sent something are evidently alive
+                due.append((client_id, websocket))
+
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(websocket.send_text(ping), HEARTBEAT_INTERVAL)
+                for _, websocket in due
+            ),
+            return_exceptions=True,
+        )
+        for (client_id, _), result in zip(due, results):
+            if isinstance(result, BaseException):
+                await self.evict(client_id, "dead")
+            else:
+                self.heartbeat_stats["pings_sent"] += 1
+        self.reclaim_memory()
+        self.heartbeat_stats["last_sweep_ms"] = round(
+            (time.time() - start_time) * 1000, 1
+        )
+
+    def session_memory(self) -> Dict[str, Dict[str, int]]:
+        """Bytes cached per session, by kind"""
+        processor = SmolVLMProcessor._instance
+        client_ids = set(self.active_connections) | set(self.reply_buffers)
+        if processor is not None:
+            client_ids |= processor.session_ids()
+
+        sessions = {}
+        for client_id in client_ids:
+            usage = processor.session_memory(client_id) if processor else {}
+            usage["reply_audio"] = sum(
+                len(message["audio"])
+                for message in self.reply_buffers.get(client_id, ())
+            )
+            usage["total"] = sum(usage.values())
+            sessions[client_id] = usage
+        return sessions
+
+    def reclaim_memory(self):
+        """Keep per-session caches within budget, least recently active sessions first"""
+        processor = SmolVLMProcessor._instance
+        if processor is None or SESSION_MEMORY_MB <= 0:
+            return
+        sessions = self.session_memory()
+        excess = sum(usage["total"] for usage in sessions.values()) - (
+            SESSION_MEMORY_MB * 1024 * 1024
+        )
+        if excess <= 0:
+            return
+        order = sorted(
+            sessions, key=lambda client_id: self.last_activity.get(client_id, 0)
+        )
+        freed = processor.reclaim(order, excess)
+        self.memory_stats["reclaims"] += 1
+        self.memory_stats["reclaimed_bytes"] += freed
+        logger.info(f"🧹 Reclaimed {freed / 1e6:.1f}MB of session caches")
+
+    def get_memory_stats(self) -> dict:
+        sessions = self.session_memory()
+        rss = process_rss_bytes()
+        return {
+            "budget_mb": SESSION_MEMORY_MB,
+            "sessions_mb": round(
+                sum(usage["total"] for usage in sessions.values()) / 1e6, 2
+            ),
+            "rss_mb": round(rss / 1e6, 1) if rss is not None else None,
+            "process": process_memory(),
+            "reclaims": self.memory_stats["reclaims"],
+            "reclaimed_mb": round(self.memory_stats["reclaimed_bytes"] / 1e6, 2),
+            "sessions": sessions,
+        }
+
+    async def evict(self, client_id: str, reason: str):
+        """End a session; its handler releases the client's model state on the way out"""
+        logger.info(f"💤 Evicting {reason} client {client_id}")
+        self.heartbeat_stats[f"evicted_{reason}"] += 1
+        websocket = self.active_connections.get(client_id)
+        if reason == "idle" and websocket is not None:
+            try:
+                await asyncio.wait_for(
+                    websocket.close(code=1000, reason="idle timeout"),
+                    HEARTBEAT_INTERVAL,
+                )
+            except Exception:
+                pass  # Dead already; cancelling the session below still cleans up
+        task = self.sessions.get(client_id)
+        if task is not None and not task.done():
+            task.cancel()
+
     def set_task(self, client_id: str, task_type: str, task: asyncio.Task):
         """Set a task for a client"""
         if client_id in self.current_tasks:
@@ -678,6 +4732,7 @@ class ConnectionManager:
         """Update statistics"""
         if event_type in self.stats:
             self.stats[event_type] += 1
+            self.publish_stats()
 
     def get_stats(self) -> dict:
         """Get current statistics"""
@@ -686,30 +4741,558 @@ class ConnectionManager:
             **self.stats,
             "uptime_seconds": uptime.total_seconds(),
             "active_connections": len(self.active_connections),
+            "admission": self.admission.get_stats(),
+            "response_cache": self.response_cache.get_stats(),
+            "heartbeat": dict(self.heartbeat_stats),
+            "memory": self.get_memory_stats(),
         }
 
 
 manager = ConnectionManager()
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
+class ProfileCapture:
+    """A time-boxed profile of the live server, returned as a zip of:
+
+    - ``stacks.folded``: sampled Python stacks of every thread, in the collapsed format
+      flamegraph.pl and speedscope read
+    - ``torch_trace.json``: a torch profiler trace of the model stages (Chrome trace)
+    - ``asyncio_tasks.txt``: the event loop's tasks and their stacks at start and end
+
+    Nothing runs outside a capture: the sampler thread and torch profiler only exist
+    for its duration, and stage tasks check a single attribute.
+    """
+
+    current: Optional["ProfileCapture"] = None
+
+    def __init__(self, seconds: float, torch_trace: bool = True):
+        self.seconds = seconds
+        self.torch_trace = torch_trace
+        self.stop_sampling = Event()
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.task_dumps: List[str] = []
+        self.profiler = None
+        # (stage, thread id, start, end) of stage tasks, for torch without
+        # all-thread tracing
+        self.stage_spans: Optional[list] = None
+        self.notes: List[str] = []
+
+    async def run(self) -> bytes:
+        ProfileCapture.current = self
+        sampler = Thread(target=self.sample_stacks, name="talkmate-profiler")
+        try:
+            self.task_dumps.append(self.dump_tasks("start"))
+            if self.torch_trace:
+                self.start_torch_profiler()
+            sampler.start()
+            await asyncio.sleep(self.seconds)
+        finally:
+            ProfileCapture.current = None
+            self.stop_sampling.set()
+            if sampler.is_alive():
+                await asyncio.to_thread(sampler.join)
+            if self.profiler is not None:
+                self.profiler.stop()
+        self.task_dumps.append(self.dump_tasks("end"))
+        return await asyncio.to_thread(self.build_archive)
+
+    def start_torch_profiler(self):
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        try:
+            config = torch._C._profiler._ExperimentalConfig(profile_all_threads=True)
+        except TypeError:
+            # Older torch only traces the calling thread; fall back to stage spans
+            self.stage_spans = []
+            self.notes.append("torch can't trace all threads; stage tasks only")
+            return
+        self.profiler = torch.profiler.profile(
+            activities=activities, experimental_config=config
+        )
+        self.profiler.start()
+
+    def run_stage_task(self, stage: str, fn, *args):
+        """Run a stage executor task, labelled in the torch trace"""
+        if self.stage_spans is None:
+            with torch.profiler.record_function(f"talkmate.{stage}"):
+                return fn(*args)
+        start_time = time.time()
+        try:
+            return fn(*args)
+        finally:
+            self.stage_spans.append(
+                (stage, threading.get_ident(), start_time, time.time())
+            )
+
+    def sample_stacks(self):
+        interval = PROFILE_SAMPLE_MS / 1000
+        own_id = threading.get_ident()
+        names = {}
+        while not self.stop_sampling.wait(interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    @staticmethod
+    def dump_tasks(label: str) -> str:
+        lines = [f"== {label} {datetime.now().isoformat()}"]
+        for task in asyncio.all_tasks():
+            buffer = io.StringIO()
+            task.print_stack(file=buffer)
+            lines.append(f"-- {task.get_name()} ({task.get_coro()!r})")
+            lines.append(buffer.getvalue())
+        return "\n".join(lines)
+
+    def torch_trace_json(self) -> Optional[str]:
+        if self.profiler is not None:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / "trace.json"
+                self.profiler.export_chrome_trace(str(path))
+                return path.read_text()
+        if self.stage_spans is None:
+            return None
+        events = [
+            {
+                "name": f"talkmate.{stage}",
+                "ph": "X",
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+            }
+            for stage, thread_id, start, end in self.stage_spans
+        ]
+        return json.dumps({"traceEvents": events})
+
+    def build_archive(self) -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(
+                "stacks.folded",
+                "".join(f"{stack} {count}\n" for stack, count in self.stacks.items()),
+            )
+            archive.writestr("asyncio_tasks.txt", "\n\n".join(self.task_dumps))
+            trace = self.torch_trace_json() if self.torch_trace else None
+            if trace is not None:
+                archive.writestr("torch_trace.json", trace)
+            summary = {
+                "seconds": self.seconds,
+                "stack_samples": self.samples,
+                "sample_interval_ms": PROFILE_SAMPLE_MS,
+                "torch_trace": trace is not None,
+                "notes": self.notes,
+            }
+            archive.writestr("summary.json", json.dumps(summary, indent=2))
+        return buffer.getvalue()
+
+
+class ModelReadiness:
+    """Tracks model loading and warmup progress for the health endpoints"""
+
+    def __init__(self):
+        self.stages = {"asr": "pending", "vlm": "pending", "tts": "pending"}
+        self.load_seconds: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        # Draining servers take no new connections, so balancers route elsewhere
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return not self.draining and all(
+            state == "ready" for state in self.stages.values()
+        )
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "failed"
+        if self.draining:
+            return "draining"
+        return "ready" if self.ready else "loading"
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "stages": dict(self.stages),
+            "load_seconds": dict(self.load_seconds),
+            "error": self.error,
+        }
+
+
+readiness = ModelReadiness()
+
+
+class LoopWatchdog:
+    """Measures event loop lag and catches what blocks the loop in the act
+
+    A task on the loop wakes every interval and records how late it woke. A thread
+    checks that the task keeps ticking; when it hasn't for longer than the threshold,
+    the loop thread is stuck in a blocking call, so its current stack names the
+    culprit. Stalls are attributed to a pipeline stage by the code on that stack.
+    """
+
+    LAG_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+    # Innermost match on the stalled stack wins
+    STAGE_OWNERS = {
+        "WhisperProcessor": "asr",
+        "SmolVLMProcessor": "vlm",
+        "AsyncTextStreamer": "vlm",
+        "collect_remaining_text": "vlm",
+        "KokoroTTSProcessor": "tts",
+        "ImageManager": "image_io",
+        "CaptionBuffer": "captions",
+        "ResponseCache": "response_cache",
+        "SharedStore": "shared_store",
+        "receive_and_process": "receive",
+        "process_audio_segment": "pipeline",
+        "ConnectionManager": "connections",
+    }
+
+    def __init__(
+        self,
+        interval_ms: float = LOOP_WATCHDOG_INTERVAL_MS,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.lock = Lock()
+        self.task: Optional[asyncio.Task] = None
+        self.thread: Optional[Thread] = None
+        self.stopped = Event()
+        self.loop_thread_id: Optional[int] = None
+        self.last_tick = time.monotonic()
+        self.pending_stall: Optional[dict] = None
+        self.lag_counts = [0] * (len(self.LAG_BUCKETS_MS) + 1)
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.ticks = 0
+        self.stalls: deque = deque(maxlen=100)
+        self.offenders: Dict[Tuple[str, str], dict] = {}
+
+    def start(self):
+        if not LOOP_WATCHDOG or self.task is not None:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self.stopped.clear()
+        self.task = asyncio.create_task(self.tick())
+        self.thread = Thread(
+            target=self.watch, name="talkmate-loop-watchdog", daemon=True
+        )
+        self.thread.start()
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.stopped.set()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self.lock:
+                self.last_tick = now
+                stall, self.pending_stall = self.pending_stall, None
+                self.record_lag(lag)
+                if stall is not None:
+                    self.record_stall(stall, lag)
+            if stall is not None:
+                logger.warning(
+                    f"🐢 Event loop blocked for {1000 * lag:.0f}ms in {stall['stage']}: "
+                    f"{stall['location']}"
+                )
+
+    def watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is stalled"""
+        while not self.stopped.wait(min(self.interval, self.threshold) / 2):
+            with self.lock:
+                stalled_for = time.monotonic() - self.last_tick - self.interval
+                if stalled_for < self.threshold or self.pending_stall is not None:
+                    continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stall = self.describe_stack(frame)
+            with self.lock:
+                self.pending_stall = stall
+
+    @classmethod
+    def describe_stack(cls, frame) -> dict:
+        """Stage and innermost server frame of a stalled loop stack"""
+        stack = traceback.extract_stack(frame)
+        stage, location = "other", None
+        while frame is not None:
+            code = frame.f_code
+            if location is None and code.co_filename == __file__:
+                location = f"{code.co_name} (main.py:{frame.f_lineno})"
+            if stage == "other":
+                qualname = code.co_name
+                if code.co_varnames[:1] == ("self",):
+                    qualname = f"{type(frame.f_locals.get('self')).__name__}.{qualname}"
+                for name, owner in cls.STAGE_OWNERS.items():
+                    if name in qualname:
+                        stage = owner
+                        break
+            frame = frame.f_back
+        innermost = stack[-1]
+        return {
+            "stage": stage,
+            "location": location
+            or f"{innermost.name} ({Path(innermost.filename).name}:{innermost.lineno})",
+            "stack": "".join(stack.format()),
+            "at": time.time(),
+        }
+
+    def record_lag(self, lag: float):
+        lag_ms = 1000 * lag
+        index = next(
+            (i for i, bound in enumerate(self.LAG_BUCKETS_MS) if lag_ms <= bound),
+            len(self.LAG_BUCKETS_MS),
+        )
+        self.lag_counts[index] += 1
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+        self.ticks += 1
+
+    def record_stall(self, stall: dict, lag: float):
+        stall["lag_ms"] = round(1000 * lag, 1)
+        self.stalls.append(stall)
+        offender = self.offenders.setdefault(
+            (stall["stage"], stall["location"]),
+            {"count": 0, "total_ms": 0.0, "max_ms": 0.0},
+        )
+        offender["count"] += 1
+        offender["total_ms"] += stall["lag_ms"]
+        offender["max_ms"] = max(offender["max_ms"], stall["lag_ms"])
+
+    def stalls_since(self, since: float) -> List[dict]:
+        """Stalls captured after a time.time() timestamp, e.g. the start of a test"""
+        with self.lock:
+            return [stall for stall in self.stalls if stall["at"] >= since]
+
+    def get_stats(self, top: int = 10) -> dict:
+        with self.lock:
+            histogram = {
+                f"<={bound}ms": count
+                for bound, count in zip(self.LAG_BUCKETS_MS, self.lag_counts)
+            }
+            histogram[f">{self.LAG_BUCKETS_MS[-1]}ms"] = self.lag_counts[-1]
+            offenders = sorted(
+                self.offenders.items(), key=lambda item: -item[1]["total_ms"]
+            )[:top]
+            return {
+                "enabled": self.task is not None,
+                "threshold_ms": 1000 * self.threshold,
+                "mean_lag_ms": (
+                    round(1000 * self.lag_total / self.ticks, 2) if self.ticks else None
+                ),
+                "max_lag_ms": round(1000 * self.lag_max, 1),
+                "lag_histogram": histogram,
+                "stalls": sum(
+                    offender["count"] for offender in self.offenders.values()
+                ),
+                "top_offenders": [
+                    {
+                        "stage": stage,
+                        "location": location,
+                        "count": offender["count"],
+                        "total_ms": round(offender["total_ms"], 1),
+                        "max_ms": offender["max_ms"],
+                    }
+                    for (stage, location), offender in offenders
+                ],
+            }
+
+
+loop_watchdog = LoopWatchdog()
+
+
+async def load_stage(stage: str, processor_cls):
+    """Load and warm up one model stage on the stage's threads"""
+    start_time = time.time()
+    readiness.stages[stage] = "loading"
+    executor = StageExecutor.get(stage)
+    processor = await executor.run(processor_cls.get_instance)
+
+    if WARMUP_ON_STARTUP:
+        readiness.stages[stage] = "warming_up"
+        warmup_start = time.time()
+        await executor.run(processor.warmup)
+        logger.info(f"🔥 {stage} warmup took {time.time() - warmup_start:.2f}s")
+
+    readiness.load_seconds[stage] = round(time.time() - start_time, 3)
+    readiness.stages[stage] = "ready"
+    logger.info(f"{stage} ready in {readiness.load_seconds[stage]:.2f}s")
+
+
+PROCESSOR_CLASSES = {
+    "asr": WhisperProcessor,
+    "vlm": SmolVLMProcessor,
+    "tts": KokoroTTSProcessor,
+}
+reload_locks = {stage: asyncio.Lock() for stage in PROCESSOR_CLASSES}
+
+
+def release_processor(processor):
+    """Free a replaced processor's model: stop its workers, collect, empty the cache"""
+    backend = getattr(processor, "backend", None) or getattr(
+        processor, "pipeline", None
+    )
+    pool = getattr(backend, "pool", None)
+    if isinstance(pool, StageWorkerPool):
+        pool.shutdown()
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+async def reload_stage(
+    stage: str, backend_name: Optional[str] = None, voice: Optional[str] = None
+) -> dict:
+    """Swap in a freshly loaded processor for a stage without dropping sessions.
+
+    The new model is loaded and warmed up next to the old one, then swapped in;
+    turns already running finish on the old model, which is released once they are
+    done or RELOAD_DRAIN_TIMEOUT has passed. Raises ValueError for a bad backend.
+    """
+    processor_cls = PROCESSOR_CLASSES[stage]
+    executor = StageExecutor.get(stage)
+    async with reload_locks[stage]:
+        start_time = time.time()
+        processor = await executor.run(
+            lambda: processor_cls(backend=create_stage_backend(stage, backend_name))
+        )
+        if stage == "tts":
+            if processor.pipeline is None:
+                raise ValueError(
+                    f"Could not load the {backend_name or TTS_BACKEND} TTS backend"
+                )
+            if voice:
+                processor.default_voice = voice
+        load_seconds = time.time() - start_time
+
+        warmup_start = time.time()
+        try:
+            await executor.run(processor.warmup)
+        except Exception:
+            # Don't keep a model that failed to warm up, nor its worker processes
+            await asyncio.to_thread(release_processor, processor)
+            raise
+        warmup_seconds = time.time() - warmup_start
+
+        # get_instance() holds the lock while it builds the first instance, so wait
+        # for it off the event loop
+        await asyncio.to_thread(processor_cls._instance_lock.acquire)
+        try:
+            in_flight = manager.turns_in_flight()
+            previous = processor_cls._instance
+            if stage == "vlm" and previous is not None:
+                processor.adopt_sessions(previous)
+            processor_cls._instance = processor
+        finally:
+            processor_cls._instance_lock.release()
+        logger.info(
+            f"🔁 {stage} reloaded in {load_seconds + warmup_seconds:.2f}s, "
+            f"waiting for {len(in_flight)} turn(s) on the old model"
+        )
+
+        drain_start = time.time()
+        if in_flight:
+            await asyncio.wait(in_flight, timeout=RELOAD_DRAIN_TIMEOUT)
+        drain_seconds = time.time() - drain_start
+        if previous is not None and previous is not processor:
+            await asyncio.to_thread(release_processor, previous)
+
+        return {
+            "stage": stage,
+            "backend": backend_name,
+            "voice": voice,
+            "load_seconds": round(load_seconds, 3),
+            "warmup_seconds": round(warmup_seconds, 3),
+            "drain_seconds": round(drain_seconds, 3),
+            "turns_drained": len(in_flight),
+        }
+
+
+def set_draining(draining: bool):
+    """Stop (or resume) admitting new connections and turns"""
+    manager.admission.draining = draining
+    readiness.draining = draining
+    if manager.shared_store:
+        manager.shared_store.put_readiness(manager.worker_id, readiness.to_dict())
+    logger.info("🚰 Draining" if draining else "🚰 Drain cancelled, accepting turns")
+
+
+async def load_models():
+    """Load all models concurrently"""
     logger.info("Initializing models on startup...")
+    start_time = time.time()
     try:
-        # Initialize processors to load models
-        whisper_processor = WhisperProcessor.get_instance()
-        smolvlm_processor = SmolVLMProcessor.get_instance()
-        tts_processor = KokoroTTSProcessor.get_instance()
-        logger.info("All models initialized successfully")
+        await asyncio.gather(
+            load_stage("asr", WhisperProcessor),
+            load_stage("vlm", SmolVLMProcessor),
+            load_stage("tts", KokoroTTSProcessor),
+        )
+        logger.info(
+            f"All models initialized successfully in {time.time() - start_time:.2f}s"
+        )
     except Exception as e:
+        readiness.error = str(e)
         logger.error(f"Error initializing models: {e}")
-        raise
+
+    if manager.shared_store:
+        manager.shared_store.put_readiness(manager.worker_id, readiness.to_dict())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Running as one worker behind the affinity router: share state through the store
+    worker_index = os.getenv("TALKMATE_WORKER_INDEX")
+    if worker_index is not None:
+        shared_store = SharedStore(SHARED_STORE_PATH)
+        manager.attach_shared_store(shared_store, f"worker-{worker_index}")
+        shared_store.put_readiness(manager.worker_id, readiness.to_dict())
+
+    # Startup: load models in the background so /health/live answers immediately
+    loading_task = asyncio.create_task(load_models())
+    manager.start_heartbeat()
+    loop_watchdog.start()
 
     yield  # Server is running
 
     # Shutdown
     logger.info("Shutting down server...")
+    await manager.stop_heartbeat()
+    await loop_watchdog.stop()
+    if not loading_task.done():
+        loading_task.cancel()
+        try:
+            await loading_task
+        except asyncio.CancelledError:
+            pass
     # Close any remaining connections
     for client_id in list(manager.active_connections.keys()):
         try:
@@ -717,6 +5300,8 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Error closing connection for {client_id}: {e}")
         manager.disconnect(client_id)
+    # Stop out-of-process model workers
+    StageWorkerPool.shutdown_all()
     logger.info("Server shutdown complete")
 
 
@@ -738,16 +5323,143 @@ app.add_middleware(
 )
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe: the event loop is serving and model loading has not failed"""
+    if readiness.error:
+        return JSONResponse(status_code=503, content=readiness.to_dict())
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: all models are loaded and warmed up"""
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=readiness.to_dict())
+    return readiness.to_dict()
+
+
 @app.get("/stats")
 async def get_stats():
     """Get server statistics"""
-    return manager.get_stats()
+    return {
+        **manager.get_stats(),
+        "stage_workers": {
+            pool.stage: pool.get_stats() for pool in StageWorkerPool.pools
+        },
+        "executors": StageExecutor.get_all_stats(),
+        "loop_lag": loop_watchdog.get_stats(),
+        "tts_front_end": (
+            KokoroTTSProcessor._instance.get_front_end_stats()
+            if KokoroTTSProcessor._instance
+            else None
+        ),
+        "chunking": chunking_policy.get_stats(),
+        "speculative_prefill": (
+            SmolVLMProcessor._instance.get_speculation_stats()
+            if SmolVLMProcessor._instance
+            else None
+        ),
+        "prompt_lookup": (
+            SmolVLMProcessor._instance.get_prompt_lookup_stats()
+            if SmolVLMProcessor._instance
+            else None
+        ),
+        "video_context": (
+            SmolVLMProcessor._instance.get_frame_stats()
+            if SmolVLMProcessor._instance
+            else None
+        ),
+    }
+
+
+def require_admin(authorization: Optional[str]):
+    """Reject the request unless it carries the admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(authorization or "", f"Bearer {ADMIN_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def drain_status() -> dict:
+    return {
+        "draining": manager.admission.draining,
+        "turns_in_flight": len(manager.turns_in_flight()),
+        "connections": len(manager.active_connections),
+    }
+
+
+@app.get("/admin/drain")
+async def get_drain(authorization: Optional[str] = Header(None)):
+    """Whether the server is draining and what is still running"""
+    require_admin(authorization)
+    return drain_status()
+
+
+@app.post("/admin/drain")
+async def drain(
+    enabled: bool = True,
+    wait: float = 0.0,
+    authorization: Optional[str] = Header(None),
+):
+    """Stop taking new connections and turns; optionally wait for in-flight turns"""
+    require_admin(authorization)
+    set_draining(enabled)
+    in_flight = manager.turns_in_flight()
+    if enabled and wait > 0 and in_flight:
+        await asyncio.wait(in_flight, timeout=wait)
+    return drain_status()
+
+
+@app.post("/admin/reload/{stage}")
+async def reload(
+    stage: str,
+    backend: Optional[str] = None,
+    voice: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+):
+    """Load a stage's model again (optionally another backend or TTS voice) in place"""
+    require_admin(authorization)
+    if stage not in PROCESSOR_CLASSES:
+        raise HTTPException(status_code=404, detail=f"Unknown stage: {stage}")
+    if voice and stage != "tts":
+        raise HTTPException(status_code=400, detail="voice only applies to tts")
+    try:
+        return await reload_stage(stage, backend, voice)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/admin/profile")
+async def capture_profile(
+    seconds: float = 10.0,
+    torch_trace: bool = True,
+    authorization: Optional[str] = Header(None),
+):
+    """Profile the running server for a few seconds and download the artifacts"""
+    require_admin(authorization)
+    if ProfileCapture.current is not None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    logger.info(f"🩺 Capturing a {seconds:.1f}s profile")
+    archive = await ProfileCapture(seconds, torch_trace=torch_trace).run()
+    filename = f"talkmate-profile-{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(
+        content=archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @app.get("/images")
 async def list_saved_images():
     """List all saved images"""
     try:
+        if manager.shared_store:
+            images = manager.shared_store.list_images()
+            return {"images": images, "count": len(images)}
+
         images_dir = manager.image_manager.save_directory
         if not images_dir.exists():
             return {"images": [], "message": "No images directory found"}
@@ -775,12 +5487,22 @@ async def list_saved_images():
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
     """WebSocket endpoint for real-time multimodal interaction"""
+    if not readiness.ready:
+        # 1013: try again later, models are still loading or the server is draining
+        await websocket.close(code=1013)
+        return
+
     await manager.connect(websocket, client_id)
 
-    # Get instances of processors
-    whisper_processor = WhisperProcessor.get_instance()
-    smolvlm_processor = SmolVLMProcessor.get_instance()
-    tts_processor = KokoroTTSProcessor.get_instance()
+    # Session state; set before the try so cleanup can read it after an early drop
+    speculation_task = None
+    captions_enabled = CAPTIONS_DEFAULT
+    use_response_cache = RESPONSE_CACHE_ENABLED
+    reply_limits = {
+        "sentences": REPLY_MAX_SENTENCES,
+        "speech_seconds": REPLY_MAX_SPEECH_SECONDS,
+    }
+    turn_ids = itertools.count(1)
 
     try:
         # Send initial configuration confirmation
@@ -788,19 +5510,26 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             json.dumps({"status": "connected", "client_id": client_id})
         )
 
-        async def send_keepalive():
-            """Send periodic keepalive pings"""
-            while True:
-                try:
-                    await websocket.send_text(
-                        json.dumps({"type": "ping", "timestamp": time.time()})
-                    )
-                    await asyncio.sleep(10)  # Send ping every 10 seconds
-                except Exception:
-                    break
-
         async def process_audio_segment(audio_data, image_data=None):
             """Process a complete audio segment through the pipeline with optional image"""
+            # Looked up per turn, so a hot reload applies from the next turn on
+            whisper_processor = WhisperProcessor.get_instance()
+            smolvlm_processor = SmolVLMProcessor.get_instance()
+            tts_processor = KokoroTTSProcessor.get_instance()
+            vlm_slot_acquired_at = None
+
+            def release_vlm_slot():
+                nonlocal vlm_slot_acquired_at
+                if vlm_slot_acquired_at is not None:
+                    manager.admission.release(
+                        "vlm", client_id, time.time() - vlm_slot_acquired_at
+                    )
+                    vlm_slot_acquired_at = None
+
+            image_task = None
+            captions = (
+                CaptionBuffer(websocket, next(turn_ids)) if captions_enabled else None
+            )
             try:
                 # Log what we received
                 if image_data:
@@ -836,9 +5565,20 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 interrupt_message = json.dumps({"interrupt": True})
                 await websocket.send_text(interrupt_message)
 
+                # Steps 1 and 2 form a small dependency graph: image decode, resize
+                # and vision encoding run alongside Whisper, and only prompt
+                # assembly waits for both
+                if image_data:
+                    image_task = asyncio.create_task(
+                        smolvlm_processor.prepare_image(image_data)
+                    )
+
                 # Step 1: Transcribe audio with Whisper
                 logger.info("Starting Whisper transcription")
-                transcribed_text = await whisper_processor.transcribe_audio(audio_data)
+                async with manager.admission.stage("asr", client_id):
+                    transcribed_text = await whisper_processor.transcribe_audio(
+                        audio_data
+                    )
                 logger.info(f"Transcription result: '{transcribed_text}'")
 
                 # Check if transcription indicates noise
@@ -848,15 +5588,78 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                     )
                     return
 
-                # Step 2: Set image if provided, then process text
-                if image_data:
-                    await smolvlm_processor.set_image(image_data)
-                    logger.info("🖼️ Image set for multimodal processing")
-
-                # Process transcribed text with image using SmolVLM2
-                logger.info("Starting SmolVLM2 generation")
+                if captions:
+                    await captions.send_transcript(transcribed_text)
+
+                # Step 2: Set the prepared image if provided, then process text
+                if image_task:
+                    prepared_image = await image_task
+                    if prepared_image:
+                        await smolvlm_processor.set_image(prepared_image, client_id)
+                        manager.reclaim_memory()
+                        logger.info("🖼️ Image set for multimodal processing")
+
+                # Replay a cached reply to the same question about the same scene
+                max_new_tokens = manager.admission.token_budget(client_id)
+                reply_budget = ReplyBudget(
+                    max_sentences=reply_limits["sentences"],
+                    max_speech_seconds=reply_limits["speech_seconds"],
+                    speech_cps=chunking_policy.speech_cps
+                    or ChunkingPolicy.prior_speech_cps,
+                )
+                cache_key = None
+                if use_response_cache:
+                    frames = smolvlm_processor.frames_for_turn(client_id)
+                    cache_image_hash = frames[-1].image_hash if frames else None
+                    cache_key = ResponseCache.make_key(
+                        transcribed_text,
+                        SmolVLMProcessor.context_fingerprint(frames),
+                        max_new_tokens,
+                        reply_budget,
+                    )
+                    cached = manager.response_cache.get(cache_key, cache_image_hash)
+                    if cached:
+                        logger.info(
+                            f"♻️ Replaying cached reply: '{cached.text[:50]}...'"
+                        )
+                        if captions:
+                            captions.add(cached.text)
+                            captions.finish()
+                        for message in cached.messages:
+                            message = {
+                                **message,
+                                "modality": (
+                                    "multimodal" if image_data else "audio_only"
+                                ),
+                            }
+                            await websocket.send_text(json.dumps(message))
+                        smolvlm_processor.update_history_with_complete_response(
+                            transcribed_text, cached.text
+                        )
+                        await send_audio_complete(reply_budget, cached.text)
+                        return
+                # Audio is only kept for a reply that will be cached
+                reply_messages = manager.reply_buffers[client_id] = []
+
+                # Process transcribed text with image using SmolVLM2. The VLM slot
+                # is held until generation has finished, not just the first chunk,
+                # but not while the rest of the reply waits on TTS
+                await manager.admission.acquire("vlm", client_id)
+                vlm_slot_acquired_at = time.time()
+                chunk_plan = chunking_policy.plan()
+                logger.info(
+                    f"Starting SmolVLM2 generation (first chunk ~{chunk_plan.first_chars} chars)"
+                )
                 streamer, initial_text, initial_collection_stopped_early = (
-                    await smolvlm_processor.process_text_with_image(transcribed_text)
+                    await smolvlm_processor.process_text_with_image(
+                        transcribed_text,
+                        session_id=client_id,
+                        captions=captions,
+                        chunk_plan=chunk_plan,
+                        max_new_tokens=max_new_tokens,
+                        on_generation_end=release_vlm_slot,
+                        reply_budget=reply_budget,
+                    )
                 )
                 logger.info(
                     f"SmolVLM2 initial text: '{initial_text[:50]}...' ({len(initial_text)} chars)"
@@ -872,17 +5675,25 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 # Step 3: Generate TTS for initial text WITH NATIVE TIMING
                 if initial_text:
                     logger.info("Starting TTS for initial text")
-                    tts_task = asyncio.create_task(
-                        tts_processor.synthesize_initial_speech_with_timing(
-                            initial_text
+                    async with manager.admission.stage("tts", client_id):
+                        tts_started_at = time.time()
+                        tts_task = asyncio.create_task(
+                            tts_processor.synthesize_initial_speech_with_timing(
+                                initial_text
+                            )
                         )
-                    )
-                    manager.set_task(client_id, "tts", tts_task)
+                        manager.set_task(client_id, "tts", tts_task)
 
-                    # FIXED: Properly unpack the tuple
-                    tts_result = await tts_task
+                        # FIXED: Properly unpack the tuple
+                        tts_result = await tts_task
                     if isinstance(tts_result, tuple) and len(tts_result) == 2:
                         initial_audio, initial_timings = tts_result
+                        if initial_audio is not None:
+                            chunking_policy.record_tts(
+                                len(initial_text),
+                                len(initial_audio) / 24000,
+                                time.time() - tts_started_at,
+                            )
                     else:
                         # Fallback for legacy method
                         initial_audio = tts_result
@@ -910,6 +5721,8 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                         }
 
                         await websocket.send_text(json.dumps(audio_message))
+                        if cache_key:
+                            reply_messages.append(audio_message)
                         logger.info(
                             f"✨ Initial audio sent to client with {len(initial_timings)} NATIVE word timings [{audio_message['modality']}]"
                         )
@@ -920,10 +5733,16 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                             collected_chunks = []
 
                             try:
-                                text_iterator = collect_remaining_text(streamer)
+                                text_iterator = collect_remaining_text(
+                                    streamer, chunk_plan=chunk_plan
+                                )
 
                                 while True:
                                     try:
+                                        chunk_plan.contended = (
+                                            manager.admission.gates["tts"].queue_depth
+                                            > 0
+                                        )
                                         text_chunk = await anext(text_iterator)
                                         logger.info(
                                             f"Processing text chunk: '{text_chunk[:30]}...' ({len(text_chunk)} chars)"
@@ -931,17 +5750,21 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                                         collected_chunks.append(text_chunk)
 
                                         # Generate TTS for this chunk WITH NATIVE TIMING
-                                        chunk_tts_task = asyncio.create_task(
-                                            tts_processor.synthesize_remaining_speech_with_timing(
-                                                text_chunk
+                                        async with manager.admission.stage(
+                                            "tts", client_id
+                                        ):
+                                            tts_started_at = time.time()
+                                            chunk_tts_task = asyncio.create_task(
+                                                tts_processor.synthesize_remaining_speech_with_timing(
+                                                    text_chunk
+                                                )
+                                            )
+                                            manager.set_task(
+                                                client_id, "tts", chunk_tts_task
                                             )
-                                        )
-                                        manager.set_task(
-                                            client_id, "tts", chunk_tts_task
-                                        )
 
-                                        # FIXED: Properly unpack the tuple for chunks too
-                                        chunk_tts_result = await chunk_tts_task
+                                            # FIXED: Properly unpack the tuple for chunks too
+                                            chunk_tts_result = await chunk_tts_task
                                         if (
                                             isinstance(chunk_tts_result, tuple)
                                             and len(chunk_tts_result) == 2
@@ -949,6 +5772,12 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                                             chunk_audio, chunk_timings = (
                                                 chunk_tts_result
                                             )
+                                            if chunk_audio is not None:
+                                                chunking_policy.record_tts(
+                                                    len(text_chunk),
+                                                    len(chunk_audio) / 24000,
+                                                    time.time() - tts_started_at,
+                                                )
                                         else:
                                             # Fallback for legacy method
                                             chunk_audio = chunk_tts_result
@@ -992,6 +5821,10 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                                             await websocket.send_text(
                                                 json.dumps(chunk_audio_message)
                                             )
+                                            if cache_key:
+                                                reply_messages.append(
+                                                    chunk_audio_message
+                                                )
                                             logger.info(
                                                 f"✨ Chunk audio sent to client with {len(chunk_timings)} NATIVE word timings [{chunk_audio_message['modality']}]"
                                             )
@@ -1033,12 +5866,25 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                                 transcribed_text, initial_text
                             )
 
+                        reply_text = initial_text
+                        if initial_collection_stopped_early:
+                            reply_text += "".join(collected_chunks)
+                        if cache_key:
+                            manager.response_cache.put(
+                                cache_key, cache_image_hash, reply_text, reply_messages
+                            )
+
                         # Signal end of audio stream
-                        await websocket.send_text(json.dumps({"audio_complete": True}))
+                        await send_audio_complete(reply_budget, reply_text)
                         logger.info("Audio processing complete")
 
+            except AdmissionRejected as e:
+                logger.warning(f"Turn rejected for client {client_id}: {e}")
+                await websocket.send_text(json.dumps(e.to_message()))
             except asyncio.CancelledError:
                 logger.info("Audio processing cancelled")
+                if captions:
+                    captions.discard()
                 raise
             except Exception as e:
                 logger.error(f"Error processing audio segment: {e}")
@@ -1046,17 +5892,85 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                 import traceback
 
                 logger.error(f"Full traceback: {traceback.format_exc()}")
+            finally:
+                if image_task and not image_task.done():
+                    image_task.cancel()
+                release_vlm_slot()
+                # Don't leave a cancelled or failed turn's generation running
+                smolvlm_processor.stop_generation(client_id)
+                manager.reply_buffers.pop(client_id, None)
+
+        async def send_audio_complete(reply_budget: ReplyBudget, reply_text: str):
+            """End the turn's audio, with what the reply used of its budget"""
+            usage = reply_budget.remaining(reply_text)
+            if usage["budget_reached"]:
+                manager.update_stats("replies_budget_reached")
+            logger.info(f"📏 Reply budget: {usage}")
+            await websocket.send_text(
+                json.dumps({"audio_complete": True, "reply_budget": usage})
+            )
+
+        async def speculate(partial_audio=None, partial_text=None, image_data=None):
+            """Transcribe a partial utterance and prefill the VLM from it"""
+            whisper_processor = WhisperProcessor.get_instance()
+            smolvlm_processor = SmolVLMProcessor.get_instance()
+            # Speculative work only runs on idle capacity and never queues
+            asr_gate = manager.admission.gates["asr"]
+            vlm_gate = manager.admission.gates["vlm"]
+            try:
+                if partial_audio is not None:
+                    if not asr_gate.try_acquire(client_id):
+                        return
+                    try:
+                        partial_text = await whisper_processor.transcribe_audio(
+                            partial_audio
+                        )
+                    finally:
+                        asr_gate.release(client_id)
+                    if partial_text in ["NOISE_DETECTED", "NO_SPEECH", None]:
+                        return
+
+                prepared_image = None
+                if image_data:
+                    prepared_image = await smolvlm_processor.prepare_image(image_data)
+
+                if not vlm_gate.try_acquire(client_id):
+                    return
+                try:
+                    if await smolvlm_processor.speculative_prefill(
+                        client_id, partial_text, prepared_image
+                    ):
+                        manager.reclaim_memory()
+                finally:
+                    vlm_gate.release(client_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Speculation error for client {client_id}: {e}")
 
         async def receive_and_process():
             """Receive and process messages from the client"""
+            nonlocal speculation_task, captions_enabled, use_response_cache
             try:
                 while True:
                     data = await websocket.receive_text()
+                    manager.touch(client_id)
                     try:
                         message = json.loads(data)
 
                         # Handle complete audio segments from frontend
                         if "audio_segment" in message:
+                            # Shed load before touching the current turn
+                            rejection = manager.admission.check_turn()
+                            if rejection:
+                                logger.warning(
+                                    f"Turn rejected for client {client_id}: {rejection}"
+                                )
+                                await websocket.send_text(
+                                    json.dumps(rejection.to_message())
+                                )
+                                continue
+
                             # Cancel any current processing
                             await manager.cancel_current_tasks(client_id)
 
@@ -1081,6 +5995,60 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                             )
                             manager.set_task(client_id, "processing", processing_task)
 
+                        # Per-session caption toggle
+                        elif "captions" in message:
+                            captions_enabled = bool(message["captions"])
+                            logger.info(
+                                f"Captions {'enabled' if captions_enabled else 'disabled'} for client {client_id}"
+                            )
+
+                        # Per-session response cache opt-out
+                        elif "response_cache" in message:
+                            use_response_cache = RESPONSE_CACHE_ENABLED and bool(
+                                message["response_cache"]
+                            )
+
+                        # Per-session reply budget; null restores the default
+                        elif "reply_budget" in message:
+                            limits = message["reply_budget"] or {}
+                            reply_limits["sentences"] = int(
+                                limits.get("sentences", REPLY_MAX_SENTENCES) or 0
+                            )
+                            reply_limits["speech_seconds"] = float(
+                                limits.get("speech_seconds", REPLY_MAX_SPEECH_SECONDS)
+                                or 0
+                            )
+                            logger.info(
+                                f"Reply budget for client {client_id}: {reply_limits}"
+                            )
+
+                        # Handle partial utterances for speculative prefill
+                        elif (
+                            "partial_audio_segment" in message
+                            or "partial_transcript" in message
+                        ):
+                            if not SPECULATIVE_PREFILL:
+                                continue
+                            # One speculation in flight per client; newer partials wait
+                            if speculation_task and not speculation_task.done():
+                                continue
+
+                            partial_audio = None
+                            if "partial_audio_segment" in message:
+                                partial_audio = base64.b64decode(
+                                    message["partial_audio_segment"]
+                                )
+                            image_data = None
+                            if "image" in message:
+                                image_data = base64.b64decode(message["image"])
+                            speculation_task = asyncio.create_task(
+                                speculate(
+                                    partial_audio,
+                                    message.get("partial_transcript"),
+                                    image_data,
+                                )
+                            )
+
                         # Handle standalone images (only if not currently processing)
                         elif "image" in message:
                             if not (
@@ -1105,13 +6073,23 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                                         f"📸 Standalone image saved and verified: {verification}"
                                     )
 
-                                await smolvlm_processor.set_image(image_data)
+                                await SmolVLMProcessor.get_instance().set_image(
+                                    image_data, client_id
+                                )
+                                manager.reclaim_memory()
                                 logger.info("Image updated")
 
                         # Handle realtime input (for backward compatibility)
                         elif "realtime_input" in message:
                             for chunk in message["realtime_input"]["media_chunks"]:
                                 if chunk["mime_type"] == "audio/pcm":
+                                    rejection = manager.admission.check_turn()
+                                    if rejection:
+                                        await websocket.send_text(
+                                            json.dumps(rejection.to_message())
+                                        )
+                                        continue
+
                                     # Treat as complete audio segment
                                     await manager.cancel_current_tasks(client_id)
 
@@ -1151,7 +6129,10 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                                                 f"📸 Realtime image saved and verified: {verification}"
                                             )
 
-                                        await smolvlm_processor.set_image(image_data)
+                                        await SmolVLMProcessor.get_instance().set_image(
+                                            image_data, client_id
+                                        )
+                                        manager.reclaim_memory()
 
                     except json.JSONDecodeError as e:
                         logger.error(f"Error decoding JSON: {e}")
@@ -1172,13 +6153,14 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             except WebSocketDisconnect:
                 logger.info("WebSocket connection closed during receive loop")
 
-        # Run tasks concurrently
+        # Keepalive pings come from the manager's shared heartbeat, which cancels
+        # this task to evict the session
         receive_task = asyncio.create_task(receive_and_process())
-        keepalive_task = asyncio.create_task(send_keepalive())
+        manager.attach_session(client_id, receive_task)
 
-        # Wait for any task to complete (usually due to disconnection or error)
+        # Wait for the session to end (usually due to disconnection or error)
         done, pending = await asyncio.wait(
-            [receive_task, keepalive_task],
+            [receive_task],
             return_when=asyncio.FIRST_COMPLETED,
         )
 
@@ -1194,6 +6176,8 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         for task in done:
             try:
                 result = task.result()
+            except asyncio.CancelledError:
+                logger.info(f"Session for client {client_id} evicted")
             except Exception as e:
                 logger.error(f"Task finished with error: {e}")
 
@@ -1204,19 +6188,188 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     finally:
         # Cleanup
         logger.info(f"Cleaning up resources for client {client_id}")
+        if speculation_task and not speculation_task.done():
+            speculation_task.cancel()
         await manager.cancel_current_tasks(client_id)
+        smolvlm_processor = SmolVLMProcessor.get_instance()
+        generation = smolvlm_processor.release_session(client_id)
         manager.disconnect(client_id)
+        # Nothing of the session outlives it, including a stopped generate() thread
+        if generation is not None:
+            await smolvlm_processor.join_generation(client_id, generation)
+
+
+def create_router_app(worker_ports: List[int], shared_store: SharedStore) -> FastAPI:
+    """Front app that pins each client_id to one worker and serves shared state"""
+    router = FastAPI(title="TalkMateAI router")
+
+    @router.get("/health/live")
+    async def router_live():
+        return {"status": "alive"}
+
+    @router.get("/health/ready")
+    async def router_ready():
+        states = shared_store.get_worker_states()
+        workers = {
+            worker_id: (state["readiness"] or {}).get("status", "unknown")
+            for worker_id, state in states.items()
+        }
+        ready = len(workers) == len(worker_ports) and all(
+            status == "ready" for status in workers.values()
+        )
+        content = {"status": "ready" if ready else "loading", "workers": workers}
+        return JSONResponse(status_code=200 if ready else 503, content=content)
+
+    @router.get("/stats")
+    async def router_stats():
+        return shared_store.aggregate_stats()
+
+    @router.get("/images")
+    async def router_images():
+        images = shared_store.list_images()
+        return {"images": images, "count": len(images)}
+
+    @router.get("/route/{client_id}")
+    async def route(client_id: str):
+        """Worker a client is pinned to, for external load balancers"""
+        index = rendezvous_worker(client_id, len(worker_ports))
+        return {"client_id": client_id, "worker": index, "port": worker_ports[index]}
+
+    @router.websocket("/ws/{client_id}")
+    async def proxy_websocket(websocket: WebSocket, client_id: str):
+        port = worker_ports[rendezvous_worker(client_id, len(worker_ports))]
+        try:
+            upstream = await websockets.connect(
+                f"ws://127.0.0.1:{port}/ws/{client_id}", max_size=None
+            )
+        except Exception as e:
+            logger.warning(f"Worker on port {port} refused {client_id}: {e}")
+            await websocket.close(code=1013)
+            return
+
+        await websocket.accept()
+
+        async def client_to_worker():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is not None:
+                    await upstream.send(message["text"])
+                elif message.get("bytes") is not None:
+                    await upstream.send(message["bytes"])
+
+        async def worker_to_client():
+            async for message in upstream:
+                if isinstance(message, str):
+                    await websocket.send_text(message)
+                else:
+                    await websocket.send_bytes(message)
+
+        tasks = [
+            asyncio.create_task(client_to_worker()),
+            asyncio.create_task(worker_to_client()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+            try:
+                await websocket.close()
+            except RuntimeError:
+                pass  # Already closed by the client
+
+    return router
+
+
+def run_worker_server(index: int, port: int, env: Dict[str, str]):
+    """Entry point of a uvicorn worker process behind the affinity router"""
+    os.environ.update(env)
+    if "OMP_NUM_THREADS" in env:
+        # torch is already imported, so apply the thread budget explicitly
+        torch.set_num_threads(int(env["OMP_NUM_THREADS"]))
+    config = uvicorn.Config(
+        app=app,
+        host="127.0.0.1",
+        port=port,
+        log_level="info",
+        access_log=True,
+        ws_ping_interval=20,
+        ws_ping_timeout=60,
+        timeout_keep_alive=30,
+    )
+    uvicorn.Server(config).run()
+
+
+def worker_environment(index: int, num_workers: int) -> Dict[str, str]:
+    """Per-worker environment: GPU round-robin and an even share of CPU threads"""
+    env = {
+        "TALKMATE_WORKER_INDEX": str(index),
+        "TALKMATE_SHARED_STORE": str(Path(SHARED_STORE_PATH).absolute()),
+    }
+    num_gpus = torch.cuda.device_count()
+    if num_gpus:
+        env["CUDA_VISIBLE_DEVICES"] = str(index % num_gpus)
+    if "OMP_NUM_THREADS" not in os.environ:
+        env["OMP_NUM_THREADS"] = str(max(1, (os.cpu_count() or 1) // num_workers))
+    return env
+
+
+def run_multi_worker(num_workers: int):
+    """Run several uvicorn workers behind a session-affinity router"""
+    logger.info(f"Starting {num_workers} workers behind the session-affinity router")
+    context = multiprocessing.get_context("spawn")
+    worker_ports = [SERVER_PORT + 1 + index for index in range(num_workers)]
+
+    # Start from a clean worker table; the image index persists across restarts
+    shared_store = SharedStore(SHARED_STORE_PATH)
+    with shared_store.lock, shared_store.connection:
+        shared_store.connection.execute("DELETE FROM worker_state")
+
+    processes = []
+    for index, port in enumerate(worker_ports):
+        process = context.Process(
+            target=run_worker_server,
+            args=(index, port, worker_environment(index, num_workers)),
+            name=f"talkmate-server-{index}",
+        )
+        process.start()
+        processes.append(process)
+
+    config = uvicorn.Config(
+        app=create_router_app(worker_ports, shared_store),
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        log_level="info",
+        access_log=True,
+        ws_ping_interval=20,
+        ws_ping_timeout=60,
+        timeout_keep_alive=30,
+    )
+    try:
+        uvicorn.Server(config).run()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=10)
 
 
 def main():
     """Main function to start the FastAPI server"""
     logger.info("Starting FastAPI Whisper + SmolVLM2 Voice Assistant server...")
 
+    if SERVER_WORKERS > 1:
+        run_multi_worker(SERVER_WORKERS)
+        return
+
     # Configure uvicorn
     config = uvicorn.Config(
         app=app,
-        host="0.0.0.0",
-        port=8000,
+        host=SERVER_HOST,
+        port=SERVER_PORT,
         log_level="info",
         access_log=True,
         ws_ping_interval=20,
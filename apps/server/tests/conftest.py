@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Import main.py with stub backends, so tests need no model weights
+for stage in ("ASR", "VLM", "TTS"):
+    os.environ.setdefault(f"TALKMATE_{stage}_BACKEND", "stub")
+# Short stub replies keep end-to-end turns quick
+os.environ.setdefault("TALKMATE_STUB_VLM_TOKENS_PER_SEC", "400")
+os.environ.setdefault("TALKMATE_STUB_VLM_REPLY_TOKENS", "20")
+# Catch anything that blocks the event loop
+os.environ.setdefault("TALKMATE_LOOP_WATCHDOG", "true")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app on stub backends, started once and ready for turns"""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        deadline = time.time() + 30
+        while client.get("/health/ready").status_code != 200:
+            assert time.time() < deadline, "stub backends did not get ready"
+            time.sleep(0.05)
+        yield client
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "blocks_loop: the test stalls the event loop on purpose"
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_loop_stalls(request):
+    """Fail a test driving the app during which its event loop stalled
+
+    Tests that don't use the app are not checked: heavy work of their own can hold
+    the GIL and starve the loop without anything blocking on it.
+    """
+    import main
+
+    start = time.time()
+    yield
+    if (
+        "client" not in request.fixturenames
+        or main.loop_watchdog.task is None
+        or request.node.get_closest_marker("blocks_loop")
+    ):
+        return
+    # A stall is recorded on the loop's first tick after it
+    time.sleep(2 * main.loop_watchdog.interval)
+    stalls = main.loop_watchdog.stalls_since(start)
+    if stalls:
+        pytest.fail(
+            "Event loop blocked:\n"
+            + "\n".join(f"{s['lag_ms']}ms in {s['stack']}" for s in stalls),
+            pytrace=False,
+        )
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from main import AdmissionController, AdmissionRejected, StageGate
+
+
+async def settle():
+    """Let tasks waiting on the gate run"""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_slots_up_to_the_limit_then_queue():
+    async def scenario():
+        gate = StageGate("asr", max_concurrency=2, max_queue=4)
+        await gate.acquire("a")
+        await gate.acquire("b")
+        waiting = asyncio.create_task(gate.acquire("c"))
+        await settle()
+        assert not waiting.done()
+        assert (gate.active, gate.queue_depth) == (2, 1)
+
+        gate.release("a", 0.5)
+        await settle()
+        assert waiting.done()
+        assert (gate.active, gate.queue_depth) == (2, 0)
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_with_a_latency_estimate():
+    async def scenario():
+        gate = StageGate("vlm", max_concurrency=1, max_queue=1)
+        await gate.acquire("a")
+        gate.release("a", 2.0)
+        await gate.acquire("a")
+        queued = asyncio.create_task(gate.acquire("b"))
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire("c")
+        # One request ahead in the queue plus this one, 2 s each, on one slot
+        assert rejected.value.retry_after_ms == 4000
+        assert rejected.value.to_message() == {
+            "type": "busy",
+            "stage": "vlm",
+            "retry_after_ms": 4000,
+            "reason": "busy",
+        }
+        queued.cancel()
+        await settle()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_while_queued_frees_the_queue_place():
+    async def scenario():
+        gate = StageGate("tts", max_concurrency=1, max_queue=4)
+        await gate.acquire("a")
+        cancelled = asyncio.create_task(gate.acquire("b"))
+        waiting = asyncio.create_task(gate.acquire("c"))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        assert gate.queue_depth == 1
+        assert list(gate.ring) == ["c"]
+
+        gate.release("a", 0.1)
+        await settle()
+        assert waiting.done() and not waiting.cancelled()
+        assert gate.active == 1
+        gate.release("c", 0.1)
+        assert (gate.active, gate.queue_depth) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_the_grant_releases_the_slot():
+    async def scenario():
+        gate = StageGate("tts", max_concurrency=1, max_queue=4)
+        await gate.acquire("a")
+        granted = asyncio.create_task(gate.acquire("b"))
+        await settle()
+        # The slot is handed over, then the waiter is cancelled before it runs
+        gate.release("a", 0.1)
+        granted.cancel()
+        await settle()
+        assert gate.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_try_acquire_only_takes_idle_capacity():
+    async def scenario():
+        gate = StageGate("vlm", max_concurrency=1, max_queue=4)
+        assert gate.try_acquire("a")
+        assert not gate.try_acquire("b")
+        gate.release("a")
+        assert gate.shares["a"].deficit == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_stats_count_admissions_and_rejections():
+    async def scenario():
+        admission = AdmissionController({"asr": 1, "vlm": 1}, max_queue=0)
+        async with admission.stage("asr", "a"):
+            assert admission.check_turn().stage == "asr"
+            with pytest.raises(AdmissionRejected):
+                await admission.acquire("asr", "b")
+            stats = admission.get_stats()
+        assert stats["turns_rejected"] == 1
+        assert stats["stages"]["asr"]["active"] == 1
+        assert stats["stages"]["asr"]["admitted"] == 1
+        assert stats["stages"]["asr"]["rejected"] == 2
+        assert "a" in stats["stages"]["asr"]["clients"]
+        assert admission.get_stats()["stages"]["asr"]["active"] == 0
+        assert admission.check_turn() is None
+
+        admission.forget("a")
+        assert "a" not in admission.get_stats()["stages"]["asr"]["clients"]
+
+    asyncio.run(scenario())
+
+
+def test_draining_rejects_new_turns():
+    admission = AdmissionController({"asr": 1}, max_queue=4)
+    admission.draining = True
+    rejected = admission.check_turn()
+    assert (rejected.stage, rejected.reason) == ("server", "draining")
+    assert admission.get_stats()["turns_rejected"] == 1
+
+
+def test_stats_endpoint_reports_admission(client):
+    stages = client.get("/stats").json()["admission"]["stages"]
+    assert set(stages) == {"asr", "vlm", "tts"}
+    assert {"active", "queue_depth", "admitted", "rejected", "latency_ms"} <= set(
+        stages["vlm"]
+    )
@@ -0,0 +1,92 @@
+import pytest
+
+from main import ChunkingPolicy
+
+
+def policy(**kwargs) -> ChunkingPolicy:
+    options = {"adaptive": True, "growth": 1.6, "min_chars": 12, "max_chars": 240}
+    return ChunkingPolicy(**{**options, **kwargs})
+
+
+def measured(generation_cps: float, overhead: float, rtf: float) -> ChunkingPolicy:
+    chunking = policy()
+    chunking.record_generation(int(generation_cps), 1.0)
+    for audio_seconds in (1.0, 2.0, 4.0, 3.0, 6.0):
+        chunking.record_tts(
+            int(15 * audio_seconds), audio_seconds, overhead + rtf * audio_seconds
+        )
+    return chunking
+
+
+def test_tts_fit_recovers_overhead_and_real_time_factor():
+    overhead, rtf = measured(200.0, overhead=0.1, rtf=0.2).tts_model()
+    assert overhead == pytest.approx(0.1, abs=1e-6)
+    assert rtf == pytest.approx(0.2, abs=1e-6)
+
+
+def test_slower_tts_needs_a_longer_first_chunk():
+    fast, growth = measured(200.0, overhead=0.8, rtf=0.1).first_chunk_chars()
+    slow, _ = measured(200.0, overhead=0.8, rtf=0.4).first_chunk_chars()
+    assert growth == 1.6
+    assert 12 <= fast < slow <= ChunkingPolicy.max_first_chars
+
+
+def test_first_chunk_is_clamped_to_its_limits():
+    assert measured(1000.0, overhead=0.0, rtf=0.1).first_chunk_chars()[0] == 12
+    assert measured(200.0, overhead=5.0, rtf=0.3).first_chunk_chars()[0] == 100
+
+
+def test_tts_slower_than_playback_falls_back_to_the_fixed_schedule():
+    assert measured(200.0, overhead=0.1, rtf=1.5).first_chunk_chars() == (50, None)
+
+
+def test_fixed_schedule_when_not_adaptive():
+    plan = policy(adaptive=False).plan()
+    assert plan.target_chars() == 50
+    plan.chunk_emitted()
+    assert plan.target_chars() == 80
+
+
+def test_chunks_grow_geometrically_up_to_the_maximum():
+    plan = measured(200.0, overhead=0.1, rtf=0.2).plan()
+    targets = []
+    for _ in range(8):
+        targets.append(plan.target_chars())
+        plan.chunk_emitted()
+    assert targets == sorted(targets)
+    assert targets[1] == int(plan.first_chars * 1.6)
+    assert targets[-1] == 240
+
+    # While other clients wait for TTS, chunks stop growing
+    plan.contended = True
+    assert plan.target_chars() == int(plan.first_chars * 1.6)
+
+
+def test_chunk_boundaries():
+    plan = policy().plan()
+    plan.first_chars, plan.growth = 20, 1.6
+    # First chunk: a clause end once the target is reached
+    assert not plan.is_first_chunk_complete("Sure, I can", " can")
+    assert plan.is_first_chunk_complete("Sure, I can see a cup,", " cup,")
+    # A sentence end a little short of the target also does
+    assert plan.is_first_chunk_complete("I see a cup.", " cup.")
+    assert plan.is_first_chunk_complete("x" * 40, "x")
+
+    plan.chunk_emitted()  # target 32
+    assert not plan.is_chunk_complete("It is on the table.")
+    assert plan.is_chunk_complete("It is on the wooden table by the door.")
+    # No sentence end: a clause boundary past twice the target
+    assert not plan.is_chunk_complete("It is on the wooden table by the door, next")
+    assert plan.is_chunk_complete(
+        "It is on the wooden table by the window, right next to the lamp and, "
+    )
+
+
+def test_fixed_first_chunk_heuristics():
+    plan = policy(adaptive=False).plan()
+    assert not plan.is_first_chunk_complete("I see a cup.", " cup.")
+    assert plan.is_first_chunk_complete("I see a cup on the table.", " table.")
+    assert plan.is_first_chunk_complete(
+        "I see a cup on the table, a book, and a " + "x" * 11, "x"
+    )
+    assert plan.is_first_chunk_complete("x" * 100, "x")
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from main import (
+    TURN_TOKEN_BUDGET,
+    AdmissionController,
+    StageGate,
+    parse_client_settings,
+    parse_client_weights,
+)
+
+
+def test_parse_client_weights():
+    assert parse_client_weights("kiosk=2, *=1") == {"kiosk": 2.0, "*": 1.0}
+    assert parse_client_weights("") == {}
+
+
+@pytest.mark.parametrize("value", ["kiosk=0", "kiosk=2,*=-1", "*=nan", "*=inf"])
+def test_non_positive_weights_are_rejected(value):
+    with pytest.raises(ValueError, match="must be a positive number"):
+        parse_client_weights(value)
+
+
+async def grant_order(gate: StageGate, requests: list, held_seconds: float) -> list:
+    """Clients in the order one slot is granted to them, each holding it a while"""
+    order = []
+
+    async def request(client_id):
+        await gate.acquire(client_id)
+        order.append(client_id)
+
+    await gate.acquire("first")
+    tasks = [asyncio.create_task(request(client_id)) for client_id in requests]
+    await asyncio.sleep(0)
+    holder = "first"
+    for _ in requests:
+        gate.release(holder, held_seconds)
+        await asyncio.sleep(0)
+        holder = order[-1]
+    gate.release(holder, held_seconds)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_stage_time_is_shared_by_weight():
+    gate = StageGate(
+        "vlm", 1, 100, weight_for={"kiosk": 2.0, "demo": 1.0}.get, quantum=0.1
+    )
+    for client_id in ("kiosk", "demo"):
+        gate.share(client_id).hold_ewma = 1.0
+    order = asyncio.run(grant_order(gate, ["kiosk"] * 12 + ["demo"] * 12, 1.0))
+    assert order[:9].count("kiosk") == 6
+    assert order[:9].count("demo") == 3
+
+
+def test_new_client_is_not_queued_behind_a_heavy_one():
+    gate = StageGate("vlm", 1, 100, quantum=0.1)
+    gate.share("heavy").hold_ewma = 2.0
+    order = asyncio.run(grant_order(gate, ["heavy"] * 3 + ["new"], 2.0))
+    assert order.index("new") == 0
+
+
+def test_weights_and_token_budgets_fall_back_to_the_wildcard():
+    admission = AdmissionController(
+        {"vlm": 1},
+        max_queue=4,
+        weights=parse_client_weights("kiosk=3,*=0.5"),
+        token_budgets=parse_client_settings("demo=300", cast=int),
+    )
+    assert admission.weight("kiosk") == 3.0
+    assert admission.weight("anyone") == 0.5
+    assert admission.token_budget("demo") == 300
+    assert admission.token_budget("anyone") == TURN_TOKEN_BUDGET
@@ -0,0 +1,106 @@
+import time
+
+import torch
+
+import main
+from main import FrameBuffer, PreparedImage, SmolVLMProcessor, create_stage_backend
+
+
+def frame(image_hash: int, age: float = 0.0, encoded: bool = False) -> PreparedImage:
+    return PreparedImage(
+        image=f"frame {image_hash}",
+        encoding=torch.zeros(1, 10) if encoded else None,
+        image_hash=image_hash,
+        seen_at=time.time() - age,
+    )
+
+
+# Perceptual hashes far enough apart to be different scenes
+SCENES = [0, 2**64 - 1, 0xFFFFFFFF, 0xFFFFFFFF << 32, 0x5555555555555555]
+
+
+def test_static_scene_keeps_one_keyframe():
+    buffer = FrameBuffer(capacity=4, max_age=30)
+    assert buffer.add(frame(SCENES[0], age=5))
+    # One bit differs: camera noise on the same scene
+    assert not buffer.add(frame(SCENES[0] ^ 1))
+    assert len(buffer.frames) == 1
+    assert buffer.frames[0].seen_at > time.time() - 1
+    assert (buffer.frames_seen, buffer.keyframes) == (2, 1)
+
+
+def test_an_encoded_frame_replaces_its_unencoded_scene():
+    buffer = FrameBuffer(capacity=4, max_age=30)
+    buffer.add(frame(SCENES[0]))
+    buffer.add(frame(SCENES[0], encoded=True))
+    assert buffer.encodings_cached() == 1
+    buffer.add(frame(SCENES[0]))
+    assert buffer.encodings_cached() == 1
+
+
+def test_buffer_keeps_the_newest_keyframes():
+    buffer = FrameBuffer(capacity=3, max_age=30)
+    for scene in SCENES:
+        buffer.add(frame(scene))
+    assert [f.image_hash for f in buffer.frames] == SCENES[-3:]
+
+
+def test_select_newest_frames_within_the_age_limit():
+    buffer = FrameBuffer(capacity=8, max_age=30)
+    buffer.add(frame(SCENES[0], age=60))
+    buffer.add(frame(SCENES[1], age=20))
+    buffer.add(frame(SCENES[2], age=10))
+    buffer.add(frame(SCENES[3], age=5))
+
+    assert [f.image_hash for f in buffer.select(2)] == SCENES[2:4]
+    assert [f.image_hash for f in buffer.select(8)] == SCENES[1:4]
+    assert [f.image_hash for f in buffer.select(1)] == [SCENES[3]]
+
+
+def test_newest_frame_is_selected_however_old():
+    buffer = FrameBuffer(capacity=8, max_age=30)
+    buffer.add(frame(SCENES[0], age=120))
+    assert [f.image_hash for f in buffer.select(4)] == [SCENES[0]]
+    assert FrameBuffer().select(4) == []
+
+
+def test_select_with_a_pending_frame():
+    buffer = FrameBuffer(capacity=8, max_age=30)
+    buffer.add(frame(SCENES[0]))
+    buffer.add(frame(SCENES[1], encoded=True))
+
+    new_scene = frame(SCENES[2])
+    assert buffer.select(4, new_scene) == [
+        buffer.frames[0],
+        buffer.frames[1],
+        new_scene,
+    ]
+    # A pending frame of the newest scene does not replace its encoded keyframe
+    assert buffer.select(4, frame(SCENES[1]))[-1] is buffer.frames[1]
+    assert len(buffer.frames) == 2
+
+
+class TokenCountingBackend:
+    """Vision encoder stand-in: every frame costs 100 vision tokens"""
+
+    def encode_image(self, image):
+        return torch.zeros(1, 100, 8)
+
+    def count_vision_tokens(self, encoding):
+        return encoding.shape[0] * encoding.shape[1]
+
+
+def test_vision_token_cap_drops_the_oldest_frames(monkeypatch):
+    processor = SmolVLMProcessor(backend=create_stage_backend("vlm", None))
+    processor.backend = TokenCountingBackend()
+    frames = [frame(scene) for scene in SCENES[:4]]
+
+    monkeypatch.setattr(main, "MAX_VISION_TOKENS", 250)
+    assert processor.encode_frames(frames) == frames[-2:]
+    assert all(f.encoding is not None for f in frames)
+    assert processor.frame_stats["frames_encoded"] == 4
+
+    # The newest frame is kept even when it alone is over the cap
+    monkeypatch.setattr(main, "MAX_VISION_TOKENS", 50)
+    assert processor.encode_frames(frames) == frames[-1:]
+    assert processor.frame_stats["frames_encoded"] == 4
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+from main import CachedG2P
+
+
+def token(text: str, tag: str = "NN") -> SimpleNamespace:
+    extra = SimpleNamespace(
+        alias=None, currency=None, is_head=True, num_flags="", stress=None
+    )
+    return SimpleNamespace(text=text, tag=tag, _=extra, phonemes=None)
+
+
+class FakeG2P:
+    """misaki-shaped G2P: the lexicon knows every word except those starting with x"""
+
+    def __init__(self):
+        self.calls = 0
+        self.lookups = 0
+        self.fallbacks = 0
+        self.lexicon = self.lookup
+        self.fallback = self.spell
+
+    def lookup(self, tok, ctx):
+        self.lookups += 1
+        return (None, None) if tok.text.startswith("x") else (tok.text.lower(), 4)
+
+    def spell(self, tok):
+        self.fallbacks += 1
+        return "-".join(tok.text), 1
+
+    def __call__(self, text: str):
+        self.calls += 1
+        ctx = SimpleNamespace(future_vowel=None, future_to=False)
+        tokens = [token(word) for word in text.split()]
+        for tok in tokens:
+            tok.phonemes = self.lexicon(tok, ctx)[0] or self.fallback(tok)[0]
+        return " ".join(tok.phonemes for tok in tokens), tokens
+
+
+def test_repeated_chunks_hit_and_hand_out_copies():
+    g2p = FakeG2P()
+    cache = CachedG2P(g2p, max_entries=8, max_words=8)
+    phonemes, tokens = cache("Sure thing")
+    tokens[0].phonemes = "changed"
+    assert cache("Sure thing")[0] == phonemes
+    assert cache("Sure thing")[1][0].phonemes == "sure"
+    assert g2p.calls == 1
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["hit_rate"] == 2 / 3
+
+
+def test_least_recently_used_chunk_is_evicted():
+    g2p = FakeG2P()
+    cache = CachedG2P(g2p, max_entries=2, max_words=8)
+    cache("one")
+    cache("two")
+    cache("one")
+    cache("three")
+    assert list(cache.entries) == ["one", "three"]
+    cache("two")
+    assert g2p.calls == 4
+    assert cache.get_stats()["misses"] == 4
+
+
+def test_words_are_memoized_across_chunks():
+    g2p = FakeG2P()
+    cache = CachedG2P(g2p, max_entries=8, max_words=8)
+    cache("the cat")
+    cache("the dog")
+    assert g2p.lookups == 3
+    stats = cache.get_stats()
+    assert (stats["word_hits"], stats["word_misses"]) == (1, 3)
+
+    ctx = SimpleNamespace(future_vowel=None, future_to=False)
+    g2p.lexicon(token("the", tag="DT"), ctx)
+    assert g2p.lookups == 4
+
+
+def test_fallback_is_memoized_by_text():
+    g2p = FakeG2P()
+    cache = CachedG2P(g2p, max_entries=8, max_words=8)
+    assert cache("xyz now")[0] == "x-y-z now"
+    cache("a xyz")
+    assert g2p.fallbacks == 1
+
+
+def test_least_recently_used_word_is_evicted():
+    g2p = FakeG2P()
+    cache = CachedG2P(g2p, max_entries=8, max_words=2)
+    cache("one two")
+    cache("one three")
+    assert [key[1] for key in cache.words] == ["one", "three"]
+    cache("two")
+    assert g2p.lookups == 4
+    assert cache.get_stats()["words"] == 2
+
+
+def test_prewarm_caches_chunks_and_words_then_resets_stats():
+    g2p = FakeG2P()
+    cache = CachedG2P(g2p, max_entries=8, max_words=8)
+    cache.prewarm(["Hello!"], ["the cat sat"])
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["words"]) == (1, 4)
+    assert stats["hits"] == stats["misses"] == stats["word_hits"] == 0
+    cache("Hello!")
+    cache("the cat")
+    assert g2p.lookups == 4
+    assert cache.get_stats()["hits"] == 1
@@ -0,0 +1,58 @@
+import threading
+import time
+from concurrent.futures import Future
+from threading import Event
+
+import pytest
+
+import main
+from main import SmolVLMProcessor, create_stage_backend
+
+
+def test_adopted_generations_can_still_be_stopped():
+    previous = SmolVLMProcessor(backend=create_stage_backend("vlm", None))
+    processor = SmolVLMProcessor(backend=create_stage_backend("vlm", None))
+    future, stop_event = Future(), Event()
+    previous.generations["alice"] = (future, stop_event)
+    future.add_done_callback(lambda _: previous.forget_generation("alice", future))
+
+    processor.adopt_sessions(previous)
+    assert processor.stop_generation("alice") is future
+    assert stop_event.is_set()
+
+    future.set_result(None)
+    assert "alice" not in processor.generations
+
+
+def test_failed_warmup_releases_the_new_model(client, monkeypatch):
+    released = []
+
+    def failing_warmup(self):
+        raise RuntimeError("warmup failed")
+
+    monkeypatch.setattr(main.WhisperProcessor, "warmup", failing_warmup)
+    monkeypatch.setattr(main, "release_processor", released.append)
+    current = main.WhisperProcessor._instance
+
+    with pytest.raises(RuntimeError, match="warmup failed"):
+        client.portal.call(main.reload_stage, "asr")
+    assert len(released) == 1 and released[0] is not current
+    assert main.WhisperProcessor._instance is current
+
+
+# Releasing the replaced model runs gc.collect(), which can hold the GIL for a while
+@pytest.mark.blocks_loop
+def test_reload_waits_for_a_first_load_off_the_event_loop(client):
+    lock = main.WhisperProcessor._instance_lock
+    # Stands in for get_instance() building the first instance on another thread
+    lock.acquire()
+    first_load = threading.Timer(1.0, lock.release)
+    first_load.start()
+    reload = client.portal.start_task_soon(main.reload_stage, "asr")
+    time.sleep(0.2)
+
+    start = time.time()
+    assert client.get("/health/live").status_code == 200
+    assert time.time() - start < 0.5
+    assert not reload.done()
+    assert reload.result(timeout=10)["stage"] == "asr"
@@ -0,0 +1,27 @@
+import time
+
+import pytest
+
+import main
+
+
+def busy_wait(seconds: float):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+@pytest.mark.blocks_loop
+def test_blocking_call_on_the_loop_is_flagged(client):
+    start = time.time()
+    # A synchronous call made on the event loop thread blocks it
+    client.portal.call(busy_wait, 0.3)
+    deadline = time.time() + 2
+    while not main.loop_watchdog.stalls_since(start) and time.time() < deadline:
+        time.sleep(0.01)
+
+    stalls = main.loop_watchdog.stalls_since(start)
+    assert len(stalls) == 1
+    assert stalls[0]["lag_ms"] >= main.LOOP_LAG_THRESHOLD_MS
+    assert "busy_wait" in stalls[0]["stack"]
+    assert client.get("/stats").json()["loop_lag"]["stalls"] >= 1
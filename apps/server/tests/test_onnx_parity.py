@@ -0,0 +1,132 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import torch
+
+import main
+from main import KokoroONNXModel
+
+# Small enough to export in seconds; the dimensions Kokoro hardcodes are kept
+KOKORO_CONFIG = {
+    "vocab": {c: i + 1 for i, c in enumerate("abcdefghijklmnopqrstuvwxyz ")},
+    "n_token": 178,
+    "hidden_dim": 512,
+    "style_dim": 128,
+    "n_layer": 2,
+    "max_dur": 4,
+    "dropout": 0.1,
+    "text_encoder_kernel_size": 5,
+    "n_mels": 80,
+    "plbert": {
+        "hidden_size": 64,
+        "num_attention_heads": 2,
+        "intermediate_size": 128,
+        "max_position_embeddings": 512,
+        "num_hidden_layers": 2,
+        "dropout": 0.1,
+    },
+    "istftnet": {
+        "upsample_kernel_sizes": [20, 12],
+        "upsample_rates": [10, 6],
+        "gen_istft_hop_size": 5,
+        "gen_istft_n_fft": 20,
+        "resblock_dilation_sizes": [[1, 3, 5], [1, 3, 5], [1, 3, 5]],
+        "resblock_kernel_sizes": [3, 7, 11],
+        "upsample_initial_channel": 512,
+    },
+}
+
+requires_models = pytest.mark.skipif(
+    not main.env_bool("TALKMATE_TEST_MODELS", False),
+    reason="set TALKMATE_TEST_MODELS=true to test with the real model weights",
+)
+
+
+def snr_db(reference: np.ndarray, audio: np.ndarray) -> float:
+    noise = np.sum((reference - audio) ** 2)
+    return 10 * np.log10(np.sum(reference**2) / noise) if noise else float("inf")
+
+
+@pytest.fixture
+def no_noise(monkeypatch):
+    """Zero Kokoro's random excitation noise, so runs are deterministic"""
+    monkeypatch.setattr(
+        torch, "rand", lambda *args, **kwargs: torch.zeros(*args, **kwargs)
+    )
+    monkeypatch.setattr(torch, "randn_like", torch.zeros_like)
+
+
+@pytest.fixture
+def tiny_kokoro(tmp_path, monkeypatch, no_noise):
+    """KModel class loading a small random Kokoro from tmp_path, as if from the hub"""
+    pytest.importorskip("onnxruntime")
+    from kokoro import KModel
+
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(KOKORO_CONFIG))
+    checkpoint = tmp_path / "kokoro.pth"
+    torch.save({}, checkpoint)
+    torch.manual_seed(0)
+    model = KModel("test/kokoro", KOKORO_CONFIG, str(checkpoint))
+    parts = ("bert", "bert_encoder", "predictor", "text_encoder", "decoder")
+    torch.save({part: getattr(model, part).state_dict() for part in parts}, checkpoint)
+
+    class TinyKModel(KModel):
+        def __init__(
+            self, repo_id=None, config=None, model=None, disable_complex=False
+        ):
+            super().__init__(repo_id, KOKORO_CONFIG, str(checkpoint), disable_complex)
+
+    monkeypatch.setattr(main, "KModel", TinyKModel)
+    monkeypatch.setattr(main, "ONNX_MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        "huggingface_hub.hf_hub_download", lambda repo_id, filename: str(config_path)
+    )
+    return TinyKModel
+
+
+@torch.inference_mode()
+def test_kokoro_onnx_matches_pytorch(tiny_kokoro):
+    onnx_model = KokoroONNXModel("test/kokoro", num_sessions=1)
+    reference = tiny_kokoro("test/kokoro").eval()
+    # The export swaps the complex STFT for a real one; random weights make the two
+    # diverge, so the waveform is checked against the exported PyTorch graph
+    exported = tiny_kokoro("test/kokoro", disable_complex=True).eval()
+    style = torch.randn(1, 256, generator=torch.Generator().manual_seed(1))
+
+    for phonemes in ("hello world", "a", "the quick brown fox jumps"):
+        expected = reference(phonemes, style, 1.0, return_output=True)
+        output = onnx_model(phonemes, style, 1.0, return_output=True)
+        # Durations drive the word timestamps
+        assert output.pred_dur.tolist() == expected.pred_dur.tolist()
+        audio = exported(phonemes, style, 1.0).numpy()
+        assert output.audio.shape == expected.audio.shape
+        # Rounding builds up in the phase of the harmonic source over an utterance,
+        # so a random model agrees to about 20 dB; a broken export is near 0 dB
+        assert snr_db(audio, output.audio.numpy()) > 15
+
+
+def test_kokoro_onnx_rejects_phonemes_over_the_context():
+    model = KokoroONNXModel.__new__(KokoroONNXModel)
+    model.vocab, model.context_length = {"a": 1}, 8
+    with pytest.raises(ValueError, match="exceed Kokoro's context of 6"):
+        model("a" * 7, torch.zeros(1, 256))
+
+
+@requires_models
+def test_whisper_onnx_transcribes_like_pytorch():
+    pytest.importorskip("optimum.onnxruntime")
+    from scipy.signal import resample_poly
+
+    tts = main.create_tts_backend("kokoro")
+    reference = main.create_asr_backend("whisper")
+    onnx_asr = main.create_asr_backend("whisper-onnx")
+    for text in ("What can you see in front of you?", "The cup is on the table."):
+        results = tts(text, voice="af_sarah", speed=1, split_pattern=None)
+        audio = torch.cat([result.audio for result in results]).numpy()
+        speech = resample_poly(audio, 2, 3).astype(np.float32)
+        assert main.normalize_transcript(
+            onnx_asr.transcribe(speech)
+        ) == main.normalize_transcript(reference.transcribe(speech))
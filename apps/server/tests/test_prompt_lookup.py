@@ -0,0 +1,67 @@
+import pytest
+import torch
+from transformers import LlamaConfig, LlamaForCausalLM
+
+from main import DiscardStreamer, PromptLookupDecoder
+
+EOS = 63
+
+
+class Tokenizer:
+    all_special_ids = [0, EOS]
+
+
+def tiny_model(seed: int, dtype: torch.dtype):
+    # Big enough for bf16 rounding to flip some greedy picks between drafting and not
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=64,
+        hidden_size=256,
+        intermediate_size=512,
+        num_hidden_layers=4,
+        num_attention_heads=8,
+        num_key_value_heads=2,
+        bos_token_id=0,
+        eos_token_id=EOS,
+        pad_token_id=0,
+    )
+    return LlamaForCausalLM(config).to(dtype).eval()
+
+
+def repetitive_prompt(seed: int) -> dict:
+    # Repeated spans give the lookup n-grams to draft from
+    generator = torch.Generator().manual_seed(seed)
+    span = torch.randint(1, EOS - 1, (12,), generator=generator)
+    input_ids = torch.cat([span, span, span[:5]]).unsqueeze(0)
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+
+def greedy(model, inputs, max_new_tokens: int):
+    output = model.generate(**inputs, do_sample=False, max_new_tokens=max_new_tokens)
+    tokens = output[0, inputs["input_ids"].shape[1] :].tolist()
+    return tokens[: tokens.index(EOS)] if EOS in tokens else tokens
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_drafting_matches_greedy_in_fp32(seed):
+    model = tiny_model(seed, torch.float32)
+    decoder = PromptLookupDecoder(model, Tokenizer(), 8, 3, 0.3)
+    inputs = repetitive_prompt(seed)
+    assert decoder.generate(inputs, DiscardStreamer(), 40) == greedy(model, inputs, 40)
+    assert decoder.get_stats()["drafted"]
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_bf16_replies_match_greedy_after_parity_check(seed):
+    model = tiny_model(seed, torch.bfloat16)
+    decoder = PromptLookupDecoder(model, Tokenizer(), 8, 3, 0.3)
+    inputs = repetitive_prompt(seed)
+    # Without drafting, the decoder is plain greedy decoding
+    plain = decoder.generate(inputs, DiscardStreamer(), 40, drafting=False)
+    assert plain == greedy(model, inputs, 40)
+
+    enabled = decoder.check_parity([inputs])
+    assert decoder.get_stats()["enabled"] == enabled
+    assert decoder.get_stats()["generations"] == 0
+    if enabled:
+        assert decoder.generate(inputs, DiscardStreamer(), 40) == plain
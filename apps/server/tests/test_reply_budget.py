@@ -0,0 +1,60 @@
+import pytest
+
+from main import ReplyBudget
+
+
+@pytest.mark.parametrize(
+    "text, sentences",
+    [
+        ("Hi there. How are you?", 2),
+        ("Version 3.5 is out. Try it!", 2),
+        ("It costs 3. That is cheap.", 2),
+        ("Ask Dr. Smith about it.", 1),
+        ("Bring fruit, e.g. apples, i.e. something sweet.", 1),
+        ("J. K. Rowling wrote it.", 1),
+        ("No. I don't think so.", 2),
+        ("Wait... what?", 2),
+        ('He said "stop." Then left.', 2),
+    ],
+)
+def test_sentences(text, sentences):
+    assert ReplyBudget.sentences(text) == sentences
+
+
+def test_decimal_point_does_not_stop_a_reply_midway():
+    budget = ReplyBudget(max_sentences=1)
+    assert not budget.exhausted("It is about 3.")
+    assert not budget.exhausted("It is about 3.5")
+    assert budget.exhausted("It is about 3.5 metres.")
+    # Once the reply has ended, or moved on, the same period ends the sentence
+    assert budget.exhausted("It is about 3.", complete=True)
+    assert budget.exhausted("It is about 3. ")
+
+
+@pytest.mark.parametrize("text", ["Ask Dr.", "Bring fruit, e.g.", "Written by J."])
+def test_abbreviations_do_not_stop_a_reply(text):
+    assert not ReplyBudget(max_sentences=1).exhausted(text)
+
+
+def test_exhausted_only_at_the_sentence_end_that_reaches_the_limit():
+    budget = ReplyBudget(max_sentences=2)
+    assert not budget.exhausted("One. Two")
+    assert not budget.exhausted("One.")
+    assert budget.exhausted("One. Two.")
+    assert budget.exhausted("No. Never!")
+
+
+def test_speech_seconds_limit():
+    budget = ReplyBudget(max_speech_seconds=2.0, speech_cps=10.0)
+    assert not budget.exhausted("Short one.")
+    assert not budget.exhausted("Short one. And then a lo")
+    assert budget.exhausted("Short one. And then a longer one.")
+    usage = budget.remaining("Short one.")
+    assert (usage["speech_seconds"], usage["speech_seconds_remaining"]) == (1.0, 1.0)
+
+
+def test_remaining():
+    usage = ReplyBudget(max_sentences=3).remaining("Dr. Who is on at 7.30 tonight.")
+    assert usage["sentences"] == 1
+    assert usage["sentences_remaining"] == 2
+    assert not usage["budget_reached"]
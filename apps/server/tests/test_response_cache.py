@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+from PIL import Image
+
+from main import (
+    SCENE_HASH_THRESHOLD,
+    PreparedImage,
+    ReplyBudget,
+    ResponseCache,
+    SmolVLMProcessor,
+    perceptual_hash,
+)
+
+MESSAGES = [{"audio": "AAAA", "sample_rate": 24000}]
+
+
+def scene(seed: int, noise: int = 0) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, (8, 8, 3)).repeat(32, 0).repeat(32, 1)
+    if noise:
+        pixels = pixels + np.random.default_rng(99).integers(
+            -noise, noise, pixels.shape
+        )
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def key(transcript="What is this?", fingerprint="", tokens=300, budget=None):
+    return ResponseCache.make_key(transcript, fingerprint, tokens, budget)
+
+
+def test_transcripts_match_regardless_of_case_and_punctuation():
+    cache = ResponseCache()
+    cache.put(key("What is this?"), None, "A cup.", MESSAGES)
+    assert cache.get(key("what is this"), None).text == "A cup."
+    assert cache.get(key("What is that?"), None) is None
+    assert cache.get(key(tokens=100), None) is None
+    assert cache.get(key(budget=ReplyBudget(max_sentences=1)), None) is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 3
+
+
+def test_near_duplicate_frames_hit_and_other_scenes_miss():
+    cache = ResponseCache()
+    cache.put(key(), perceptual_hash(scene(1)), "A cup.", MESSAGES)
+    assert cache.get(key(), perceptual_hash(scene(1, noise=8))).text == "A cup."
+    assert cache.get(key(), perceptual_hash(scene(2))) is None
+    # Up to SCENE_HASH_THRESHOLD differing bits is the same scene
+    scene_hash = perceptual_hash(scene(1))
+    near = scene_hash ^ int("1" * SCENE_HASH_THRESHOLD, 2)
+    far = scene_hash ^ int("1" * (SCENE_HASH_THRESHOLD + 1), 2)
+    assert cache.get(key(), near).text == "A cup."
+    assert cache.get(key(), far) is None
+    # A reply about a frame is not one about no frame, and vice versa
+    assert cache.get(key(), None) is None
+    cache.put(key(), None, "I can't see anything.", MESSAGES)
+    assert cache.get(key(), None).text == "I can't see anything."
+
+
+def test_expired_replies_are_dropped():
+    cache = ResponseCache(ttl=60)
+    cache.put(key(), None, "A cup.", MESSAGES)
+    cache.entries[(key(), None)].created_at -= 61
+    assert cache.get(key(), None) is None
+    assert cache.get_stats()["entries"] == 0
+    assert cache.size_bytes == 0
+
+
+def test_least_recently_used_replies_are_evicted_over_the_size_limit():
+    size = len("reply a") + sum(len(json.dumps(m)) for m in MESSAGES)
+    cache = ResponseCache(max_bytes=2 * size)
+    cache.put(key("a"), None, "reply a", MESSAGES)
+    cache.put(key("b"), None, "reply b", MESSAGES)
+    assert cache.get(key("a"), None)
+    cache.put(key("c"), None, "reply c", MESSAGES)
+
+    assert cache.get(key("b"), None) is None
+    assert cache.get(key("a"), None) and cache.get(key("c"), None)
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_replies_larger_than_the_cache_are_not_stored():
+    cache = ResponseCache(max_bytes=10)
+    cache.put(key(), None, "A reply much longer than ten bytes.", MESSAGES)
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_context_fingerprint_covers_earlier_frames_only():
+    def frames(*hashes):
+        return [PreparedImage(image=None, image_hash=h) for h in hashes]
+
+    fingerprint = SmolVLMProcessor.context_fingerprint
+    assert fingerprint(frames(1, 2, 3)) == fingerprint(frames(1, 2, 4))
+    assert fingerprint(frames(1, 2, 3)) != fingerprint(frames(5, 2, 3))
+    assert fingerprint(frames(3)) == fingerprint([])
@@ -0,0 +1,76 @@
+import base64
+import io
+import json
+import time
+
+import numpy as np
+from fastapi import WebSocketDisconnect
+from PIL import Image
+
+
+def audio_message(with_image: bool = False) -> str:
+    message = {
+        "audio_segment": base64.b64encode(np.zeros(16000, np.int16).tobytes()).decode()
+    }
+    if with_image:
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 48), (120, 30, 200)).save(buffer, "JPEG")
+        message["image"] = base64.b64encode(buffer.getvalue()).decode()
+    return json.dumps(message)
+
+
+def receive_turn(ws) -> list:
+    """Messages of one turn, up to its audio_complete"""
+    messages = []
+    while not messages or not messages[-1].get("audio_complete"):
+        messages.append(json.loads(ws.receive_text()))
+    return messages
+
+
+def test_turn_on_stub_backends(client):
+    with client.websocket_connect("/ws/alice") as ws:
+        assert json.loads(ws.receive_text()) == {
+            "status": "connected",
+            "client_id": "alice",
+        }
+        ws.send_text(audio_message(with_image=True))
+        messages = receive_turn(ws)
+
+    assert messages[0] == {"interrupt": True}
+    audio = [m for m in messages if "audio" in m]
+    assert audio and all(m["modality"] == "multimodal" for m in audio)
+    assert all(base64.b64decode(m["audio"]) for m in audio)
+    # No reply budget by default
+    usage = messages[-1]["reply_budget"]
+    assert usage["sentences_remaining"] is usage["speech_seconds_remaining"] is None
+    assert not usage["budget_reached"]
+
+    stats = client.get("/stats").json()
+    assert stats["audio_with_image_received"] >= 1
+    assert stats["admission"]["stages"]["vlm"]["admitted"] >= 1
+
+
+def test_audio_only_turns_keep_the_session(client):
+    with client.websocket_connect("/ws/bob") as ws:
+        ws.receive_text()
+        for _ in range(2):
+            ws.send_text(audio_message())
+            messages = receive_turn(ws)
+            assert any(m.get("modality") == "audio_only" for m in messages)
+
+
+def test_client_that_drops_right_after_connecting_is_cleaned_up(client, monkeypatch):
+    import main
+
+    async def dropped(self, data):
+        raise WebSocketDisconnect(1006)
+
+    monkeypatch.setattr(main.WebSocket, "send_text", dropped)
+    with client.websocket_connect("/ws/carol"):
+        pass
+
+    deadline = time.time() + 5
+    while "carol" in main.manager.active_connections and time.time() < deadline:
+        time.sleep(0.01)
+    assert "carol" not in main.manager.active_connections
+    assert "carol" not in main.manager.current_tasks